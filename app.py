@@ -2,9 +2,13 @@ import tkinter as tk
 from tkinter import messagebox, simpledialog
 from frontend.login_window import LoginWindow
 from frontend.main_window import MainWindow
-from backend.database import criar_banco
+from backend.database import criar_banco, configurar_armazenamento
+from backend.migrations import aplicar_migracoes
+from backend.messaging import repetition_memory
+from backend.limits import rate_limiter
 from pathlib import Path
 import sys
+import multiprocessing
 
 class TitaniumClinica:
     def __init__(self):
@@ -16,12 +20,40 @@ class TitaniumClinica:
         if not Path(self.db_path).exists():
             self._primeira_execucao()
         
+        # Aplicar perfil de armazenamento (WAL e PRAGMAs)
+        configurar_armazenamento(self.db_path)
+        
+        # Atualizar schema de instalações existentes
+        self._aplicar_migracoes()
+        
+        # Templates já recebidos por paciente (evita repetir após reiniciar)
+        repetition_memory.carregar(self.db_path)
+
+        # Limites de envio em memória (contadores do dia vêm do banco)
+        rate_limiter.carregar(self.db_path)
+        
         # Iniciar backup automático
         self._iniciar_backup_automatico()
         
         # Iniciar login
         self._mostrar_login()
     
+    def _aplicar_migracoes(self):
+        """Aplica migrações de schema pendentes"""
+        try:
+            for m in aplicar_migracoes(self.db_path):
+                print(f"✅ Migração {m['versao']} ({m['nome']}) aplicada em {m['duracao_ms']} ms")
+        except Exception as e:
+            root = tk.Tk()
+            root.withdraw()
+            messagebox.showerror(
+                "Erro",
+                f"Não foi possível atualizar o banco de dados:\n\n{str(e)}\n\n"
+                "Restaure um backup ou contate o suporte."
+            )
+            root.destroy()
+            sys.exit(1)
+    
     def _iniciar_backup_automatico(self):
         """Inicia scheduler de backup automático"""
         try:
@@ -106,4 +138,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Importação paralela usa processos (spawn); necessário no executável empacotado
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
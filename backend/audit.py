@@ -1,6 +1,6 @@
 import logging
 from datetime import datetime
-import sqlite3
+from backend.connection import get_connection
 
 class AuditLogger:
     def __init__(self, db_path: str):
@@ -18,7 +18,7 @@ class AuditLogger:
     def log_acao(self, usuario_id: int, acao: str, tabela: str = None, 
                  registro_id: int = None, detalhes: str = ''):
         """Registra ação no log de auditoria"""
-        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
         
         try:
@@ -1,6 +1,7 @@
 import bcrypt
 import secrets
 import sqlite3
+from backend.connection import get_connection
 from datetime import datetime, timedelta
 from typing import Optional, Dict
 import socket
@@ -10,7 +11,7 @@ class AuthManager:
         self.db_path = db_path
     
     def _get_connection(self):
-        return sqlite3.connect(self.db_path, timeout=10)
+        return get_connection(self.db_path)
     
     def hash_password(self, password: str) -> str:
         """Gera hash seguro da senha"""
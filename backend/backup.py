@@ -3,6 +3,8 @@ import shutil
 from datetime import datetime, timedelta
 from pathlib import Path
 import os
+from backend.connection import connection_manager
+from backend.messaging import template_cache
 
 class BackupManager:
     def __init__(self, db_path: str, backup_dir: str = 'data/backups'):
@@ -10,6 +12,17 @@ class BackupManager:
         self.backup_dir = backup_dir
         Path(backup_dir).mkdir(parents=True, exist_ok=True)
     
+    def _copiar_banco(self, origem: str, destino: str):
+        """Copia banco de forma consistente, mesmo com outras conexões abertas"""
+        conn_origem = sqlite3.connect(origem, timeout=10)
+        conn_destino = sqlite3.connect(destino, timeout=10)
+        
+        try:
+            conn_origem.backup(conn_destino)
+        finally:
+            conn_destino.close()
+            conn_origem.close()
+    
     def criar_backup(self) -> dict:
         """Cria backup do banco de dados"""
         try:
@@ -17,8 +30,8 @@ class BackupManager:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             backup_file = f"{self.backup_dir}/titanium_backup_{timestamp}.db"
             
-            # Copiar arquivo
-            shutil.copy2(self.db_path, backup_file)
+            # Copiar via API de backup do SQLite (inclui o conteúdo do WAL)
+            self._copiar_banco(self.db_path, backup_file)
             
             # Comprimir (opcional)
             # import gzip
@@ -64,8 +77,12 @@ class BackupManager:
             # Fazer backup do atual antes de restaurar
             self.criar_backup()
             
-            # Restaurar
-            shutil.copy2(backup_file, self.db_path)
+            # Restaurar (copiar o arquivo por cima corromperia o WAL ativo)
+            self._copiar_banco(backup_file, self.db_path)
+            
+            # Conexões abertas guardam cache do conteúdo anterior
+            connection_manager.invalidar(self.db_path)
+            template_cache.invalidar(self.db_path)
             
             return True
         except:
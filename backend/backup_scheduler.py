@@ -5,12 +5,12 @@ Executa em thread separada e verifica horário configurado
 
 import threading
 import time
-import sqlite3
 from datetime import datetime, time as dt_time
 from pathlib import Path
 import logging
 
 from backend.backup import BackupManager
+from backend.connection import get_connection
 
 class BackupScheduler:
     def __init__(self, db_path: str, backup_dir: str = 'data/backups'):
@@ -36,7 +36,7 @@ class BackupScheduler:
     def _obter_configuracao_backup(self):
         """Obtém configurações de backup do banco"""
         try:
-            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn = get_connection(self.db_path)
             cursor = conn.cursor()
             
             # Verificar se backup automático está ativado
@@ -0,0 +1,154 @@
+"""
+Detecção de alterações em pacientes
+Permite que várias estações vejam as mudanças umas das outras sem recarregar
+listas inteiras: um PRAGMA data_version barato diz se algo mudou e, só então,
+o registro pacientes_alteracoes (preenchido por triggers) diz o quê.
+"""
+
+import logging
+import sqlite3
+import time
+from typing import Callable, Dict, List, Optional
+
+from backend.connection import PERFIL_PADRAO, aplicar_perfil, connection_manager
+
+
+class ChangeMonitor:
+    """
+    Acompanha pacientes_alteracoes a partir do ponto em que foi criado.
+
+    Usa uma conexão própria: data_version só muda com commits de outras
+    conexões, então ela não pode ser compartilhada com quem grava.
+    Deve ser consultado sempre pela mesma thread (a da interface).
+    """
+
+    # Acima disso é mais barato recarregar tudo
+    LIMITE_INCREMENTAL = 500
+
+    # A limpeza roda na criação e depois no máximo uma vez por intervalo
+    INTERVALO_LIMPEZA = 3600
+
+    def __init__(self, db_path: str, dias_retencao: int = 1):
+        self.db_path = db_path
+        self.dias_retencao = dias_retencao
+        self.logger = logging.getLogger('ChangeMonitor')
+        self._ouvintes: List[Callable[[Dict], None]] = []
+        self._conn = aplicar_perfil(
+            sqlite3.connect(db_path, timeout=10),
+            connection_manager.perfil or PERFIL_PADRAO
+        )
+
+        self._limpar(dias_retencao)
+        self._data_version = self._ler_data_version()
+        self._ultimo_seq = self._seq_atual()
+
+    def _ler_data_version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _seq_atual(self) -> int:
+        # sqlite_sequence não volta atrás quando a limpeza esvazia a tabela
+        row = self._conn.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'pacientes_alteracoes'"
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _limpar(self, dias_retencao: int):
+        """Remove registros antigos; as estações ativas já os consumiram"""
+        self._ultima_limpeza = time.monotonic()
+        try:
+            self._conn.execute("""
+                DELETE FROM pacientes_alteracoes
+                WHERE alterado_em < datetime('now', ?)
+            """, (f'-{dias_retencao} days',))
+            self._conn.commit()
+        except sqlite3.OperationalError as e:
+            # Banco ocupado: fica para a próxima sessão
+            self.logger.debug(f"Limpeza do registro de alterações adiada: {str(e)}")
+
+    def registrar(self, callback: Callable[[Dict], None]):
+        """Registra função chamada com as alterações detectadas"""
+        self._ouvintes.append(callback)
+
+    def verificar(self) -> Optional[Dict]:
+        """
+        Verifica se houve alterações desde a última chamada.
+
+        Retorna None se nada mudou ou um dict com:
+        - recarregar: True se as alterações não podem ser aplicadas uma a uma
+          (volume alto ou registros já descartados pela limpeza)
+        - alterados: ids inseridos ou atualizados
+        - excluidos: ids removidos
+        - datas: datas de consulta afetadas (antes e depois da alteração)
+        """
+        if time.monotonic() - self._ultima_limpeza >= self.INTERVALO_LIMPEZA:
+            self._limpar(self.dias_retencao)
+
+        try:
+            versao = self._ler_data_version()
+            if versao == self._data_version:
+                return None
+            self._data_version = versao
+
+            rows = self._conn.execute("""
+                SELECT seq, paciente_id, operacao, data_anterior, data_nova
+                FROM pacientes_alteracoes
+                WHERE seq > ?
+                ORDER BY seq
+                LIMIT ?
+            """, (self._ultimo_seq, self.LIMITE_INCREMENTAL + 1)).fetchall()
+        except sqlite3.OperationalError as e:
+            if "database is locked" in str(e):
+                return None  # Tenta de novo na próxima verificação
+            raise
+
+        if not rows:
+            return None
+
+        alteracoes = {'recarregar': False, 'alterados': set(), 'excluidos': set(), 'datas': set()}
+
+        if (len(rows) > self.LIMITE_INCREMENTAL or rows[0][0] > self._ultimo_seq + 1
+                or any(row[2] == 'R' for row in rows)):
+            alteracoes['recarregar'] = True
+            self._ultimo_seq = self._seq_atual()
+        else:
+            for seq, paciente_id, operacao, data_anterior, data_nova in rows:
+                if operacao == 'D':
+                    alteracoes['alterados'].discard(paciente_id)
+                    alteracoes['excluidos'].add(paciente_id)
+                else:
+                    alteracoes['excluidos'].discard(paciente_id)
+                    alteracoes['alterados'].add(paciente_id)
+
+                alteracoes['datas'].update(d for d in (data_anterior, data_nova) if d)
+
+            self._ultimo_seq = rows[-1][0]
+
+        for callback in self._ouvintes:
+            try:
+                callback(alteracoes)
+            except Exception as e:
+                self.logger.error(f"Erro ao aplicar alterações: {str(e)}")
+
+        return alteracoes
+
+    def fechar(self):
+        self._conn.close()
+
+
+def suspender_registro(conn: sqlite3.Connection):
+    """
+    Suspende o registro por linha até retomar_registro(), dentro da
+    transação já aberta em `conn` (ex: um lote de importação).
+    """
+    conn.execute("INSERT OR IGNORE INTO pacientes_alteracoes_pausa (id) VALUES (1)")
+
+
+def retomar_registro(conn: sqlite3.Connection, recarregar: bool = True):
+    """
+    Volta a registrar alterações por linha. Com `recarregar`, grava uma única
+    marca que faz as estações recarregarem as listas em vez de aplicar as
+    alterações do lote uma a uma.
+    """
+    conn.execute("DELETE FROM pacientes_alteracoes_pausa")
+    if recarregar:
+        conn.execute("INSERT INTO pacientes_alteracoes (operacao) VALUES ('R')")
@@ -0,0 +1,231 @@
+"""
+Gerenciador de conexões SQLite compartilhadas
+Mantém uma conexão por thread e por banco, reaproveitada entre chamadas
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+class ConexaoReutilizavel(sqlite3.Connection):
+    """
+    Conexão devolvida ao gerenciador em vez de fechada.
+
+    close() mantém a conexão aberta para a próxima chamada, mas descarta
+    transações pendentes (rollback), como aconteceria com um close() real.
+    """
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+    def encerrar(self):
+        """Fecha de fato a conexão com o banco"""
+        super().close()
+
+
+# Perfis de armazenamento: PRAGMAs aplicados a cada conexão aberta.
+# WAL permite que leituras (dashboard, listas) não bloqueiem gravações.
+# Observação: WAL exige que todos os processos estejam na mesma máquina;
+# não use o banco a partir de uma pasta de rede compartilhada.
+PERFIS_ARMAZENAMENTO = {
+    'desktop-safe': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -8000,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'busy_timeout': 10000
+    },
+    'multi-attendant': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16000,
+        'mmap_size': 67108864,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 15000
+    },
+    'bulk-import': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -65536,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 30000
+    }
+}
+
+PERFIL_PADRAO = 'desktop-safe'
+
+
+def aplicar_perfil(conn: sqlite3.Connection, perfil: str = PERFIL_PADRAO) -> sqlite3.Connection:
+    """Aplica os PRAGMAs do perfil de armazenamento na conexão"""
+    if perfil not in PERFIS_ARMAZENAMENTO:
+        raise ValueError(f'Perfil de armazenamento desconhecido: {perfil}')
+
+    for pragma, valor in PERFIS_ARMAZENAMENTO[perfil].items():
+        conn.execute(f"PRAGMA {pragma} = {valor}")
+
+    return conn
+
+
+def criar_fabrica(perfil: str = PERFIL_PADRAO) -> Callable[[str], sqlite3.Connection]:
+    """Cria uma fábrica de conexões que aplica o perfil informado"""
+    if perfil not in PERFIS_ARMAZENAMENTO:
+        raise ValueError(f'Perfil de armazenamento desconhecido: {perfil}')
+
+    def fabrica(db_path: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(db_path, timeout=10, factory=ConexaoReutilizavel)
+        return aplicar_perfil(conn, perfil)
+
+    return fabrica
+
+
+fabrica_padrao = criar_fabrica(PERFIL_PADRAO)
+
+
+class ConnectionManager:
+    """
+    Fornece conexões thread-local, pré-configuradas e reutilizáveis.
+
+    A fábrica é plugável: qualquer callable (db_path) -> sqlite3.Connection.
+    Para que close() não feche a conexão de fato, a fábrica deve criar
+    conexões com factory=ConexaoReutilizavel.
+    """
+
+    def __init__(self, factory: Optional[Callable[[str], sqlite3.Connection]] = None,
+                 intervalo_verificacao: float = 30.0):
+        self._factory = factory or fabrica_padrao
+        self.perfil = PERFIL_PADRAO if factory is None else None
+        self.intervalo_verificacao = intervalo_verificacao
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._geracoes: Dict[str, int] = {}
+        self._geracao_global = 0
+        self._caminhos: Dict[str, str] = {}
+        self._estatisticas = {
+            'aberturas': 0,
+            'reutilizacoes': 0,
+            'falhas_verificacao': 0,
+            'fechamentos': 0
+        }
+
+    def definir_fabrica(self, factory: Callable[[str], sqlite3.Connection]):
+        """Troca a fábrica de conexões e invalida as conexões existentes"""
+        self._factory = factory
+        self.perfil = None
+        self.invalidar()
+
+    def definir_perfil(self, perfil: str):
+        """Passa a abrir conexões com o perfil de armazenamento informado"""
+        self.definir_fabrica(criar_fabrica(perfil))
+        self.perfil = perfil
+
+    def _chave(self, db_path: str) -> str:
+        chave = self._caminhos.get(db_path)
+        if chave is None:
+            chave = db_path if db_path == ':memory:' else os.path.abspath(db_path)
+            self._caminhos[db_path] = chave
+        return chave
+
+    def _conexoes_thread(self) -> Dict[str, list]:
+        conexoes = getattr(self._local, 'conexoes', None)
+        if conexoes is None:
+            conexoes = self._local.conexoes = {}
+        return conexoes
+
+    def _geracao(self, chave: str) -> int:
+        return self._geracao_global + self._geracoes.get(chave, 0)
+
+    def _contar(self, metrica: str):
+        with self._lock:
+            self._estatisticas[metrica] += 1
+
+    def _verificar_saude(self, conn: sqlite3.Connection) -> bool:
+        """Executa uma consulta trivial para confirmar que a conexão responde"""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _encerrar(self, conn: sqlite3.Connection):
+        try:
+            if isinstance(conn, ConexaoReutilizavel):
+                conn.encerrar()
+            else:
+                conn.close()
+        except sqlite3.Error:
+            pass
+        self._contar('fechamentos')
+
+    def obter_conexao(self, db_path: str) -> sqlite3.Connection:
+        """Retorna a conexão da thread atual para o banco, abrindo se necessário"""
+        chave = self._chave(db_path)
+        conexoes = self._conexoes_thread()
+        entrada = conexoes.get(chave)
+        agora = time.monotonic()
+
+        if entrada is not None:
+            conn, geracao, ultimo_uso = entrada
+
+            if geracao != self._geracao(chave):
+                self._encerrar(conn)
+            elif agora - ultimo_uso > self.intervalo_verificacao and not self._verificar_saude(conn):
+                self._contar('falhas_verificacao')
+                self._encerrar(conn)
+            else:
+                entrada[2] = agora
+                self._contar('reutilizacoes')
+                return conn
+
+        conn = self._factory(db_path)
+        conexoes[chave] = [conn, self._geracao(chave), agora]
+        self._contar('aberturas')
+        return conn
+
+    def invalidar(self, db_path: Optional[str] = None):
+        """
+        Descarta conexões abertas (de um banco ou de todos).
+
+        As conexões da thread atual são fechadas imediatamente; as das demais
+        threads são reabertas na próxima vez que forem solicitadas.
+        Use após substituir o arquivo do banco (ex: restauração de backup).
+        """
+        with self._lock:
+            if db_path is None:
+                self._geracao_global += 1
+            else:
+                chave = self._chave(db_path)
+                self._geracoes[chave] = self._geracoes.get(chave, 0) + 1
+
+        conexoes = self._conexoes_thread()
+        for chave in list(conexoes):
+            if db_path is None or chave == self._chave(db_path):
+                self._encerrar(conexoes.pop(chave)[0])
+
+    def estatisticas(self) -> Dict:
+        """Retorna contadores de aberturas, reutilizações e verificações"""
+        with self._lock:
+            stats = dict(self._estatisticas)
+
+        total = stats['aberturas'] + stats['reutilizacoes']
+        stats['taxa_reutilizacao'] = round(stats['reutilizacoes'] / total * 100, 2) if total else 0
+        return stats
+
+    def zerar_estatisticas(self):
+        with self._lock:
+            for metrica in self._estatisticas:
+                self._estatisticas[metrica] = 0
+
+
+# Instância global do processo
+connection_manager = ConnectionManager()
+
+
+def get_connection(db_path: str) -> sqlite3.Connection:
+    """Atalho para a conexão compartilhada da thread atual"""
+    return connection_manager.obter_conexao(db_path)
@@ -1,5 +1,6 @@
 import sqlite3
 from pathlib import Path
+from backend.connection import PERFIS_ARMAZENAMENTO, PERFIL_PADRAO, aplicar_perfil, connection_manager
 
 def criar_banco(db_path: str = 'data/titanium_clinica.db'):
     """Cria banco de dados com todas as tabelas"""
@@ -8,6 +9,7 @@ def criar_banco(db_path: str = 'data/titanium_clinica.db'):
     Path(db_path).parent.mkdir(parents=True, exist_ok=True)
     
     conn = sqlite3.connect(db_path)
+    aplicar_perfil(conn, PERFIL_PADRAO)
     cursor = conn.cursor()
     
     # Schema completo
@@ -270,6 +272,33 @@ INSERT INTO termos_lgpd (versao, texto_completo, data_vigencia) VALUES
     
     print(f"Banco criado em: {db_path}")
 
+def configurar_armazenamento(db_path: str = 'data/titanium_clinica.db') -> str:
+    """
+    Aplica o perfil de armazenamento configurado no banco.
+
+    Bancos existentes são convertidos para WAL no próprio arquivo.
+    Retorna o perfil aplicado.
+    """
+    conn = sqlite3.connect(db_path, timeout=10)
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("SELECT valor FROM configuracoes WHERE chave = 'perfil_armazenamento'")
+        result = cursor.fetchone()
+        
+        perfil = result[0] if result else PERFIL_PADRAO
+        if perfil not in PERFIS_ARMAZENAMENTO:
+            perfil = PERFIL_PADRAO
+        
+        # journal_mode=WAL é persistente: converte o arquivo existente
+        aplicar_perfil(conn, perfil)
+    finally:
+        conn.close()
+    
+    connection_manager.definir_perfil(perfil)
+    
+    return perfil
+
 def criar_usuario_admin(db_path: str, username: str, password: str):
     """Cria primeiro usuário admin"""
     from backend.auth import AuthManager
@@ -0,0 +1,81 @@
+"""
+Conversão de datas e horas
+O banco guarda datas em ISO (YYYY-MM-DD) e horas em HH:MM; o formato
+brasileiro (DD/MM/YYYY) é usado apenas na entrada e na exibição.
+"""
+
+from datetime import date, datetime, time
+from typing import Optional
+
+# Formatos aceitos na entrada (telas, planilhas e dados legados)
+FORMATOS_DATA = ('%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%Y/%m/%d', '%d/%m/%y')
+FORMATOS_HORA = ('%H:%M', '%H:%M:%S', '%Hh%M', '%Hh')
+
+
+def para_iso(valor) -> Optional[str]:
+    """
+    Converte data para 'YYYY-MM-DD'.
+
+    Aceita date/datetime ou texto em qualquer formato de FORMATOS_DATA.
+    Retorna None para valor vazio e levanta ValueError se inválida.
+    """
+    if valor is None:
+        return None
+
+    if isinstance(valor, datetime):
+        return valor.date().isoformat()
+
+    if isinstance(valor, date):
+        return valor.isoformat()
+
+    texto = str(valor).strip()
+    if not texto:
+        return None
+
+    # Timestamps de planilha: '2025-12-25 00:00:00'
+    if len(texto) > 10 and texto[10] in ' T':
+        texto = texto[:10]
+
+    for fmt in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, fmt).date().isoformat()
+        except ValueError:
+            continue
+
+    raise ValueError(f'Data inválida: {valor}')
+
+
+def normalizar_hora(valor) -> Optional[str]:
+    """
+    Converte hora para 'HH:MM'.
+
+    Retorna None para valor vazio e levanta ValueError se inválida.
+    """
+    if valor is None:
+        return None
+
+    if isinstance(valor, (datetime, time)):
+        return valor.strftime('%H:%M')
+
+    texto = str(valor).strip()
+    if not texto:
+        return None
+
+    for fmt in FORMATOS_HORA:
+        try:
+            return datetime.strptime(texto, fmt).strftime('%H:%M')
+        except ValueError:
+            continue
+
+    raise ValueError(f'Hora inválida: {valor}')
+
+
+def para_exibicao(valor) -> str:
+    """Formata data para DD/MM/YYYY; valores não reconhecidos são exibidos como estão"""
+    if not valor:
+        return ''
+
+    try:
+        return datetime.strptime(para_iso(valor), '%Y-%m-%d').strftime('%d/%m/%Y')
+    except (ValueError, TypeError):
+        return str(valor)
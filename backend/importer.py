@@ -0,0 +1,772 @@
+"""
+Importação de planilhas de pacientes
+O arquivo é lido em lotes (CSV pelo módulo csv, sem pandas; xlsx em modo
+read-only), cada lote é validado por coluna e gravado com executemany;
+consentimentos e auditoria entram nas mesmas operações em lote. A memória usada depende do tamanho do
+lote, não do tamanho da planilha. ImportJob executa a importação numa
+thread, com progresso por fila, cancelamento e relatório de rejeitados.
+"""
+
+import codecs
+import csv
+import hashlib
+import logging
+import os
+import queue
+import shutil
+import sqlite3
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from backend.changes import suspender_registro, retomar_registro
+from backend.connection import aplicar_perfil
+from backend.dates import para_iso, normalizar_hora
+from backend.security import SecurityValidator, ERROS_CPF, ERROS_EMAIL
+
+# Colunas reconhecidas na planilha (as demais são ignoradas)
+COLUNAS = (
+    'nome', 'telefone', 'email', 'data_nascimento', 'cpf', 'data_consulta',
+    'hora_consulta', 'tipo_consulta', 'profissional', 'observacoes', 'consentimento_whatsapp'
+)
+COLUNAS_OBRIGATORIAS = ('nome', 'telefone', 'data_consulta', 'hora_consulta')
+
+VALORES_CONSENTIMENTO = {'SIM', 'S', 'YES', 'Y', '1', 'TRUE'}
+
+# forma_consentimento aceita apenas verbal/escrito/digital: a planilha é um registro escrito
+FORMA_CONSENTIMENTO_PLANILHA = 'escrito'
+OBSERVACAO_CONSENTIMENTO = 'Consentimento informado na planilha de importação'
+
+
+class ImportacaoError(Exception):
+    """Arquivo que não pode ser importado (formato, colunas obrigatórias)"""
+
+
+# Validação em processos separados (PatientImporter com processos > 1):
+# cada processo monta o próprio validador uma vez
+_validador_processo = None
+
+
+def _iniciar_processo(db_path: str):
+    global _validador_processo
+    _validador_processo = PatientImporter(db_path, 0)
+
+
+def _validar_em_processo(lote: Dict) -> Tuple[List[Dict], List[Tuple[int, str]]]:
+    return _validador_processo.validar_lote(lote)
+
+
+def _detectar_formato_csv(arquivo: str, amostra: int = 64 * 1024) -> Tuple[str, str]:
+    """
+    (codificação, delimitador) do CSV. Exportações do Excel em português
+    costumam vir em cp1252 e separadas por ';'; sem BOM nem UTF-8 válido
+    na amostra, assume cp1252.
+    """
+    with open(arquivo, 'rb') as f:
+        dados = f.read(amostra)
+
+    if dados.startswith(codecs.BOM_UTF8):
+        codificacao = 'utf-8-sig'
+    else:
+        try:
+            # final=False: a amostra pode cortar um caractere no meio
+            codecs.getincrementaldecoder('utf-8')().decode(dados, final=False)
+            codificacao = 'utf-8'
+        except UnicodeDecodeError:
+            codificacao = 'cp1252'
+
+    texto = dados.decode(codificacao, errors='ignore')
+    try:
+        delimitador = csv.Sniffer().sniff(texto.split('\n', 1)[0], delimiters=',;\t|').delimiter
+    except csv.Error:
+        delimitador = ','
+
+    return codificacao, delimitador
+
+
+def _celula(valor) -> str:
+    """Valor de célula como texto, no formato que a leitura via pandas daria"""
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor).strip()
+
+
+class PatientImporter:
+    """
+    Importa pacientes de .csv, .xlsx ou .xls.
+
+    Uso: PatientImporter(db_path, usuario_id).importar(arquivo). O resultado
+    traz total, importados, atualizados, duplicados, erros, cancelado e
+    retomado_de;
+    `progresso`, se informado, é chamado com esse mesmo dict após cada lote.
+
+    Com atualizar_existentes (reimportação da agenda), a linha cujo telefone
+    normalizado e data da consulta já existem atualiza essa consulta.
+
+    Com processos > 1 a validação dos lotes é distribuída num
+    ProcessPoolExecutor; os resultados voltam na ordem do arquivo para a
+    gravação, que continua numa única conexão.
+    """
+
+    @classmethod
+    def processos_para(cls, arquivo: str) -> int:
+        """Número de processos de validação sugerido para o arquivo"""
+        if os.path.getsize(arquivo) < cls.LIMITE_PARALELO_BYTES:
+            return 1
+        return max(1, min(cls.MAXIMO_PROCESSOS, (os.cpu_count() or 1)))
+
+    TAMANHO_LOTE = 5000
+    # Acima disso (~100 mil linhas) a validação compensa o custo de subir processos
+    LIMITE_PARALELO_BYTES = 20 * 1024 * 1024
+    MAXIMO_PROCESSOS = 4
+
+    def __init__(self, db_path: str, usuario_id: int, pular_duplicados: bool = True,
+                 tamanho_lote: Optional[int] = None, atualizar_existentes: bool = False,
+                 processos: int = 1):
+        self.db_path = db_path
+        self.usuario_id = usuario_id
+        self.pular_duplicados = pular_duplicados
+        self.atualizar_existentes = atualizar_existentes
+        self.tamanho_lote = tamanho_lote or self.TAMANHO_LOTE
+        self.processos = max(1, processos)
+        self.security = SecurityValidator(db_path)
+        self.logger = logging.getLogger('PatientImporter')
+        self._datas: Dict[Tuple[str, str], object] = {}
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+
+    def ler_lotes(self, arquivo: str) -> Iterator[Dict]:
+        """
+        Lê o arquivo em lotes: {'linha': nº da primeira linha na planilha,
+        'colunas': {coluna: [valores]}, 'tamanho': n}.
+        """
+        extensao = os.path.splitext(arquivo)[1].lower()
+
+        if extensao == '.csv':
+            lotes = self._ler_csv(arquivo)
+        elif extensao == '.xlsx':
+            lotes = self._ler_xlsx(arquivo)
+        else:
+            lotes = self._ler_excel_antigo(arquivo)
+
+        return lotes
+
+    def _validar_cabecalho(self, colunas):
+        faltando = [col for col in COLUNAS_OBRIGATORIAS if col not in colunas]
+        if faltando:
+            raise ImportacaoError(f"Colunas obrigatórias faltando: {', '.join(faltando)}")
+
+    def _lote(self, linha: int, colunas: Dict[str, List[str]]) -> Dict:
+        tamanho = len(next(iter(colunas.values())))
+        for coluna in COLUNAS:
+            colunas.setdefault(coluna, [''] * tamanho)
+        return {'linha': linha, 'colunas': colunas, 'tamanho': tamanho}
+
+    def _ler_csv(self, arquivo: str) -> Iterator[Dict]:
+        # Módulo csv, sem pandas: lê em streaming e tudo chega como texto
+        # (telefones e CPFs mantêm os zeros à esquerda)
+        codificacao, delimitador = _detectar_formato_csv(arquivo)
+
+        with open(arquivo, newline='', encoding=codificacao) as f:
+            yield from self._em_lotes(csv.reader(f, delimiter=delimitador), str.strip)
+
+    def _ler_xlsx(self, arquivo: str) -> Iterator[Dict]:
+        from openpyxl import load_workbook
+
+        livro = load_workbook(arquivo, read_only=True, data_only=True)
+        try:
+            yield from self._em_lotes(livro.active.iter_rows(values_only=True))
+        finally:
+            livro.close()
+
+    def _em_lotes(self, linhas: Iterator[tuple], celula: Callable = _celula) -> Iterator[Dict]:
+        """
+        Agrupa as linhas (cabeçalho na primeira) em lotes de tamanho_lote;
+        `celula` converte cada valor em texto.
+        """
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            raise ImportacaoError("Arquivo vazio")
+
+        nomes = [_celula(c) for c in cabecalho]
+        self._validar_cabecalho(nomes)
+        posicoes = {col: nomes.index(col) for col in COLUNAS if col in nomes}
+
+        linha = 2
+        buffer = []
+        for valores in linhas:
+            # Linhas totalmente vazias no fim da planilha são comuns no Excel
+            if not any(v is not None and v != '' for v in valores):
+                continue
+            buffer.append(valores)
+
+            if len(buffer) >= self.tamanho_lote:
+                yield self._lote(linha, self._transpor(buffer, posicoes, celula))
+                linha += len(buffer)
+                buffer = []
+
+        if buffer:
+            yield self._lote(linha, self._transpor(buffer, posicoes, celula))
+
+    def _transpor(self, linhas: List[tuple], posicoes: Dict[str, int],
+                  celula: Callable = _celula) -> Dict[str, List[str]]:
+        return {
+            col: [celula(valores[pos]) if pos < len(valores) else '' for valores in linhas]
+            for col, pos in posicoes.items()
+        }
+
+    def _ler_excel_antigo(self, arquivo: str) -> Iterator[Dict]:
+        import pandas as pd
+
+        # .xls não tem leitura em streaming: lê inteiro e fatia em lotes
+        df = pd.read_excel(arquivo, dtype=str, keep_default_na=False)
+        self._validar_cabecalho(df.columns)
+
+        for inicio in range(0, len(df), self.tamanho_lote):
+            chunk = df.iloc[inicio:inicio + self.tamanho_lote]
+            colunas = {
+                col: [v.strip() for v in chunk[col].tolist()]
+                for col in COLUNAS if col in chunk.columns
+            }
+            yield self._lote(inicio + 2, colunas)
+
+    # ------------------------------------------------------------------
+    # Validação
+    # ------------------------------------------------------------------
+
+    def _converter(self, funcao, valor: str):
+        """para_iso/normalizar_hora memoizados: planilhas repetem poucas datas"""
+        chave = (funcao.__name__, valor)
+        resultado = self._datas.get(chave)
+        if resultado is None:
+            if len(self._datas) > 100000:
+                self._datas.clear()
+            try:
+                resultado = funcao(valor)
+            except ValueError as e:
+                resultado = e
+            self._datas[chave] = resultado
+        return resultado
+
+    def validar_lote(self, lote: Dict) -> Tuple[List[Dict], List[Tuple[int, str]]]:
+        """
+        Valida o lote coluna a coluna.
+
+        Retorna (válidos, rejeitados): válidos são dicts com os campos já
+        normalizados; rejeitados são (nº da linha, motivo).
+        """
+        colunas = lote['colunas']
+
+        telefones = self.security.validar_telefones_lote(colunas['telefone'])
+        cpf_ok, cpf_erros = self.security.validar_cpfs_lote(colunas['cpf'])
+        email_ok, email_erros = self.security.validar_emails_lote(colunas['email'])
+
+        validos = []
+        rejeitados = []
+
+        for i in range(lote['tamanho']):
+            linha = lote['linha'] + i
+            nome = colunas['nome'][i]
+
+            if not nome:
+                rejeitados.append((linha, 'Nome não informado'))
+                continue
+
+            if not colunas['telefone'][i]:
+                rejeitados.append((linha, 'Telefone não informado'))
+                continue
+
+            telefone_valido, telefone_formatado, erro = telefones[i]
+            if not telefone_valido:
+                rejeitados.append((linha, erro))
+                continue
+
+            data_nascimento = self._converter(para_iso, colunas['data_nascimento'][i])
+            data_consulta = self._converter(para_iso, colunas['data_consulta'][i])
+            hora_consulta = self._converter(normalizar_hora, colunas['hora_consulta'][i])
+
+            invalido = next((v for v in (data_nascimento, data_consulta, hora_consulta)
+                             if isinstance(v, ValueError)), None)
+            if invalido is not None:
+                rejeitados.append((linha, str(invalido)))
+                continue
+
+            # NOT NULL em pacientes: sem isso o executemany do lote inteiro falharia
+            if not data_consulta:
+                rejeitados.append((linha, 'Data da consulta não informada'))
+                continue
+
+            if not hora_consulta:
+                rejeitados.append((linha, 'Hora da consulta não informada'))
+                continue
+
+            if not email_ok[i]:
+                rejeitados.append((linha, ERROS_EMAIL[int(email_erros[i])]))
+                continue
+
+            if not cpf_ok[i]:
+                rejeitados.append((linha, ERROS_CPF[int(cpf_erros[i])]))
+                continue
+
+            validos.append({
+                'linha': linha,
+                'nome': nome,
+                'telefone': colunas['telefone'][i],
+                'telefone_formatado': telefone_formatado,
+                'email': colunas['email'][i] or None,
+                'data_nascimento': data_nascimento or None,
+                'cpf': colunas['cpf'][i] or None,
+                'data_consulta': data_consulta,
+                'hora_consulta': hora_consulta,
+                'tipo_consulta': colunas['tipo_consulta'][i] or None,
+                'profissional': colunas['profissional'][i] or None,
+                'observacoes': colunas['observacoes'][i] or None,
+                'consentimento': colunas['consentimento_whatsapp'][i].upper() in VALORES_CONSENTIMENTO,
+            })
+
+        return validos, rejeitados
+
+    def _lotes_validados(self, lotes: Iterator[Dict], executor: Optional[ProcessPoolExecutor]) -> Iterator[Tuple]:
+        """(lote, válidos, rejeitados) na ordem do arquivo"""
+        if executor is None:
+            for lote in lotes:
+                validos, rejeitados = self.validar_lote(lote)
+                yield lote, validos, rejeitados
+            return
+
+        # Poucos lotes à frente da gravação: a memória continua limitada
+        pendentes = deque()
+        for lote in lotes:
+            pendentes.append((lote, executor.submit(_validar_em_processo, lote)))
+            if len(pendentes) >= self.processos * 2:
+                lote, futuro = pendentes.popleft()
+                yield (lote, *futuro.result())
+
+        while pendentes:
+            lote, futuro = pendentes.popleft()
+            yield (lote, *futuro.result())
+
+    def _criar_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.processos == 1:
+            return None
+        # spawn: o processo pai tem threads (Tk, ImportJob) e fork não é seguro
+        return ProcessPoolExecutor(
+            max_workers=self.processos,
+            mp_context=get_context('spawn'),
+            initializer=_iniciar_processo,
+            initargs=(self.db_path,)
+        )
+
+    # ------------------------------------------------------------------
+    # Gravação
+    # ------------------------------------------------------------------
+
+    def _conectar(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        return aplicar_perfil(conn, 'bulk-import')
+
+    def _versao_termo(self, conn: sqlite3.Connection) -> Optional[str]:
+        row = conn.execute("""
+            SELECT versao FROM termos_lgpd
+            WHERE ativo = 1
+            ORDER BY data_vigencia DESC
+            LIMIT 1
+        """).fetchone()
+        return row[0] if row else None
+
+    def carregar_chaves(self, conn: sqlite3.Connection) -> Dict:
+        """
+        Chaves dos pacientes já cadastrados, lidas uma vez por importação
+        (varredura do índice idx_pacientes_telefone_formatado):
+        telefone normalizado -> {data_consulta: id}.
+        """
+        chaves: Dict[str, Dict[Optional[str], int]] = {}
+
+        for pid, formatado, data in conn.execute("""
+            SELECT id, telefone_formatado, data_consulta FROM pacientes
+            WHERE telefone_formatado IS NOT NULL
+        """):
+            chaves.setdefault(formatado, {})[data] = pid
+
+        # Cadastros antigos sem telefone_formatado: normaliza aqui
+        sem_formato = conn.execute("""
+            SELECT id, telefone, data_consulta FROM pacientes
+            WHERE telefone_formatado IS NULL
+        """).fetchall()
+        if sem_formato:
+            normalizados = self.security.validar_telefones_lote([t or '' for _, t, _ in sem_formato])
+            for (pid, _, data), (valido, formatado, _) in zip(sem_formato, normalizados):
+                if valido:
+                    chaves.setdefault(formatado, {}).setdefault(data, pid)
+
+        return chaves
+
+    def gravar_lote(self, conn: sqlite3.Connection, validos: List[Dict], termo: Optional[str],
+                    chaves: Dict, vistos: set) -> Tuple[int, int, int]:
+        """
+        Grava os pacientes do lote (transação aberta pelo chamador).
+
+        `chaves` vem de carregar_chaves(); `vistos` acumula as chaves já
+        processadas neste arquivo. Com
+        pular_duplicados a chave é o telefone normalizado; com
+        atualizar_existentes é telefone + data da consulta, e a consulta
+        existente é atualizada em vez de duplicada.
+        Retorna (importados, atualizados, duplicados).
+        """
+        duplicados = 0
+        atualizacoes = []
+
+        if self.atualizar_existentes or self.pular_duplicados:
+            novos = []
+            for p in validos:
+                if self.atualizar_existentes:
+                    chave = (p['telefone_formatado'], p['data_consulta'])
+                    existente = chaves.get(chave[0], {}).get(chave[1])
+                else:
+                    chave = p['telefone_formatado']
+                    existente = chave in chaves
+
+                if chave in vistos:
+                    duplicados += 1
+                    continue
+                vistos.add(chave)
+
+                if not existente:
+                    novos.append(p)
+                elif self.atualizar_existentes:
+                    atualizacoes.append(p)
+                    p['id'] = existente
+                else:
+                    duplicados += 1
+            validos = novos
+
+        atualizados = self._atualizar(conn, atualizacoes) if atualizacoes else 0
+
+        if not validos:
+            return 0, atualizados, duplicados
+
+        agora = datetime.now()
+        registros = []
+        for p in validos:
+            consentimento = p['consentimento'] and termo is not None
+            registros.append((
+                p['nome'], p['telefone'], p['telefone_formatado'], p['email'], p['data_nascimento'],
+                p['cpf'], p['data_consulta'], p['hora_consulta'], p['tipo_consulta'], p['profissional'],
+                p['observacoes'] or (OBSERVACAO_CONSENTIMENTO if consentimento else None),
+                self.usuario_id, agora,
+                1 if consentimento else 0,
+                agora if consentimento else None,
+                self.usuario_id if consentimento else None,
+                FORMA_CONSENTIMENTO_PLANILHA if consentimento else None,
+                termo if consentimento else None,
+            ))
+
+        # Nenhuma outra conexão grava durante a transação: os ids são os
+        # maiores que o atual, na ordem de inserção
+        ultimo_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM pacientes").fetchone()[0]
+
+        conn.executemany("""
+            INSERT INTO pacientes (
+                nome, telefone, telefone_formatado, email, data_nascimento, cpf,
+                data_consulta, hora_consulta, tipo_consulta, profissional, observacoes,
+                cadastrado_por, data_cadastro,
+                consentimento_whatsapp, data_consentimento, consentimento_obtido_por,
+                forma_consentimento, termos_versao
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, registros)
+
+        if termo is not None and any(p['consentimento'] for p in validos):
+            ids = [row[0] for row in conn.execute(
+                "SELECT id FROM pacientes WHERE id > ? ORDER BY id", (ultimo_id,)
+            )]
+            conn.executemany("""
+                INSERT INTO log_auditoria (usuario_id, acao, tabela, registro_id, dados_novos)
+                VALUES (?, 'consentimento_lgpd', 'pacientes', ?, ?)
+            """, [
+                (self.usuario_id, pid, f'Consentimento obtido de forma {FORMA_CONSENTIMENTO_PLANILHA}')
+                for pid, p in zip(ids, validos) if p['consentimento']
+            ])
+
+        return len(validos), atualizados, duplicados
+
+    def _atualizar(self, conn: sqlite3.Connection, pacientes: List[Dict]) -> int:
+        """
+        Atualiza consultas já cadastradas com os dados da planilha. Células
+        vazias mantêm o valor atual e linhas sem diferença não são gravadas
+        (uma reimportação da mesma agenda não gera alterações). Status e
+        consentimento não mudam.
+        """
+        cursor = conn.executemany("""
+            UPDATE pacientes SET
+                nome = ?2,
+                telefone = ?3,
+                email = COALESCE(?4, email),
+                data_nascimento = COALESCE(?5, data_nascimento),
+                cpf = COALESCE(?6, cpf),
+                hora_consulta = COALESCE(?7, hora_consulta),
+                tipo_consulta = COALESCE(?8, tipo_consulta),
+                profissional = COALESCE(?9, profissional),
+                observacoes = COALESCE(?10, observacoes)
+            WHERE id = ?1 AND (
+                nome IS NOT ?2 OR telefone IS NOT ?3
+                OR email IS NOT COALESCE(?4, email)
+                OR data_nascimento IS NOT COALESCE(?5, data_nascimento)
+                OR cpf IS NOT COALESCE(?6, cpf)
+                OR hora_consulta IS NOT COALESCE(?7, hora_consulta)
+                OR tipo_consulta IS NOT COALESCE(?8, tipo_consulta)
+                OR profissional IS NOT COALESCE(?9, profissional)
+                OR observacoes IS NOT COALESCE(?10, observacoes)
+            )
+        """, [
+            (p['id'], p['nome'], p['telefone'], p['email'], p['data_nascimento'], p['cpf'],
+             p['hora_consulta'], p['tipo_consulta'], p['profissional'], p['observacoes'])
+            for p in pacientes
+        ])
+        return cursor.rowcount
+
+    # ------------------------------------------------------------------
+    # Diário de importação (retomada)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def hash_arquivo(arquivo: str) -> str:
+        sha = hashlib.sha256()
+        with open(arquivo, 'rb') as f:
+            for bloco in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(bloco)
+        return sha.hexdigest()
+
+    def _abrir_diario(self, conn: sqlite3.Connection, arquivo: str, hash_arquivo: str,
+                      resultado: Dict) -> Tuple[int, int]:
+        """
+        Retorna (id no diário, última linha gravada). Uma importação do mesmo
+        arquivo que não terminou é retomada: os contadores continuam de onde
+        pararam e as linhas até o checkpoint não são lidas de novo.
+        """
+        row = conn.execute("""
+            SELECT id, ultima_linha, total, importados, atualizados, duplicados, erros
+            FROM importacoes
+            WHERE arquivo_hash = ? AND status != 'concluida'
+            ORDER BY id DESC
+            LIMIT 1
+        """, (hash_arquivo,)).fetchone()
+
+        if row:
+            diario_id, ultima_linha = row[0], row[1]
+            for chave, valor in zip(('total', 'importados', 'atualizados', 'duplicados', 'erros'), row[2:]):
+                resultado[chave] = valor
+            if ultima_linha > 1:
+                resultado['retomado_de'] = ultima_linha + 1
+            conn.execute("UPDATE importacoes SET status = 'em_andamento' WHERE id = ?", (diario_id,))
+        else:
+            diario_id = conn.execute("""
+                INSERT INTO importacoes (arquivo_hash, arquivo_nome, usuario_id)
+                VALUES (?, ?, ?)
+            """, (hash_arquivo, os.path.basename(arquivo), self.usuario_id)).lastrowid
+            ultima_linha = 1
+
+        conn.commit()
+        return diario_id, ultima_linha
+
+    def _registrar_diario(self, conn: sqlite3.Connection, diario_id: int, resultado: Dict,
+                          ultima_linha: Optional[int] = None, status: str = 'em_andamento'):
+        conn.execute("""
+            UPDATE importacoes SET
+                status = ?,
+                ultima_linha = COALESCE(?, ultima_linha),
+                total = ?, importados = ?, atualizados = ?, duplicados = ?, erros = ?,
+                atualizada_em = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (status, ultima_linha, resultado['total'], resultado['importados'], resultado['atualizados'],
+              resultado['duplicados'], resultado['erros'], diario_id))
+
+    def _a_partir_de(self, lotes: Iterator[Dict], ultima_linha: int) -> Iterator[Dict]:
+        """Descarta as linhas até `ultima_linha` (já gravadas numa execução anterior)"""
+        for lote in lotes:
+            corte = ultima_linha + 1 - lote['linha']
+            if corte >= lote['tamanho']:
+                continue
+            if corte > 0:
+                lote = {
+                    'linha': ultima_linha + 1,
+                    'colunas': {col: valores[corte:] for col, valores in lote['colunas'].items()},
+                    'tamanho': lote['tamanho'] - corte
+                }
+            yield lote
+
+    def importar(self, arquivo: str, progresso: Optional[Callable[[Dict], None]] = None,
+                 cancelar: Optional[threading.Event] = None,
+                 ao_rejeitar: Optional[Callable[[Dict, List[Tuple[int, str]]], None]] = None) -> Dict:
+        """
+        Importa o arquivo, com um commit por lote. Cada commit grava também
+        o checkpoint no diário (tabela importacoes): se a importação for
+        cancelada (`cancelar` sinalizado) ou falhar no meio, os lotes já
+        gravados permanecem e importar o mesmo arquivo de novo continua
+        da linha seguinte ('retomado_de' no resultado).
+        `ao_rejeitar(lote, rejeitados)` recebe as linhas recusadas de cada lote.
+        Levanta ImportacaoError se o arquivo não puder ser lido.
+        """
+        resultado = {'total': 0, 'importados': 0, 'atualizados': 0, 'duplicados': 0, 'erros': 0,
+                     'cancelado': False, 'retomado_de': None}
+        vistos = set()
+        hash_arquivo = self.hash_arquivo(arquivo)
+
+        conn = self._conectar()
+        executor = self._criar_executor()
+        try:
+            termo = self._versao_termo(conn)
+            chaves = self.carregar_chaves(conn) if self.atualizar_existentes or self.pular_duplicados else {}
+            diario_id, ultima_linha = self._abrir_diario(conn, arquivo, hash_arquivo, resultado)
+
+            try:
+                lotes = self._a_partir_de(self.ler_lotes(arquivo), ultima_linha)
+                for lote, validos, rejeitados in self._lotes_validados(lotes, executor):
+                    if cancelar is not None and cancelar.is_set():
+                        resultado['cancelado'] = True
+                        break
+
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        # Uma marca de recarga por lote no registro de alterações,
+                        # em vez de uma linha por paciente
+                        suspender_registro(conn)
+                        importados, atualizados, duplicados = self.gravar_lote(conn, validos, termo, chaves, vistos)
+                        retomar_registro(conn, recarregar=bool(importados or atualizados))
+
+                        resultado['total'] += lote['tamanho']
+                        resultado['importados'] += importados
+                        resultado['atualizados'] += atualizados
+                        resultado['duplicados'] += duplicados
+                        resultado['erros'] += len(rejeitados)
+
+                        # Checkpoint na mesma transação dos pacientes
+                        self._registrar_diario(conn, diario_id, resultado, lote['linha'] + lote['tamanho'] - 1)
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+
+                    if ao_rejeitar and rejeitados:
+                        ao_rejeitar(lote, rejeitados)
+                    if progresso:
+                        progresso(dict(resultado))
+
+            except Exception:
+                self._registrar_diario(conn, diario_id, resultado, status='falhou')
+                conn.commit()
+                raise
+
+            self._registrar_diario(conn, diario_id, resultado,
+                                   status='cancelada' if resultado['cancelado'] else 'concluida')
+            conn.commit()
+        finally:
+            conn.close()
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+        self.logger.info(
+            f"Usuario: {self.usuario_id} | Importação de {os.path.basename(arquivo)}"
+            f"{' (cancelada)' if resultado['cancelado'] else ''}"
+            f"{' retomada da linha ' + str(resultado['retomado_de']) if resultado['retomado_de'] else ''}: "
+            f"{resultado['importados']} importados, {resultado['atualizados']} atualizados, "
+            f"{resultado['duplicados']} duplicados, "
+            f"{resultado['erros']} erros"
+        )
+        return resultado
+
+
+class ImportJob:
+    """
+    Importação em segundo plano.
+
+    A thread publica eventos em `eventos` (queue.Queue), que a interface
+    consome com after(): {'tipo': 'progresso', 'resultado': {...}},
+    {'tipo': 'concluido', 'resultado': {...}, 'relatorio': caminho ou None}
+    e {'tipo': 'erro', 'mensagem': ...}. As linhas rejeitadas vão para um
+    CSV temporário (linha, motivo e valores originais), que pode ser salvo
+    com salvar_relatorio().
+    """
+
+    def __init__(self, importer: PatientImporter, arquivo: str):
+        self.importer = importer
+        self.arquivo = arquivo
+        self.eventos: "queue.Queue[Dict]" = queue.Queue()
+        self.relatorio: Optional[str] = None
+        self._cancelar = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._executar, daemon=True, name='ImportJob')
+        self._thread.start()
+
+    def cancelar(self):
+        """Interrompe antes do próximo lote; os lotes já gravados ficam"""
+        self._cancelar.set()
+
+    def em_andamento(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def aguardar(self, timeout: Optional[float] = None):
+        if self._thread:
+            self._thread.join(timeout)
+
+    def eventos_pendentes(self) -> List[Dict]:
+        eventos = []
+        while True:
+            try:
+                eventos.append(self.eventos.get_nowait())
+            except queue.Empty:
+                return eventos
+
+    def _executar(self):
+        descritor, caminho = tempfile.mkstemp(prefix='rejeitados_', suffix='.csv')
+
+        try:
+            # utf-8-sig: o Excel abre o relatório com os acentos corretos
+            with os.fdopen(descritor, 'w', newline='', encoding='utf-8-sig') as f:
+                writer = csv.writer(f)
+                writer.writerow(('linha', 'motivo') + COLUNAS)
+
+                def ao_rejeitar(lote, rejeitados):
+                    colunas = lote['colunas']
+                    for linha, motivo in rejeitados:
+                        i = linha - lote['linha']
+                        writer.writerow([linha, motivo] + [colunas[col][i] for col in COLUNAS])
+
+                resultado = self.importer.importar(
+                    self.arquivo,
+                    progresso=lambda parcial: self.eventos.put({'tipo': 'progresso', 'resultado': parcial}),
+                    cancelar=self._cancelar,
+                    ao_rejeitar=ao_rejeitar
+                )
+        except ImportacaoError as e:
+            os.remove(caminho)
+            self.eventos.put({'tipo': 'erro', 'mensagem': str(e)})
+            return
+        except Exception as e:
+            os.remove(caminho)
+            self.importer.logger.error(f"Erro durante importação: {str(e)}")
+            self.eventos.put({'tipo': 'erro', 'mensagem': f"Erro durante importação: {str(e)}"})
+            return
+
+        if resultado['erros']:
+            self.relatorio = caminho
+        else:
+            os.remove(caminho)
+
+        self.eventos.put({'tipo': 'concluido', 'resultado': resultado, 'relatorio': self.relatorio})
+
+    def salvar_relatorio(self, destino: str):
+        shutil.copyfile(self.relatorio, destino)
+
+    def descartar_relatorio(self):
+        if self.relatorio and os.path.exists(self.relatorio):
+            os.remove(self.relatorio)
+        self.relatorio = None
@@ -0,0 +1,143 @@
+"""
+Registro de envios
+Um envio atualiza o paciente, o histórico de mensagens e o controle de
+limites numa única transação, protegida por uma chave de idempotência:
+registrar o mesmo envio de novo (clique duplo, nova tentativa após erro)
+não gera outra linha no histórico nem conta duas vezes no limite diário.
+"""
+
+import logging
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+from backend.connection import get_connection
+from backend.limits import rate_limiter, MICROSSEGUNDOS
+from backend.messaging import MessageManager
+
+
+class SendLedger:
+    """
+    Grava o envio de uma mensagem a um paciente.
+
+    BEGIN IMMEDIATE reserva a escrita antes da leitura do paciente, então
+    duas estações enviando ao mesmo tempo são serializadas pelo SQLite; o
+    controle_envio é atualizado com UPSERT, sem ler o contador antes.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.logger = logging.getLogger('SendLedger')
+
+    @staticmethod
+    def nova_tentativa() -> str:
+        """
+        Identificador de uma tentativa de envio. Quem envia gera um por envio
+        e o repete ao registrar de novo o mesmo envio (clique duplo, nova
+        tentativa após erro); um envio posterior usa outro.
+        """
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def chave_envio(paciente_id: int, tentativa: str) -> str:
+        """Chave de idempotência: paciente + tentativa de envio"""
+        return f'{paciente_id}:{tentativa}'
+
+    def registrar_envio(self, paciente_id: int, mensagem: str, usuario_id: int,
+                        tentativa: Optional[str] = None) -> Dict:
+        """
+        Registra o envio (status do paciente, histórico e controle de limites).
+
+        `tentativa` vem de nova_tentativa(); sem ela, cada chamada é um envio
+        novo. Retorna dict com 'success', 'duplicado' (envio já registrado
+        com a mesma tentativa; nada é gravado), 'tipo_mensagem' e 'message'.
+        """
+        conn = get_connection(self.db_path)
+        if conn.in_transaction:
+            # BEGIN falharia, e o commit abaixo gravaria junto o que outra
+            # rotina desta thread deixou pendente na conexão compartilhada
+            self.logger.error(f"Envio do paciente {paciente_id} não registrado: transação pendente na conexão")
+            return {'success': False, 'duplicado': False,
+                    'message': 'Erro ao registrar envio: há outra gravação em andamento'}
+
+        agora = datetime.now()
+
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+
+            row = conn.execute("""
+                SELECT telefone, status, fase_conversa, data_preparo, mensagem_preparada_id
+                FROM pacientes WHERE id = ?
+            """, (paciente_id,)).fetchone()
+
+            if not row:
+                conn.rollback()
+                return {'success': False, 'duplicado': False, 'message': 'Paciente não encontrado'}
+
+            telefone, status, fase_conversa, data_preparo, mensagem_id = row
+
+            # Tipo com que a mensagem foi preparada (o status muda a seguir)
+            if status == 'mensagem_preparada' and fase_conversa:
+                tipo_mensagem = fase_conversa
+            else:
+                tipo_mensagem = MessageManager.tipo_por_status(status)
+
+            chave = self.chave_envio(paciente_id, tentativa or self.nova_tentativa())
+
+            cursor = conn.execute("""
+                INSERT INTO historico_mensagens
+                (paciente_id, mensagem_id, mensagem_texto, tipo_mensagem, data_preparacao,
+                 data_envio, enviado_por, status_envio, chave_envio)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'enviada', ?)
+                ON CONFLICT(chave_envio) WHERE chave_envio IS NOT NULL DO NOTHING
+            """, (
+                paciente_id, mensagem_id, mensagem, tipo_mensagem,
+                data_preparo or agora, agora, usuario_id, chave
+            ))
+
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return {
+                    'success': True,
+                    'duplicado': True,
+                    'tipo_mensagem': tipo_mensagem,
+                    'message': 'Envio já registrado'
+                }
+
+            conn.execute("""
+                UPDATE pacientes
+                SET status = 'mensagem_enviada',
+                    data_envio = ?,
+                    tentativas_contato = tentativas_contato + 1,
+                    ultima_tentativa = ?
+                WHERE id = ?
+            """, (agora, agora, paciente_id))
+
+            conn.execute("""
+                INSERT INTO controle_envio
+                (data, numero_telefone, tipo_mensagem, total_enviado, ultimo_envio, usuario_id)
+                VALUES (?, ?, ?, 1, ?, ?)
+                ON CONFLICT(data, numero_telefone) DO UPDATE SET
+                    total_enviado = total_enviado + 1,
+                    ultimo_envio = excluded.ultimo_envio,
+                    usuario_id = excluded.usuario_id
+            """, (agora.date().isoformat(), telefone, tipo_mensagem, agora.isoformat(), usuario_id))
+
+            conn.commit()
+
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            self.logger.error(f"Erro ao registrar envio do paciente {paciente_id}: {str(e)}")
+            return {'success': False, 'duplicado': False, 'message': f'Erro ao registrar envio: {str(e)}'}
+        finally:
+            conn.close()
+
+        # Já gravado: o limitador só precisa contar em memória
+        rate_limiter.contabilizar(self.db_path, telefone, tipo_mensagem, int(agora.timestamp() * MICROSSEGUNDOS))
+
+        return {
+            'success': True,
+            'duplicado': False,
+            'tipo_mensagem': tipo_mensagem,
+            'message': 'Envio registrado'
+        }
@@ -1,13 +1,13 @@
-import sqlite3
 from datetime import datetime
 from typing import Dict, Optional
+from backend.connection import get_connection
 
 class LGPDManager:
     def __init__(self, db_path: str):
         self.db_path = db_path
     
     def _get_connection(self):
-        return sqlite3.connect(self.db_path, timeout=10)
+        return get_connection(self.db_path)
     
     def registrar_consentimento(self, paciente_id: int, forma: str,
                                usuario_id: int, observacoes: str = '') -> Dict:
@@ -136,7 +136,7 @@ class LGPDManager:
         return result[0] if result else None
     
     def gerar_relatorio_consentimentos(self, data_inicio: str, data_fim: str) -> Dict:
-        """Gera relatório de consentimentos por período"""
+        """Gera relatório de consentimentos por período (datas ISO, fim inclusivo)"""
         conn = self._get_connection()
         cursor = conn.cursor()
         
@@ -147,7 +147,7 @@ class LGPDManager:
                 SUM(CASE WHEN consentimento_whatsapp = 1 THEN 1 ELSE 0 END) as com_consentimento,
                 SUM(CASE WHEN consentimento_whatsapp = 0 THEN 1 ELSE 0 END) as sem_consentimento
             FROM pacientes
-            WHERE data_consentimento BETWEEN ? AND ?
+            WHERE data_consentimento >= ? AND data_consentimento < date(?, '+1 day')
         """, (data_inicio, data_fim))
         
         total_row = cursor.fetchone()
@@ -161,7 +161,7 @@ class LGPDManager:
                 forma_consentimento,
                 COUNT(*) as qtd
             FROM pacientes
-            WHERE data_consentimento BETWEEN ? AND ? 
+            WHERE data_consentimento >= ? AND data_consentimento < date(?, '+1 day')
                 AND forma_consentimento IS NOT NULL
             GROUP BY forma_consentimento
         """, (data_inicio, data_fim))
@@ -1,137 +1,399 @@
-import sqlite3
-from datetime import datetime, date, timedelta
-from typing import Dict, Tuple
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime, date
+from typing import Dict, NamedTuple, Optional, Tuple
+from backend.connection import get_connection
+
+# Valores usados quando o limite não está em limites_sistema
+LIMITES_PADRAO = {
+    'max_primeiros_contatos_dia': 30,
+    'intervalo_minimo_segundos': 120,
+    'max_tentativas_paciente': 3,
+}
+
+# Tipos de mensagem sujeitos ao teto diário global
+TIPOS_COM_TETO_DIARIO = ('primeiro_contato',)
+
+MICROSSEGUNDOS = 1_000_000
+
+
+def _agora_us() -> int:
+    return time.time_ns() // 1000
+
+
+def _dia(instante_us: int) -> str:
+    return date.fromtimestamp(instante_us / MICROSSEGUNDOS).isoformat()
+
+
+def _proxima_meia_noite_us(instante_us: int) -> int:
+    dia = date.fromtimestamp(instante_us / MICROSSEGUNDOS)
+    meia_noite = datetime.fromordinal(dia.toordinal() + 1)
+    return int(meia_noite.timestamp() * MICROSSEGUNDOS)
+
+
+class DecisaoEnvio(NamedTuple):
+    """Resposta do limitador: se pode enviar e, se não, em quantos µs tentar de novo"""
+    permitido: bool
+    retry_after_us: int
+    motivo: str
+
+
+class RateLimiter:
+    """
+    Limites de envio mantidos em memória.
+
+    Por número: janela do dia (max_tentativas_paciente) e intervalo mínimo
+    entre envios (intervalo_minimo_segundos). Global: teto diário de
+    primeiros contatos. O estado é carregado de limites_sistema e do
+    controle_envio do dia; os envios registrados são gravados em segundo
+    plano a cada INTERVALO_GRAVACAO segundos (e ao encerrar), e o estado é
+    ressincronizado com o banco para incluir envios de outras estações.
+    """
+
+    INTERVALO_GRAVACAO = 2.0
+    INTERVALO_SINCRONIZACAO = 30.0
+
+    def __init__(self):
+        self.logger = logging.getLogger('RateLimiter')
+        self._lock = threading.Lock()
+        self._lock_gravacao = threading.Lock()  # gravação e releitura não se intercalam
+        self._bancos: Dict[str, Dict] = {}
+        self._evento = threading.Event()
+        self._thread = None
+
+    def _chave(self, db_path: str) -> str:
+        return db_path if db_path == ':memory:' else os.path.abspath(db_path)
+
+    def _estado(self, db_path: str, agora_us: int) -> Dict:
+        """Estado do banco (com o lock adquirido), carregando ou virando o dia se preciso"""
+        chave = self._chave(db_path)
+        estado = self._bancos.get(chave)
+
+        if estado is None:
+            estado = self._bancos[chave] = {
+                'db_path': db_path,
+                'limites': self._ler_limites(db_path),
+                'pendentes': {},
+                'sincronizado_em': 0.0,
+            }
+            self._ler_envios(estado, _dia(agora_us))
+            estado['sincronizado_em'] = time.monotonic()
+        elif estado['data'] != _dia(agora_us):
+            # Virada do dia: as janelas diárias recomeçam vazias
+            estado['data'] = _dia(agora_us)
+            estado['numeros'] = {}
+            estado['por_tipo'] = {}
+
+        return estado
+
+    def _ler_limites(self, db_path: str) -> Dict[str, int]:
+        conn = get_connection(db_path)
+        rows = conn.execute(
+            "SELECT tipo_limite, valor_limite FROM limites_sistema WHERE ativo = 1"
+        ).fetchall()
+        conn.close()
+
+        limites = dict(LIMITES_PADRAO)
+        limites.update({tipo: int(valor) for tipo, valor in rows})
+        return limites
+
+    def _ler_envios(self, estado: Dict, hoje: str):
+        conn = get_connection(estado['db_path'])
+        rows = conn.execute("""
+            SELECT numero_telefone, tipo_mensagem, total_enviado, ultimo_envio
+            FROM controle_envio
+            WHERE data = ?
+        """, (hoje,)).fetchall()
+        conn.close()
+
+        numeros = {}
+        por_tipo: Dict[str, int] = {}
+        for telefone, tipo, total, ultimo_envio in rows:
+            ultimo_us = int(datetime.fromisoformat(ultimo_envio).timestamp() * MICROSSEGUNDOS) if ultimo_envio else 0
+            numeros[telefone] = {'tipo': tipo, 'total': total or 0, 'ultimo_us': ultimo_us}
+            por_tipo[tipo] = por_tipo.get(tipo, 0) + (total or 0)
+
+        # Envios ainda não gravados continuam valendo
+        for (dia, telefone), pendente in estado['pendentes'].items():
+            if dia != hoje:
+                continue
+            numero = numeros.setdefault(telefone, {'tipo': pendente['tipo'], 'total': 0, 'ultimo_us': 0})
+            numero['total'] += pendente['incremento']
+            numero['ultimo_us'] = max(numero['ultimo_us'], pendente['ultimo_us'])
+            por_tipo[numero['tipo']] = por_tipo.get(numero['tipo'], 0) + pendente['incremento']
+
+        estado['data'] = hoje
+        estado['numeros'] = numeros
+        estado['por_tipo'] = por_tipo
+
+    def carregar(self, db_path: str):
+        """Carrega (ou recarrega) limites e envios do dia e inicia a gravação em segundo plano"""
+        with self._lock:
+            self._bancos.pop(self._chave(db_path), None)
+            self._estado(db_path, _agora_us())
+        self._iniciar()
+
+    def recarregar_limites(self, db_path: str):
+        """Relê limites_sistema (após alterar as configurações)"""
+        limites = self._ler_limites(db_path)
+        with self._lock:
+            estado = self._bancos.get(self._chave(db_path))
+            if estado is not None:
+                estado['limites'] = limites
+
+    def verificar_diario(self, db_path: str, tipo_mensagem: str = 'primeiro_contato',
+                         agora_us: Optional[int] = None) -> DecisaoEnvio:
+        """Teto diário global do tipo de mensagem"""
+        agora_us = agora_us or _agora_us()
+        with self._lock:
+            estado = self._estado(db_path, agora_us)
+            return self._verificar_diario(estado, tipo_mensagem, agora_us)
+
+    def verificar_numero(self, db_path: str, telefone: str,
+                         agora_us: Optional[int] = None) -> DecisaoEnvio:
+        """Janela diária e intervalo mínimo do número"""
+        agora_us = agora_us or _agora_us()
+        with self._lock:
+            estado = self._estado(db_path, agora_us)
+            return self._verificar_numero(estado, telefone, agora_us)
+
+    def verificar(self, db_path: str, telefone: str, tipo_mensagem: str,
+                  agora_us: Optional[int] = None) -> DecisaoEnvio:
+        """Combina o teto global e os limites do número"""
+        agora_us = agora_us or _agora_us()
+        with self._lock:
+            estado = self._estado(db_path, agora_us)
+            decisao = self._verificar_diario(estado, tipo_mensagem, agora_us)
+            if decisao.permitido:
+                decisao = self._verificar_numero(estado, telefone, agora_us)
+            return decisao
+
+    def situacao(self, db_path: str, agora_us: Optional[int] = None) -> Dict:
+        """Cópia do estado do dia: 'limites', envios 'por_tipo' e por número ('numeros')"""
+        agora_us = agora_us or _agora_us()
+        with self._lock:
+            estado = self._estado(db_path, agora_us)
+            return {
+                'data': estado['data'],
+                'limites': dict(estado['limites']),
+                'por_tipo': dict(estado['por_tipo']),
+                'numeros': {tel: dict(n) for tel, n in estado['numeros'].items()},
+            }
+
+    def _verificar_diario(self, estado: Dict, tipo_mensagem: str, agora_us: int) -> DecisaoEnvio:
+        limite = estado['limites']['max_primeiros_contatos_dia']
+        total = estado['por_tipo'].get(tipo_mensagem, 0)
+
+        if tipo_mensagem in TIPOS_COM_TETO_DIARIO and total >= limite:
+            return DecisaoEnvio(
+                False, _proxima_meia_noite_us(agora_us) - agora_us,
+                f'Limite diário atingido ({total}/{limite}). Aguarde até amanhã.'
+            )
+
+        return DecisaoEnvio(True, 0, f'{limite - total} envios restantes hoje')
+
+    def _verificar_numero(self, estado: Dict, telefone: str, agora_us: int) -> DecisaoEnvio:
+        numero = estado['numeros'].get(telefone)
+        if numero is None:
+            return DecisaoEnvio(True, 0, 'Pode enviar')
+
+        max_tentativas = estado['limites']['max_tentativas_paciente']
+        if numero['total'] >= max_tentativas:
+            return DecisaoEnvio(
+                False, _proxima_meia_noite_us(agora_us) - agora_us,
+                f"Número já contatado {numero['total']} vezes hoje. Limite: {max_tentativas}"
+            )
+
+        intervalo_us = estado['limites']['intervalo_minimo_segundos'] * MICROSSEGUNDOS
+        espera_us = numero['ultimo_us'] + intervalo_us - agora_us
+        if espera_us > 0:
+            return DecisaoEnvio(
+                False, espera_us,
+                f'Aguarde {-(-espera_us // MICROSSEGUNDOS)} segundos para contatar este número novamente'
+            )
+
+        return DecisaoEnvio(True, 0, 'Pode enviar')
+
+    def registrar(self, db_path: str, telefone: str, tipo_mensagem: str, usuario_id: Optional[int],
+                  agora_us: Optional[int] = None):
+        """Contabiliza o envio em memória; a gravação em controle_envio é assíncrona"""
+        agora_us = agora_us or _agora_us()
+        with self._lock:
+            estado = self._estado(db_path, agora_us)
+            self._contar(estado, telefone, tipo_mensagem, agora_us)
+
+            pendente = estado['pendentes'].setdefault(
+                (estado['data'], telefone), {'tipo': tipo_mensagem, 'incremento': 0}
+            )
+            pendente['incremento'] += 1
+            pendente['ultimo_us'] = agora_us
+            pendente['usuario_id'] = usuario_id
+
+        self._iniciar()
+        self._evento.set()
+
+    def contabilizar(self, db_path: str, telefone: str, tipo_mensagem: str,
+                     agora_us: Optional[int] = None):
+        """Contabiliza em memória um envio já gravado em controle_envio (ver SendLedger)"""
+        agora_us = agora_us or _agora_us()
+        with self._lock:
+            self._contar(self._estado(db_path, agora_us), telefone, tipo_mensagem, agora_us)
+
+    def _contar(self, estado: Dict, telefone: str, tipo_mensagem: str, agora_us: int):
+        numero = estado['numeros'].setdefault(telefone, {'tipo': tipo_mensagem, 'total': 0, 'ultimo_us': 0})
+        numero['total'] += 1
+        numero['ultimo_us'] = agora_us
+        estado['por_tipo'][numero['tipo']] = estado['por_tipo'].get(numero['tipo'], 0) + 1
+
+    def descarregar(self, db_path: Optional[str] = None):
+        """Grava já os envios pendentes (de um banco ou de todos)"""
+        with self._lock:
+            if db_path is None:
+                estados = list(self._bancos.values())
+            else:
+                estados = [e for e in (self._bancos.get(self._chave(db_path)),) if e is not None]
+
+        for estado in estados:
+            self._gravar(estado)
+
+    def _gravar(self, estado: Dict) -> bool:
+        with self._lock_gravacao:
+            return self._gravar_pendentes(estado)
+
+    def _gravar_pendentes(self, estado: Dict) -> bool:
+        with self._lock:
+            pendentes, estado['pendentes'] = estado['pendentes'], {}
+
+        if not pendentes:
+            return False
+
+        conn = get_connection(estado['db_path'])
+        try:
+            conn.executemany("""
+                INSERT INTO controle_envio
+                (data, numero_telefone, tipo_mensagem, total_enviado, ultimo_envio, usuario_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(data, numero_telefone) DO UPDATE SET
+                    total_enviado = total_enviado + excluded.total_enviado,
+                    ultimo_envio = excluded.ultimo_envio,
+                    usuario_id = excluded.usuario_id
+            """, [
+                (dia, telefone, p['tipo'], p['incremento'],
+                 datetime.fromtimestamp(p['ultimo_us'] / MICROSSEGUNDOS).isoformat(), p['usuario_id'])
+                for (dia, telefone), p in pendentes.items()
+            ])
+            conn.commit()
+        except Exception:
+            # Devolve à fila para a próxima tentativa
+            with self._lock:
+                for chave, p in pendentes.items():
+                    atual = estado['pendentes'].get(chave)
+                    if atual is None:
+                        estado['pendentes'][chave] = p
+                    else:
+                        atual['incremento'] += p['incremento']
+            raise
+        finally:
+            conn.close()
+
+        return True
+
+    def _sincronizar(self, estado: Dict):
+        with self._lock_gravacao:
+            limites = self._ler_limites(estado['db_path'])
+            with self._lock:
+                estado['limites'] = limites
+                self._ler_envios(estado, _dia(_agora_us()))
+                estado['sincronizado_em'] = time.monotonic()
+
+    def _iniciar(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, daemon=True, name='RateLimiter')
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            self._evento.wait(timeout=self.INTERVALO_GRAVACAO)
+            self._evento.clear()
+            # Agrupa os envios dos próximos instantes numa única gravação
+            time.sleep(self.INTERVALO_GRAVACAO / 4)
+
+            with self._lock:
+                estados = list(self._bancos.values())
+
+            for estado in estados:
+                try:
+                    gravou = self._gravar(estado)
+                    if gravou or time.monotonic() - estado['sincronizado_em'] > self.INTERVALO_SINCRONIZACAO:
+                        self._sincronizar(estado)
+                except Exception as e:
+                    self.logger.error(f"Erro ao gravar controle de envios: {str(e)}")
+
+    def limpar(self):
+        """Descarta todo o estado em memória (sem gravar)"""
+        with self._lock:
+            self._bancos.clear()
+
+
+rate_limiter = RateLimiter()
+
+
+@atexit.register
+def _gravar_ao_sair():
+    try:
+        rate_limiter.descarregar()
+    except Exception:
+        pass
+
 
 class LimitsController:
     def __init__(self, db_path: str):
         self.db_path = db_path
-    
+
     def _get_connection(self):
-        return sqlite3.connect(self.db_path, timeout=10)
-    
+        return get_connection(self.db_path)
+
     def verificar_limite_diario(self, tipo_mensagem: str = 'primeiro_contato') -> Tuple[bool, str]:
         """Verifica se limite diário foi atingido"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        # Obter limite configurado
-        cursor.execute("""
-            SELECT valor_limite FROM limites_sistema
-            WHERE tipo_limite = 'max_primeiros_contatos_dia'
-        """)
-        
-        limite_maximo = cursor.fetchone()[0]
-        
-        # Contar envios de hoje
-        hoje = date.today().isoformat()
-        cursor.execute("""
-            SELECT COALESCE(SUM(total_enviado), 0)
-            FROM controle_envio
-            WHERE data = ? AND tipo_mensagem = ?
-        """, (hoje, tipo_mensagem))
-        
-        total_hoje = cursor.fetchone()[0]
-        conn.close()
-        
-        if total_hoje >= limite_maximo:
-            return False, f'Limite diário atingido ({total_hoje}/{limite_maximo}). Aguarde até amanhã.'
-        
-        restantes = limite_maximo - total_hoje
-        return True, f'{restantes} envios restantes hoje'
-    
+        decisao = rate_limiter.verificar_diario(self.db_path, tipo_mensagem)
+        return decisao.permitido, decisao.motivo
+
     def verificar_limite_por_numero(self, telefone: str) -> Tuple[bool, str]:
         """Verifica quantas vezes um número já foi contatado hoje"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        hoje = date.today().isoformat()
-        
-        cursor.execute("""
-            SELECT total_enviado, ultimo_envio
-            FROM controle_envio
-            WHERE data = ? AND numero_telefone = ?
-        """, (hoje, telefone))
-        
-        result = cursor.fetchone()
-        
-        # Obter limite de tentativas
-        cursor.execute("""
-            SELECT valor_limite FROM limites_sistema
-            WHERE tipo_limite = 'max_tentativas_paciente'
-        """)
-        
-        max_tentativas = cursor.fetchone()[0]
-        conn.close()
-        
-        if result:
-            total_enviado, ultimo_envio = result
-            
-            if total_enviado >= max_tentativas:
-                return False, f'Número já contatado {total_enviado} vezes hoje. Limite: {max_tentativas}'
-            
-            # Verificar intervalo mínimo
-            if ultimo_envio:
-                ultimo = datetime.fromisoformat(ultimo_envio)
-                intervalo = (datetime.now() - ultimo).total_seconds()
-                
-                if intervalo < 120:  # 2 minutos
-                    return False, f'Aguarde {int(120 - intervalo)} segundos para contatar este número novamente'
-        
-        return True, 'Pode enviar'
-    
+        decisao = rate_limiter.verificar_numero(self.db_path, telefone)
+        return decisao.permitido, decisao.motivo
+
+    def verificar_envio(self, telefone: str, tipo_mensagem: str) -> DecisaoEnvio:
+        """Decisão completa (teto diário + número), com retry_after_us"""
+        return rate_limiter.verificar(self.db_path, telefone, tipo_mensagem)
+
     def registrar_envio(self, telefone: str, tipo_mensagem: str, usuario_id: int) -> Dict:
         """Registra envio no controle de limites"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        hoje = date.today().isoformat()
-        agora = datetime.now().isoformat()
-        
         try:
-            # Verificar se já existe registro hoje para este número
-            cursor.execute("""
-                SELECT id, total_enviado FROM controle_envio
-                WHERE data = ? AND numero_telefone = ?
-            """, (hoje, telefone))
-            
-            result = cursor.fetchone()
-            
-            if result:
-                # Atualizar contador
-                registro_id, total = result
-                cursor.execute("""
-                    UPDATE controle_envio
-                    SET total_enviado = ?,
-                        ultimo_envio = ?,
-                        usuario_id = ?
-                    WHERE id = ?
-                """, (total + 1, agora, usuario_id, registro_id))
-            else:
-                # Criar novo registro
-                cursor.execute("""
-                    INSERT INTO controle_envio 
-                    (data, numero_telefone, tipo_mensagem, total_enviado, ultimo_envio, usuario_id)
-                    VALUES (?, ?, ?, 1, ?, ?)
-                """, (hoje, telefone, tipo_mensagem, agora, usuario_id))
-            
-            conn.commit()
-            
+            rate_limiter.registrar(self.db_path, telefone, tipo_mensagem, usuario_id)
             return {'success': True, 'message': 'Envio registrado'}
-        
         except Exception as e:
             return {'success': False, 'message': f'Erro ao registrar: {str(e)}'}
-        finally:
-            conn.close()
-    
+
     def obter_estatisticas_dia(self) -> Dict:
         """Retorna estatísticas de envios do dia"""
+        # Envios ainda em memória entram na contagem
+        rate_limiter.descarregar(self.db_path)
+
         conn = self._get_connection()
         cursor = conn.cursor()
-        
+
         hoje = date.today().isoformat()
-        
+
         cursor.execute("""
-            SELECT 
+            SELECT
                 tipo_mensagem,
                 SUM(total_enviado) as total,
                 COUNT(DISTINCT numero_telefone) as numeros_unicos
@@ -139,19 +401,19 @@ class LimitsController:
             WHERE data = ?
             GROUP BY tipo_mensagem
         """, (hoje,))
-        
+
         resultados = cursor.fetchall()
         conn.close()
-        
+
         stats = {
             'data': hoje,
             'por_tipo': {}
         }
-        
+
         for tipo, total, unicos in resultados:
             stats['por_tipo'][tipo] = {
                 'total_envios': total,
                 'numeros_unicos': unicos
             }
-        
-        return stats
\ No newline at end of file
+
+        return stats
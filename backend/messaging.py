@@ -1,15 +1,361 @@
-import sqlite3
+import os
 import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional, Dict
+from functools import lru_cache
+from typing import Optional, Dict, List, Tuple
+from backend.connection import get_connection
+from backend.dates import para_iso, para_exibicao
+
+DIAS_SEMANA = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
+
+# Variáveis aceitas nos templates; qualquer outra chave é texto literal
+VARIAVEIS = ('data', 'dia_semana', 'hora', 'nome', 'tipo', 'profissional')
+_PADRAO_VARIAVEL = re.compile(r'\{(' + '|'.join(VARIAVEIS) + r')\}')
+
+
+class _ValoresTemplate(dict):
+    """Variável sem valor permanece no texto como {variavel}"""
+
+    def __missing__(self, chave):
+        return '{' + chave + '}'
+
+
+@lru_cache(maxsize=4096)
+def _formatar_data(valor: str) -> Optional[Tuple[str, str]]:
+    """(DD/MM/YYYY, dia da semana) da data da consulta; None se irreconhecível"""
+    try:
+        data_obj = datetime.strptime(para_iso(valor), '%Y-%m-%d')
+    except (ValueError, TypeError):
+        return None
+
+    return data_obj.strftime('%d/%m/%Y'), DIAS_SEMANA[data_obj.weekday()]
+
+
+class TemplateCompilado:
+    """
+    Template pré-processado em trechos literais e variáveis.
+
+    Os trechos viram uma string de formato (chaves literais escapadas), de
+    modo que renderizar é uma única passada de str.format_map.
+    """
+
+    __slots__ = ('texto', 'segmentos', '_formato')
+
+    def __init__(self, texto: str):
+        self.texto = texto
+        self.segmentos: List[Tuple[str, Optional[str]]] = []  # (literal, variavel seguinte)
+
+        inicio = 0
+        for match in _PADRAO_VARIAVEL.finditer(texto):
+            self.segmentos.append((texto[inicio:match.start()], match.group(1)))
+            inicio = match.end()
+        self.segmentos.append((texto[inicio:], None))
+
+        self._formato = ''.join(
+            literal.replace('{', '{{').replace('}', '}}') + ('{' + variavel + '}' if variavel else '')
+            for literal, variavel in self.segmentos
+        )
+
+    def renderizar(self, dados: Dict) -> str:
+        return self._formato.format_map(valores_template(dados)).strip()
+
+
+@lru_cache(maxsize=2048)
+def compilar_template(texto: str) -> TemplateCompilado:
+    """Compila o template uma única vez por texto distinto"""
+    return TemplateCompilado(texto)
+
+
+def valores_template(dados: Dict) -> Dict[str, str]:
+    """Valores das variáveis para os dados do paciente"""
+    valores = _ValoresTemplate()
+
+    # Data e dia da semana
+    if dados.get('data_consulta'):
+        formatada = _formatar_data(str(dados['data_consulta']))
+        if formatada:
+            valores['data'], valores['dia_semana'] = formatada
+        else:
+            # Data inválida ou formato desconhecido, usar valor original
+            valores['data'] = str(dados['data_consulta'])
+            valores['dia_semana'] = 'o dia'
+    else:
+        valores['data'] = 'hoje'
+        valores['dia_semana'] = 'hoje'
+
+    # Hora
+    valores['hora'] = str(dados['hora_consulta'])[:5] if dados.get('hora_consulta') else 'agora'
+
+    # Nome (usar apenas primeiro nome para ser mais pessoal)
+    if dados.get('nome'):
+        partes = dados['nome'].split()
+        if partes:
+            valores['nome'] = partes[0]
+
+    # Tipo de consulta/exame e profissional
+    if dados.get('tipo_consulta'):
+        valores['tipo'] = dados['tipo_consulta']
+
+    if dados.get('profissional'):
+        valores['profissional'] = dados['profissional']
+
+    return valores
+
+
+class TemplateCache:
+    """
+    Banco de templates ativos em memória, agrupado por tipo.
+
+    Carregado inteiro na primeira consulta. Alterações feitas nesta estação
+    chamam invalidar(); as de outras estações são percebidas pelo contador
+    versoes_dados['mensagens'] (mantido por triggers), consultado no máximo
+    a cada INTERVALO_VERIFICACAO segundos.
+    """
+
+    INTERVALO_VERIFICACAO = 5.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bancos: Dict[str, Dict] = {}
+
+    def _chave(self, db_path: str) -> str:
+        return db_path if db_path == ':memory:' else os.path.abspath(db_path)
+
+    def _ler_versao(self, conn: sqlite3.Connection) -> Optional[int]:
+        try:
+            row = conn.execute(
+                "SELECT versao FROM versoes_dados WHERE tabela = 'mensagens'"
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return None  # Banco sem a migração: vale só a invalidação local
+        return row[0] if row else None
+
+    def obter(self, db_path: str, tipo: str) -> List[Tuple[int, str]]:
+        """Retorna [(id, texto)] dos templates ativos do tipo"""
+        chave = self._chave(db_path)
+        agora = time.monotonic()
+
+        with self._lock:
+            entrada = self._bancos.get(chave)
+
+            if entrada is not None and agora - entrada['verificado_em'] > self.INTERVALO_VERIFICACAO:
+                conn = get_connection(db_path)
+                versao = self._ler_versao(conn)
+                conn.close()
+
+                if versao != entrada['versao']:
+                    entrada = None
+                else:
+                    entrada['verificado_em'] = agora
+
+            if entrada is None:
+                entrada = self._bancos[chave] = self._carregar(db_path, agora)
+
+            return entrada['tipos'].get(tipo, [])
+
+    def _carregar(self, db_path: str, agora: float) -> Dict:
+        conn = get_connection(db_path)
+        versao = self._ler_versao(conn)
+
+        tipos: Dict[str, List[Tuple[int, str]]] = {}
+        for mid, tipo, texto in conn.execute(
+            "SELECT id, tipo, texto FROM mensagens WHERE ativo = 1 ORDER BY id"
+        ):
+            tipos.setdefault(tipo, []).append((mid, texto))
+
+        conn.close()
+        return {'versao': versao, 'verificado_em': agora, 'tipos': tipos}
+
+    def invalidar(self, db_path: Optional[str] = None):
+        """Descarta o cache (de um banco ou de todos)"""
+        with self._lock:
+            if db_path is None:
+                self._bancos.clear()
+            else:
+                self._bancos.pop(self._chave(db_path), None)
+
+
+# Instância global do processo
+template_cache = TemplateCache()
+
+
+class RepetitionMemory:
+    """
+    Templates já usados por paciente, para não repetir textos.
+
+    LRU limitada a `capacidade` pacientes, então a memória não cresce com o
+    tempo de uso; quem sai dela é relido do histórico (mensagem_id) na
+    próxima escolha. A escolha usa uma sacola embaralhada por tipo: os
+    templates ainda não usados são embaralhados uma vez e retirados do fim,
+    O(1) por escolha. Esgotada a sacola, começa nova rodada sem repetir o
+    último texto enviado.
+    """
+
+    CAPACIDADE = 5000
+
+    def __init__(self, capacidade: Optional[int] = None):
+        self.capacidade = capacidade or self.CAPACIDADE
+        self._lock = threading.Lock()
+        self._pacientes: 'OrderedDict[Tuple[str, int], Dict]' = OrderedDict()
+
+    def _chave(self, db_path: str, paciente_id: int) -> Tuple[str, int]:
+        return (db_path if db_path == ':memory:' else os.path.abspath(db_path), paciente_id)
+
+    def _nova_entrada(self, usados) -> Dict:
+        return {'usados': set(usados), 'ultimo': {}, 'sacolas': {}}
+
+    def _guardar(self, chave: Tuple[str, int], entrada: Dict):
+        self._pacientes[chave] = entrada
+        self._pacientes.move_to_end(chave)
+        while len(self._pacientes) > self.capacidade:
+            self._pacientes.popitem(last=False)
+
+    def carregar(self, db_path: str) -> int:
+        """
+        Reconstrói a memória a partir do histórico, com os pacientes que
+        receberam mensagem mais recentemente. Retorna quantos foram carregados.
+        """
+        conn = get_connection(db_path)
+        try:
+            rows = conn.execute("""
+                SELECT h.paciente_id, h.mensagem_id
+                FROM historico_mensagens h
+                JOIN (
+                    SELECT paciente_id, MAX(id) AS ultimo
+                    FROM historico_mensagens
+                    WHERE mensagem_id IS NOT NULL
+                    GROUP BY paciente_id
+                    ORDER BY ultimo DESC
+                    LIMIT ?
+                ) recentes ON recentes.paciente_id = h.paciente_id
+                WHERE h.mensagem_id IS NOT NULL
+                ORDER BY recentes.ultimo, h.id
+            """, (self.capacidade,)).fetchall()
+        finally:
+            conn.close()
+
+        usados: 'OrderedDict[int, List[int]]' = OrderedDict()
+        for paciente_id, mensagem_id in rows:
+            usados.setdefault(paciente_id, []).append(mensagem_id)
+
+        with self._lock:
+            for paciente_id, ids in usados.items():
+                self._guardar(self._chave(db_path, paciente_id), self._nova_entrada(ids))
+
+        return len(usados)
+
+    def _entrada(self, db_path: str, paciente_id: int) -> Dict:
+        chave = self._chave(db_path, paciente_id)
+        entrada = self._pacientes.get(chave)
+
+        if entrada is not None:
+            self._pacientes.move_to_end(chave)
+            return entrada
+
+        conn = get_connection(db_path)
+        try:
+            rows = conn.execute("""
+                SELECT mensagem_id FROM historico_mensagens
+                WHERE paciente_id = ? AND mensagem_id IS NOT NULL
+            """, (paciente_id,)).fetchall()
+        except sqlite3.OperationalError:
+            rows = []  # Banco sem histórico
+        finally:
+            conn.close()
+
+        entrada = self._nova_entrada(row[0] for row in rows)
+        self._guardar(chave, entrada)
+        return entrada
+
+    def escolher(self, db_path: str, paciente_id: Optional[int], tipo: str,
+                 templates: List[Tuple[int, str]], registrar: bool = True) -> Tuple[int, str]:
+        """
+        Escolhe um template (id, texto) que o paciente ainda não recebeu.
+
+        Com registrar=False a escolha não é marcada como usada (a mesma volta
+        na próxima chamada) até que registrar() seja chamado para ela.
+        """
+        if not paciente_id:
+            return random.choice(templates)
+
+        with self._lock:
+            entrada = self._entrada(db_path, paciente_id)
+            sacola = entrada['sacolas'].get(tipo)
+
+            # Banco de templates recarregado: monta a sacola de novo
+            if sacola is None or sacola[0] is not templates:
+                restantes = [i for i, (mid, _) in enumerate(templates) if mid not in entrada['usados']]
+                random.shuffle(restantes)
+                sacola = entrada['sacolas'][tipo] = [templates, restantes]
+
+            if not sacola[1]:
+                # Todos já usados: nova rodada, sem repetir o último
+                entrada['usados'].difference_update(mid for mid, _ in templates)
+                ultimo = entrada['ultimo'].get(tipo)
+                restantes = [i for i, (mid, _) in enumerate(templates) if mid != ultimo] or [0]
+                random.shuffle(restantes)
+                sacola[1] = restantes
+
+            mensagem_id, texto = templates[sacola[1][-1]]
+            if registrar:
+                self._registrar(entrada, tipo, mensagem_id)
+
+        return mensagem_id, texto
+
+    def registrar(self, db_path: str, paciente_id: Optional[int], tipo: str, mensagem_id: Optional[int]):
+        """Marca como usado o template escolhido com registrar=False"""
+        if not paciente_id or mensagem_id is None:
+            return
+
+        with self._lock:
+            self._registrar(self._entrada(db_path, paciente_id), tipo, mensagem_id)
+
+    def _registrar(self, entrada: Dict, tipo: str, mensagem_id: int):
+        entrada['usados'].add(mensagem_id)
+        entrada['ultimo'][tipo] = mensagem_id
+
+        sacola = entrada['sacolas'].get(tipo)
+        if sacola is not None:
+            templates, restantes = sacola
+            if restantes and templates[restantes[-1]][0] == mensagem_id:
+                restantes.pop()
+            else:
+                sacola[1] = [i for i in restantes if templates[i][0] != mensagem_id]
+
+    def limpar(self):
+        with self._lock:
+            self._pacientes.clear()
+
+    def __len__(self):
+        return len(self._pacientes)
+
+
+# Instância global do processo
+repetition_memory = RepetitionMemory()
 
 class MessageManager:
     def __init__(self, db_path: str):
         self.db_path = db_path
-        self.ultimas_mensagens = {}  # Cache para evitar repetição
     
     def _get_connection(self):
-        return sqlite3.connect(self.db_path, timeout=10)
+        return get_connection(self.db_path)
+    
+    @staticmethod
+    def tipo_por_status(status: str) -> str:
+        """Tipo de mensagem adequado ao status atual do paciente"""
+        if status == 'pendente':
+            return 'primeiro_contato'
+        elif status in ['mensagem_preparada', 'mensagem_enviada']:
+            return 'confirmacao'
+        elif status == 'sem_resposta':
+            return 'follow_up'
+        
+        return 'confirmacao'
     
     def gerar_mensagem(self, tipo: str, paciente_data: Dict) -> str:
         """
@@ -22,115 +368,63 @@ class MessageManager:
         Returns:
             Texto da mensagem personalizada
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        # Buscar mensagens do tipo solicitado
-        cursor.execute("""
-            SELECT id, texto FROM mensagens
-            WHERE tipo = ? AND ativo = 1
-        """, (tipo,))
-        
-        mensagens_disponiveis = cursor.fetchall()
-        conn.close()
+        return self._gerar(tipo, paciente_data)[1]
+
+    def renderizar_mensagem(self, tipo: str, paciente_data: Dict) -> Tuple[Optional[int], str]:
+        """
+        Gera a mensagem sem marcar o template como usado pelo paciente.
+
+        Para pré-visualizações que podem nunca ser enviadas (ver
+        MessagePrefetcher); o template é registrado quando o resultado é
+        passado como pre_renderizada para preparar_mensagem_paciente().
+        Retorna (mensagem_id, texto).
+        """
+        return self._gerar(tipo, paciente_data, registrar=False)
+
+    def _gerar(self, tipo: str, paciente_data: Dict, registrar: bool = True) -> Tuple[Optional[int], str]:
+        """
+        Gera a mensagem e retorna também o id do template usado (None no fallback).
+        Com registrar=False o template não é marcado como usado (ver RepetitionMemory).
+        """
+        # Templates do tipo solicitado (em memória, ver TemplateCache)
+        mensagens_disponiveis = template_cache.obter(self.db_path, tipo)
         
         if not mensagens_disponiveis:
-            return self._mensagem_fallback(tipo, paciente_data)
-        
-        # Filtrar mensagens já usadas recentemente
-        paciente_id = paciente_data.get('id')
-        mensagens_usadas = self.ultimas_mensagens.get(paciente_id, set())
-        
-        mensagens_filtradas = [
-            (mid, texto) for mid, texto in mensagens_disponiveis
-            if mid not in mensagens_usadas
-        ]
-        
-        # Se todas já foram usadas, limpar histórico
-        if not mensagens_filtradas:
-            mensagens_filtradas = mensagens_disponiveis
-            self.ultimas_mensagens[paciente_id] = set()
+            return None, self._mensagem_fallback(tipo, paciente_data)
         
-        # Selecionar aleatoriamente
-        msg_id, texto = random.choice(mensagens_filtradas)
-        
-        # Registrar uso
-        if paciente_id:
-            if paciente_id not in self.ultimas_mensagens:
-                self.ultimas_mensagens[paciente_id] = set()
-            self.ultimas_mensagens[paciente_id].add(msg_id)
+        # Template que o paciente ainda não recebeu (ver RepetitionMemory)
+        msg_id, texto = repetition_memory.escolher(
+            self.db_path, paciente_data.get('id'), tipo, mensagens_disponiveis, registrar
+        )
         
         # Personalizar mensagem
-        mensagem_final = self._personalizar_mensagem(texto, paciente_data)
-        
-        return mensagem_final
+        return msg_id, self._personalizar_mensagem(texto, paciente_data)
     
     def _personalizar_mensagem(self, texto: str, dados: Dict) -> str:
         """Substitui variáveis na mensagem"""
-        # Formatar data (tentar múltiplos formatos)
-        if dados.get('data_consulta'):
-            data_obj = None
-            # SQLite geralmente armazena DATE como YYYY-MM-DD
-            formatos = ['%Y-%m-%d', '%d/%m/%Y', '%Y/%m/%d', '%d-%m-%Y']
-            
-            for fmt in formatos:
-                try:
-                    data_obj = datetime.strptime(str(dados['data_consulta']), fmt)
-                    break
-                except (ValueError, TypeError):
-                    continue
-            
-            if data_obj:
-                data_formatada = data_obj.strftime('%d/%m/%Y')
-                dia_semana = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo'][data_obj.weekday()]
-                texto = texto.replace('{data}', data_formatada)
-                texto = texto.replace('{dia_semana}', dia_semana)
-            else:
-                # Data inválida ou formato desconhecido, usar valor original
-                texto = texto.replace('{data}', str(dados['data_consulta']))
-                texto = texto.replace('{dia_semana}', 'o dia')
-        else:
-            texto = texto.replace('{data}', 'hoje')
-            texto = texto.replace('{dia_semana}', 'hoje')
-        
-        # Formatar hora
-        if dados.get('hora_consulta'):
-            try:
-                hora_str = str(dados['hora_consulta'])[:5]
-                texto = texto.replace('{hora}', hora_str)
-            except:
-                texto = texto.replace('{hora}', 'o horário agendado')
-        else:
-            texto = texto.replace('{hora}', 'agora')
-        
-        # Nome (usar apenas primeiro nome para ser mais pessoal)
-        if dados.get('nome'):
-            primeiro_nome = dados['nome'].split()[0]
-            texto = texto.replace('{nome}', primeiro_nome)
-        
-        # Tipo de consulta/exame
-        if dados.get('tipo_consulta'):
-            texto = texto.replace('{tipo}', dados['tipo_consulta'])
-        
-        # Profissional
-        if dados.get('profissional'):
-            texto = texto.replace('{profissional}', dados['profissional'])
-        
-        return texto.strip()
+        return compilar_template(texto).renderizar(dados)
     
     def _mensagem_fallback(self, tipo: str, dados: Dict) -> str:
         """Mensagem de emergência caso banco esteja vazio"""
+        data = para_exibicao(dados.get('data_consulta')) or 'data'
+        hora = dados.get('hora_consulta') or 'hora'
         templates = {
-            'primeiro_contato': f"Olá! Aqui é da clínica. Sua consulta está agendada para {dados.get('data_consulta', 'data')} às {dados.get('hora_consulta', 'hora')}. Tudo certo?",
-            'confirmacao': f"Oi! Confirmando sua consulta para {dados.get('data_consulta', 'data')} às {dados.get('hora_consulta', 'hora')}. Pode confirmar?",
-            'lembrete': f"Lembrete: sua consulta é amanhã, {dados.get('data_consulta', 'data')} às {dados.get('hora_consulta', 'hora')}. Nos vemos lá!",
+            'primeiro_contato': f"Olá! Aqui é da clínica. Sua consulta está agendada para {data} às {hora}. Tudo certo?",
+            'confirmacao': f"Oi! Confirmando sua consulta para {data} às {hora}. Pode confirmar?",
+            'lembrete': f"Lembrete: sua consulta é amanhã, {data} às {hora}. Nos vemos lá!",
             'reagendamento': "Entendi que precisa reagendar. Qual data seria melhor para você?"
         }
         
         return templates.get(tipo, "Olá! Entrando em contato da clínica.")
     
-    def preparar_mensagem_paciente(self, paciente_id: int, tipo_mensagem: str) -> Dict:
-        """Prepara mensagem para um paciente específico"""
+    def preparar_mensagem_paciente(self, paciente_id: int, tipo_mensagem: str,
+                                   pre_renderizada: Optional[Tuple[Optional[int], str]] = None) -> Dict:
+        """
+        Prepara mensagem para um paciente específico
+        
+        pre_renderizada: (mensagem_id, texto) já gerados (ver MessagePrefetcher);
+        se informado, grava esse texto em vez de gerar outro.
+        """
         conn = self._get_connection()
         cursor = conn.cursor()
         
@@ -160,7 +454,10 @@ class MessageManager:
         }
         
         # Gerar mensagem
-        mensagem = self.gerar_mensagem(tipo_mensagem, paciente_data)
+        if pre_renderizada:
+            mensagem_id, mensagem = pre_renderizada
+        else:
+            mensagem_id, mensagem = self._gerar(tipo_mensagem, paciente_data)
         
         # Salvar mensagem preparada
         agora = datetime.now().isoformat()
@@ -168,17 +465,137 @@ class MessageManager:
         cursor.execute("""
             UPDATE pacientes
             SET mensagem_preparada = ?,
+                mensagem_preparada_id = ?,
                 fase_conversa = ?,
                 data_preparo = ?,
                 status = 'mensagem_preparada'
             WHERE id = ?
-        """, (mensagem, tipo_mensagem, agora, paciente_id))
+        """, (mensagem, mensagem_id, tipo_mensagem, agora, paciente_id))
         
         conn.commit()
         conn.close()
         
+        if pre_renderizada:
+            # Renderizada sem registro (renderizar_mensagem): só agora foi usada
+            repetition_memory.registrar(self.db_path, paciente_id, tipo_mensagem, mensagem_id)
+        
         return {
             'success': True,
             'mensagem': mensagem,
             'paciente': paciente_data
-        }
\ No newline at end of file
+        }
+    
+    def preparar_mensagens_lote(self, data: str, filtros: Optional[Dict] = None) -> Dict:
+        """
+        Prepara o primeiro contato de todos os pacientes pendentes do dia.
+
+        Apenas pacientes com consentimento de WhatsApp são incluídos; os
+        demais continuam exigindo a confirmação manual em MessagePreview.
+        O banco de templates é lido uma vez (TemplateCache) e todas as
+        mensagens são gravadas com um único executemany e um único commit.
+        Limites de envio não são verificados aqui: valem no momento do envio.
+
+        Args:
+            data: data das consultas (ISO ou DD/MM/YYYY)
+            filtros: opcionais 'profissional', 'tipo_consulta' e 'ids'
+        
+        Returns:
+            Dict com preparados, sem_consentimento e mensagens {id: texto}
+        """
+        try:
+            data = para_iso(data)
+        except ValueError as e:
+            return {'success': False, 'message': str(e)}
+
+        filtros = filtros or {}
+        condicoes = ["status = 'pendente'", "data_consulta = ?"]
+        params = [data]
+
+        for campo in ('profissional', 'tipo_consulta'):
+            if filtros.get(campo):
+                condicoes.append(f"{campo} = ?")
+                params.append(filtros[campo])
+
+        if filtros.get('ids'):
+            ids = list(filtros['ids'])
+            condicoes.append(f"id IN ({', '.join('?' * len(ids))})")
+            params.extend(ids)
+
+        where = ' AND '.join(condicoes)
+        tipo_mensagem = 'primeiro_contato'
+
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(f"""
+                SELECT id, nome, telefone, data_consulta, hora_consulta,
+                       tipo_consulta, profissional, status, consentimento_whatsapp
+                FROM pacientes
+                WHERE {where}
+                ORDER BY data_consulta, hora_consulta
+            """, params)
+
+            rows = cursor.fetchall()
+
+            mensagens = {}
+            sem_consentimento = 0
+
+            for row in rows:
+                if not row[8]:
+                    sem_consentimento += 1
+                    continue
+
+                paciente_data = {
+                    'id': row[0],
+                    'nome': row[1],
+                    'telefone': row[2],
+                    'data_consulta': row[3],
+                    'hora_consulta': row[4],
+                    'tipo_consulta': row[5],
+                    'profissional': row[6],
+                    'status': row[7]
+                }
+                # Marcado como usado só depois de gravado (abaixo)
+                mensagens[row[0]] = self._gerar(tipo_mensagem, paciente_data, registrar=False)
+
+            agora = datetime.now().isoformat()
+
+            # status = 'pendente' de novo: ignora quem outra estação preparou nesse meio-tempo
+            cursor.executemany("""
+                UPDATE pacientes
+                SET mensagem_preparada = ?,
+                    mensagem_preparada_id = ?,
+                    fase_conversa = ?,
+                    data_preparo = ?,
+                    status = 'mensagem_preparada'
+                WHERE id = ? AND status = 'pendente'
+            """, [
+                (mensagem, mensagem_id, tipo_mensagem, agora, pid)
+                for pid, (mensagem_id, mensagem) in mensagens.items()
+            ])
+
+            if cursor.rowcount != len(mensagens):
+                # Ainda dentro da transação: o data_preparo desta chamada
+                # identifica as linhas que de fato foram gravadas
+                gravados = {row[0] for row in cursor.execute("""
+                    SELECT id FROM pacientes
+                    WHERE data_consulta = ? AND data_preparo = ? AND status = 'mensagem_preparada'
+                """, (data, agora))}
+                mensagens = {pid: m for pid, m in mensagens.items() if pid in gravados}
+
+            conn.commit()
+        except Exception as e:
+            return {'success': False, 'message': f'Erro ao preparar mensagens: {str(e)}'}
+        finally:
+            conn.close()
+
+        for pid, (mensagem_id, _) in mensagens.items():
+            repetition_memory.registrar(self.db_path, pid, tipo_mensagem, mensagem_id)
+
+        return {
+            'success': True,
+            'preparados': len(mensagens),
+            'sem_consentimento': sem_consentimento,
+            'mensagens': {pid: mensagem for pid, (_, mensagem) in mensagens.items()}
+        }
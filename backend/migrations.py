@@ -0,0 +1,370 @@
+"""
+Migrações versionadas do schema
+O schema criado por criar_banco() é a versão 0; toda alteração posterior
+entra aqui como uma migração numerada, aplicada na inicialização.
+"""
+
+import logging
+import sqlite3
+import time
+from typing import Callable, Dict, List, Tuple
+from backend.dates import para_iso, normalizar_hora
+
+logger = logging.getLogger('Migracoes')
+
+# (versao, nome, funcao) - registradas pelo decorator @migracao
+MIGRACOES: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = []
+
+
+def migracao(versao: int, nome: str):
+    """
+    Registra uma migração.
+
+    A função recebe a conexão já dentro de uma transação e não deve fazer
+    commit nem usar executescript (que faria commit implícito).
+    """
+    def decorator(funcao):
+        if any(v == versao for v, _, _ in MIGRACOES):
+            raise ValueError(f'Migração {versao} registrada em duplicidade')
+        MIGRACOES.append((versao, nome, funcao))
+        MIGRACOES.sort(key=lambda m: m[0])
+        return funcao
+    return decorator
+
+
+def criar_indice(conn: sqlite3.Connection, nome: str, tabela: str, colunas: str, where: str = None):
+    """
+    Cria índice se ainda não existir e atualiza as estatísticas do planner.
+
+    Com o banco em WAL, leituras continuam liberadas durante a criação;
+    apenas outras gravações aguardam o fim da migração.
+    """
+    sql = f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela}({colunas})"
+    if where:
+        sql += f" WHERE {where}"
+
+    conn.execute(sql)
+    conn.execute(f"ANALYZE {nome}")
+
+
+def _garantir_tabela_controle(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migracoes (
+            versao INTEGER PRIMARY KEY,
+            nome TEXT NOT NULL,
+            aplicada_em DATETIME DEFAULT CURRENT_TIMESTAMP,
+            duracao_ms REAL
+        )
+    """)
+
+
+def versao_atual(db_path: str) -> int:
+    """Retorna a versão de schema registrada no banco"""
+    conn = sqlite3.connect(db_path, timeout=10)
+
+    try:
+        _garantir_tabela_controle(conn)
+        result = conn.execute("SELECT MAX(versao) FROM schema_migracoes").fetchone()
+        return result[0] or 0
+    finally:
+        conn.close()
+
+
+def aplicar_migracoes(db_path: str) -> List[Dict]:
+    """
+    Aplica, em ordem, as migrações ainda não registradas no banco.
+
+    Cada migração roda em uma transação própria (BEGIN IMMEDIATE): se falhar,
+    nada dela fica gravado e as seguintes não são executadas.
+    Retorna as migrações aplicadas com o tempo gasto em cada uma.
+    """
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    aplicadas = []
+
+    try:
+        _garantir_tabela_controle(conn)
+
+        for versao, nome, funcao in MIGRACOES:
+            inicio = time.perf_counter()
+            conn.execute("BEGIN IMMEDIATE")
+
+            try:
+                # Outra estação pode ter aplicado enquanto aguardávamos o lock
+                if conn.execute("SELECT 1 FROM schema_migracoes WHERE versao = ?", (versao,)).fetchone():
+                    conn.execute("ROLLBACK")
+                    continue
+
+                funcao(conn)
+
+                duracao_ms = (time.perf_counter() - inicio) * 1000
+                conn.execute("""
+                    INSERT INTO schema_migracoes (versao, nome, duracao_ms)
+                    VALUES (?, ?, ?)
+                """, (versao, nome, duracao_ms))
+                conn.execute(f"PRAGMA user_version = {versao}")
+                conn.execute("COMMIT")
+
+            except Exception:
+                conn.execute("ROLLBACK")
+                logger.error(f"Falha na migração {versao} ({nome})")
+                raise
+
+            logger.info(f"Migração {versao} ({nome}) aplicada em {duracao_ms:.1f} ms")
+            aplicadas.append({'versao': versao, 'nome': nome, 'duracao_ms': round(duracao_ms, 2)})
+
+    finally:
+        conn.close()
+
+    return aplicadas
+
+
+# ============================================
+# MIGRAÇÕES
+# ============================================
+
+@migracao(1, 'configuracao_perfil_armazenamento')
+def _m001_perfil_armazenamento(conn):
+    conn.execute("""
+        INSERT OR IGNORE INTO configuracoes (chave, valor, tipo, descricao)
+        VALUES ('perfil_armazenamento', 'desktop-safe', 'string',
+                'Perfil de armazenamento do banco (desktop-safe, multi-attendant, bulk-import)')
+    """)
+
+
+@migracao(2, 'datas_iso_pacientes')
+def _m002_datas_iso(conn):
+    padrao_iso = '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'
+
+    def converter(valor, funcao):
+        try:
+            return funcao(valor)
+        except ValueError:
+            return valor  # Mantém valor irreconhecível para correção manual
+
+    for coluna in ('data_consulta', 'data_nascimento'):
+        rows = conn.execute(f"""
+            SELECT id, {coluna} FROM pacientes
+            WHERE {coluna} IS NOT NULL AND {coluna} NOT GLOB '{padrao_iso}'
+        """).fetchall()
+
+        conn.executemany(
+            f"UPDATE pacientes SET {coluna} = ? WHERE id = ?",
+            [(converter(valor, para_iso), pid) for pid, valor in rows]
+        )
+
+    rows = conn.execute("""
+        SELECT id, hora_consulta FROM pacientes
+        WHERE hora_consulta IS NOT NULL AND hora_consulta NOT GLOB '[0-9][0-9]:[0-9][0-9]'
+    """).fetchall()
+
+    conn.executemany(
+        "UPDATE pacientes SET hora_consulta = ? WHERE id = ?",
+        [(converter(valor, normalizar_hora), pid) for pid, valor in rows]
+    )
+
+    # Relatórios diários gerados com data DD/MM/YYYY. data é UNIQUE: se o mesmo
+    # dia já existe em ISO, fica o relatório gerado por último (é um retrato
+    # do dia, somar os dois contaria pacientes em dobro)
+    rows = conn.execute(f"""
+        SELECT id, data, gerado_em FROM relatorios_diarios WHERE data NOT GLOB '{padrao_iso}'
+    """).fetchall()
+
+    for rid, valor, gerado_em in rows:
+        data = converter(valor, para_iso)
+        if data == valor:
+            continue
+
+        existente = conn.execute(
+            "SELECT id, gerado_em FROM relatorios_diarios WHERE data = ? AND id != ?",
+            (data, rid)
+        ).fetchone()
+
+        if existente:
+            if (existente[1] or '', existente[0]) > (gerado_em or '', rid):
+                descartado, mantido = rid, existente[0]
+            else:
+                descartado, mantido = existente[0], rid
+
+            conn.execute("DELETE FROM relatorios_diarios WHERE id = ?", (descartado,))
+            logger.warning(
+                f"Relatório diário {descartado} ({data}) descartado: "
+                f"duplicava o relatório {mantido}, gerado depois"
+            )
+
+            if descartado == rid:
+                continue
+
+        conn.execute("UPDATE relatorios_diarios SET data = ? WHERE id = ?", (data, rid))
+
+
+@migracao(3, 'indices_consultas_frequentes')
+def _m003_indices_consultas_frequentes(conn):
+    # Lista de pacientes: filtro por período e paginação por chave
+    # (data_consulta, hora_consulta, id). Sem status no fim, o rowid implícito
+    # do índice completa a chave e a ordenação sai do próprio índice
+    criar_indice(conn, 'idx_pacientes_data_hora', 'pacientes', 'data_consulta, hora_consulta')
+    criar_indice(conn, 'idx_pacientes_status_data', 'pacientes', 'status, data_consulta, hora_consulta')
+
+    # Fila de trabalho: só pendentes (parcial, pequeno e barato de manter)
+    criar_indice(
+        conn, 'idx_pacientes_pendentes', 'pacientes', 'data_consulta, hora_consulta',
+        where="status = 'pendente'"
+    )
+
+    # Prefixos dos índices compostos acima
+    conn.execute("DROP INDEX IF EXISTS idx_pacientes_data_consulta")
+    conn.execute("DROP INDEX IF EXISTS idx_pacientes_status")
+
+    # Histórico por paciente
+    criar_indice(conn, 'idx_historico_paciente', 'historico_mensagens', 'paciente_id, data_envio')
+
+    # Limite diário: SUM(total_enviado) por (data, tipo) sem tocar a tabela
+    criar_indice(conn, 'idx_controle_data_tipo', 'controle_envio', 'data, tipo_mensagem, total_enviado')
+
+
+# Versão 4 (índice de paginação) foi incorporada à 3. O número não deve ser
+# reutilizado: bancos que já a aplicaram pulariam a nova migração.
+
+
+@migracao(5, 'registro_alteracoes_pacientes')
+def _m005_registro_alteracoes(conn):
+    # Registro de alterações lido pelo ChangeMonitor (backend/changes.py).
+    # Guarda a data da consulta antes/depois para o dashboard saber quais
+    # dias recalcular sem reler a tabela inteira. 'R' é uma marca de
+    # recarga completa, gravada no lugar das linhas de uma importação.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pacientes_alteracoes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            paciente_id INTEGER,
+            operacao TEXT NOT NULL CHECK(operacao IN ('I', 'U', 'D', 'R')),
+            data_anterior DATE,
+            data_nova DATE,
+            alterado_em DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Com uma linha aqui os triggers não registram nada. Só é preenchida
+    # dentro da transação de quem grava em massa (ver changes.suspender_registro),
+    # então as demais conexões nunca a veem preenchida
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pacientes_alteracoes_pausa (
+            id INTEGER PRIMARY KEY CHECK(id = 1)
+        )
+    """)
+
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_pacientes_alteracoes_insert
+        AFTER INSERT ON pacientes
+        WHEN NOT EXISTS (SELECT 1 FROM pacientes_alteracoes_pausa)
+        BEGIN
+            INSERT INTO pacientes_alteracoes (paciente_id, operacao, data_nova)
+            VALUES (NEW.id, 'I', NEW.data_consulta);
+        END
+    """)
+
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_pacientes_alteracoes_update
+        AFTER UPDATE ON pacientes
+        WHEN NOT EXISTS (SELECT 1 FROM pacientes_alteracoes_pausa)
+        BEGIN
+            INSERT INTO pacientes_alteracoes (paciente_id, operacao, data_anterior, data_nova)
+            VALUES (NEW.id, 'U', OLD.data_consulta, NEW.data_consulta);
+        END
+    """)
+
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_pacientes_alteracoes_delete
+        AFTER DELETE ON pacientes
+        WHEN NOT EXISTS (SELECT 1 FROM pacientes_alteracoes_pausa)
+        BEGIN
+            INSERT INTO pacientes_alteracoes (paciente_id, operacao, data_anterior)
+            VALUES (OLD.id, 'D', OLD.data_consulta);
+        END
+    """)
+
+
+@migracao(6, 'versao_mensagens')
+def _m006_versao_mensagens(conn):
+    # Contador de versão por tabela: quem mantém cache em memória (banco de
+    # templates) compara um único valor para saber se precisa recarregar
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS versoes_dados (
+            tabela TEXT PRIMARY KEY,
+            versao INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO versoes_dados (tabela, versao) VALUES ('mensagens', 0)")
+
+    for evento in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_mensagens_versao_{evento.lower()}
+            AFTER {evento} ON mensagens
+            BEGIN
+                UPDATE versoes_dados SET versao = versao + 1 WHERE tabela = 'mensagens';
+            END
+        """)
+
+
+@migracao(7, 'template_usado_por_paciente')
+def _m007_template_usado(conn):
+    # Template da mensagem preparada, copiado para o histórico no envio
+    colunas = [row[1] for row in conn.execute("PRAGMA table_info(pacientes)")]
+    if 'mensagem_preparada_id' not in colunas:
+        conn.execute("ALTER TABLE pacientes ADD COLUMN mensagem_preparada_id INTEGER REFERENCES mensagens(id)")
+
+    # Templates já recebidos por paciente (memória anti-repetição)
+    criar_indice(
+        conn, 'idx_historico_paciente_mensagem', 'historico_mensagens', 'paciente_id, mensagem_id',
+        where='mensagem_id IS NOT NULL'
+    )
+
+
+@migracao(8, 'chave_idempotencia_envio')
+def _m008_chave_envio(conn):
+    # Chave de idempotência do envio (ver SendLedger): repetir o registro do
+    # mesmo envio não gera outra linha no histórico nem conta duas vezes
+    colunas = [row[1] for row in conn.execute("PRAGMA table_info(historico_mensagens)")]
+    if 'chave_envio' not in colunas:
+        conn.execute("ALTER TABLE historico_mensagens ADD COLUMN chave_envio TEXT")
+
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_historico_chave_envio
+        ON historico_mensagens(chave_envio) WHERE chave_envio IS NOT NULL
+    """)
+
+
+@migracao(9, 'indice_telefone_normalizado')
+def _m009_indice_telefone_normalizado(conn):
+    # Duplicatas na importação: o telefone normalizado (+55...) identifica o
+    # paciente e, com a data, a consulta. O índice cobre a leitura das chaves
+    # feita uma vez por importação e a busca da consulta a atualizar.
+    criar_indice(conn, 'idx_pacientes_telefone_formatado', 'pacientes', 'telefone_formatado, data_consulta')
+
+    # Nenhuma consulta usa mais o telefone como digitado
+    conn.execute("DROP INDEX IF EXISTS idx_pacientes_telefone")
+
+
+@migracao(10, 'diario_importacoes')
+def _m010_diario_importacoes(conn):
+    # Checkpoint das importações de planilha (ver PatientImporter.importar):
+    # a última linha gravada é atualizada na mesma transação de cada lote,
+    # e importar de novo o mesmo arquivo (mesmo hash) continua dali
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS importacoes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            arquivo_hash TEXT NOT NULL,
+            arquivo_nome TEXT,
+            usuario_id INTEGER REFERENCES usuarios(id),
+            status TEXT NOT NULL DEFAULT 'em_andamento'
+                CHECK(status IN ('em_andamento', 'concluida', 'cancelada', 'falhou')),
+            ultima_linha INTEGER NOT NULL DEFAULT 1,
+            total INTEGER NOT NULL DEFAULT 0,
+            importados INTEGER NOT NULL DEFAULT 0,
+            atualizados INTEGER NOT NULL DEFAULT 0,
+            duplicados INTEGER NOT NULL DEFAULT 0,
+            erros INTEGER NOT NULL DEFAULT 0,
+            iniciada_em DATETIME DEFAULT CURRENT_TIMESTAMP,
+            atualizada_em DATETIME
+        )
+    """)
+    criar_indice(conn, 'idx_importacoes_hash', 'importacoes', 'arquivo_hash, status')
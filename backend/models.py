@@ -1,13 +1,13 @@
-import sqlite3
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
+from backend.connection import get_connection
 
 class BaseModel:
     def __init__(self, db_path: str):
         self.db_path = db_path
     
     def _get_connection(self):
-        return sqlite3.connect(self.db_path, timeout=10)
+        return get_connection(self.db_path)
 
 class User(BaseModel):
     def __init__(self, db_path: str):
@@ -40,28 +40,101 @@ class Patient(BaseModel):
     def __init__(self, db_path: str):
         super().__init__(db_path)
     
-    def get_all(self, limit: int = 100, offset: int = 0) -> List[Dict]:
+    def get_all(self, limit: int = 100, cursor: Optional[Tuple[str, str, int]] = None,
+                status: Optional[str] = None, data_inicio: Optional[str] = None,
+                decrescente: bool = True, anteriores: bool = False) -> List[Dict]:
+        """
+        Lista pacientes paginando pela chave (data_consulta, hora_consulta, id).
+
+        cursor é a chave da última linha já carregada (ver chave_paginacao);
+        a página seguinte começa logo depois dela, sem OFFSET, então o custo
+        não cresce com a profundidade da rolagem. Com anteriores=True retorna
+        a página imediatamente antes do cursor, já na ordem de exibição.
+        """
+        condicoes = []
+        params = []
+
+        if status:
+            condicoes.append("status = ?")
+            params.append(status)
+
+        # Direção da busca no índice (rolar para cima inverte a ordem de exibição)
+        crescente = decrescente == anteriores
+
+        if cursor:
+            condicoes.append(f"(data_consulta, hora_consulta, id) {'>' if crescente else '<'} (?, ?, ?)")
+            params.extend(cursor)
+
+        if data_inicio:
+            # Com cursor, o "+" impede o planner de trocar a busca pela chave
+            # por uma varredura a partir de data_inicio
+            coluna = '+data_consulta' if cursor else 'data_consulta'
+            condicoes.append(f"{coluna} >= ?")
+            params.append(data_inicio)
+
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ''
+        ordem = 'ASC' if crescente else 'DESC'
+
+        conn = self._get_connection()
+        cursor_db = conn.cursor()
+
+        cursor_db.execute(f"""
+            SELECT id, nome, telefone, data_consulta, hora_consulta, status, tentativas_contato
+            FROM pacientes
+            {where}
+            ORDER BY data_consulta {ordem}, hora_consulta {ordem}, id {ordem}
+            LIMIT ?
+        """, (*params, limit))
+
+        rows = cursor_db.fetchall()
+        conn.close()
+
+        if anteriores:
+            rows.reverse()
+
+        return [{
+            'id': row[0],
+            'nome': row[1],
+            'telefone': row[2],
+            'data_consulta': row[3],
+            'hora_consulta': row[4],
+            'status': row[5],
+            'tentativas_contato': row[6]
+        } for row in rows]
+
+    def get_by_ids(self, patient_ids) -> List[Dict]:
+        """Busca várias linhas no formato de get_all (ids inexistentes são ignorados)"""
+        ids = list(patient_ids)
+        if not ids:
+            return []
+
         conn = self._get_connection()
         cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, nome, telefone, data_consulta, hora_consulta, status
+
+        marcadores = ', '.join('?' * len(ids))
+        cursor.execute(f"""
+            SELECT id, nome, telefone, data_consulta, hora_consulta, status, tentativas_contato
             FROM pacientes
-            ORDER BY data_consulta DESC, hora_consulta DESC
-            LIMIT ? OFFSET ?
-        """, (limit, offset))
-        
+            WHERE id IN ({marcadores})
+        """, ids)
+
         rows = cursor.fetchall()
         conn.close()
-        
+
         return [{
             'id': row[0],
             'nome': row[1],
             'telefone': row[2],
             'data_consulta': row[3],
             'hora_consulta': row[4],
-            'status': row[5]
+            'status': row[5],
+            'tentativas_contato': row[6]
         } for row in rows]
+
+    @staticmethod
+    def chave_paginacao(paciente: Dict) -> Tuple[str, str, int]:
+        """Chave de paginação de uma linha retornada por get_all"""
+        return (paciente['data_consulta'], paciente['hora_consulta'], paciente['id'])
     
     def get_by_id(self, patient_id: int) -> Optional[Dict]:
         conn = self._get_connection()
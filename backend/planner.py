@@ -0,0 +1,236 @@
+"""
+Planejamento dos envios do dia
+Distribui a fila de contatos pendentes nos horários permitidos, respeitando
+o teto diário, o intervalo mínimo e as tentativas por número, e priorizando
+as consultas mais próximas. O atendente vê de antemão o que cabe no dia em
+vez de descobrir os limites quando o envio é recusado.
+"""
+
+import heapq
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from backend.connection import get_connection
+from backend.limits import rate_limiter, TIPOS_COM_TETO_DIARIO, MICROSSEGUNDOS
+from backend.messaging import MessageManager
+
+# Status que ainda aguardam o envio de uma mensagem
+STATUS_NA_FILA = ('pendente', 'mensagem_preparada')
+
+# Motivos de um contato ficar fora do plano
+MOTIVOS = {
+    'limite_diario': 'Teto diário de primeiros contatos atingido',
+    'limite_numero': 'Número já atingiu o máximo de tentativas hoje',
+    'consulta_passada': 'Horário da consulta já passou',
+    'fora_do_horario': 'Não há mais horários de envio hoje',
+}
+
+
+def _horario_consulta(data_consulta: str, hora_consulta: Optional[str]) -> datetime:
+    """Data/hora da consulta; sem hora válida, considera o fim do dia"""
+    try:
+        return datetime.fromisoformat(f"{data_consulta} {hora_consulta or '23:59'}")
+    except (TypeError, ValueError):
+        try:
+            return datetime.fromisoformat(f"{data_consulta} 23:59")
+        except (TypeError, ValueError):
+            return datetime.max
+
+
+class SendPlanner:
+    """
+    Plano de envios do dia, mantido a partir da fila de contatos.
+
+    A fila é lida uma vez (carregar) e depois atualizada só nos pacientes
+    alterados (aplicar_alteracoes, mesmo formato do ChangeMonitor). O plano
+    é recalculado em memória quando a fila muda ou o primeiro horário
+    planejado já passou: heap por proximidade da consulta, O(n log n).
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._fila: Dict[int, Dict] = {}
+        self._trabalha_24h = False
+        self._plano: Optional[Dict] = None
+
+    def carregar(self):
+        """Lê a fila e a configuração de horário (tela aberta ou 'Atualizar')"""
+        conn = get_connection(self.db_path)
+
+        row = conn.execute("SELECT valor FROM configuracoes WHERE chave = 'trabalha_24h'").fetchone()
+        self._trabalha_24h = bool(row and str(row[0]).lower() == 'true')
+
+        marcadores = ', '.join('?' * len(STATUS_NA_FILA))
+        rows = conn.execute(f"""
+            SELECT id, nome, telefone, data_consulta, hora_consulta, status, fase_conversa
+            FROM pacientes
+            WHERE status IN ({marcadores}) AND data_consulta >= ?
+        """, (*STATUS_NA_FILA, date.today().isoformat())).fetchall()
+        conn.close()
+
+        self._fila = {}
+        for row in rows:
+            self._guardar(row)
+        self._plano = None
+
+    def _guardar(self, row):
+        pid, nome, telefone, data_consulta, hora_consulta, status, fase = row
+
+        # Mensagem já preparada mantém o tipo com que foi gerada
+        tipo = fase if status == 'mensagem_preparada' and fase else MessageManager.tipo_por_status(status)
+
+        self._fila[pid] = {
+            'paciente_id': pid,
+            'nome': nome,
+            'telefone': telefone,
+            'data_consulta': data_consulta,
+            'hora_consulta': hora_consulta,
+            'tipo': tipo,
+            'consulta': _horario_consulta(data_consulta, hora_consulta),
+        }
+
+    def aplicar_alteracoes(self, alteracoes: Dict):
+        """Atualiza a fila só com os pacientes alterados (callback do ChangeMonitor)"""
+        if alteracoes.get('recarregar'):
+            self.carregar()
+            return
+
+        ids = set(alteracoes.get('alterados', ())) | set(alteracoes.get('excluidos', ()))
+        if not ids:
+            return
+
+        for pid in ids:
+            self._fila.pop(pid, None)
+
+        alterados = list(alteracoes.get('alterados', ()))
+        if alterados:
+            conn = get_connection(self.db_path)
+            marcadores = ', '.join('?' * len(alterados))
+            rows = conn.execute(f"""
+                SELECT id, nome, telefone, data_consulta, hora_consulta, status, fase_conversa
+                FROM pacientes
+                WHERE id IN ({marcadores})
+            """, alterados).fetchall()
+            conn.close()
+
+            hoje = date.today().isoformat()
+            for row in rows:
+                if row[5] in STATUS_NA_FILA and row[3] and row[3] >= hoje:
+                    self._guardar(row)
+
+        self._plano = None
+
+    def _janela(self, agora: datetime, limites: Dict) -> tuple:
+        """(início, fim) dos envios a partir de agora, no dia de hoje"""
+        meia_noite = datetime.combine(agora.date(), datetime.min.time())
+
+        if self._trabalha_24h:
+            return agora, meia_noite + timedelta(days=1)
+
+        inicio = meia_noite + timedelta(hours=limites.get('horario_inicio', 0))
+        fim = meia_noite + timedelta(hours=limites.get('horario_fim', 24))
+        return max(agora, inicio), fim
+
+    def plano(self, agora: Optional[datetime] = None) -> Dict:
+        """
+        Plano de envios de hoje.
+
+        Retorna dict com 'envios' (lista de contatos com 'horario' previsto,
+        em ordem), 'nao_planejados' (com 'motivo'), 'inicio', 'fim' e
+        'restantes_hoje' (primeiros contatos ainda permitidos).
+        """
+        agora = (agora or datetime.now()).replace(microsecond=0)
+
+        if (self._plano is not None and self._plano['calculado_em'].date() == agora.date()
+                and (not self._plano['envios'] or self._plano['envios'][0]['horario'] >= agora)):
+            return self._plano
+
+        self._plano = self._calcular(agora)
+        return self._plano
+
+    def _calcular(self, agora: datetime) -> Dict:
+        situacao = rate_limiter.situacao(self.db_path, int(agora.timestamp() * MICROSSEGUNDOS))
+        limites = situacao['limites']
+
+        intervalo = timedelta(seconds=limites['intervalo_minimo_segundos'])
+        max_tentativas = limites['max_tentativas_paciente']
+        teto_restante = limites['max_primeiros_contatos_dia'] - sum(
+            situacao['por_tipo'].get(tipo, 0) for tipo in TIPOS_COM_TETO_DIARIO
+        )
+        restantes_hoje = max(teto_restante, 0)
+
+        inicio, fim = self._janela(agora, limites)
+
+        # Quando cada número pode voltar a ser contatado e quantas tentativas restam
+        livre_em: Dict[str, datetime] = {}
+        tentativas: Dict[str, int] = {}
+        for telefone, numero in situacao['numeros'].items():
+            if numero['ultimo_us']:
+                livre_em[telefone] = datetime.fromtimestamp(numero['ultimo_us'] / MICROSSEGUNDOS) + intervalo
+            tentativas[telefone] = max_tentativas - numero['total']
+
+        def prioridade(item):
+            return (item['consulta'], item['paciente_id'])
+
+        prontos = []     # (consulta, id) — consulta mais próxima primeiro
+        bloqueados = []  # (livre_em, consulta, id) — aguardando o intervalo do número
+        for item in self._fila.values():
+            livre = livre_em.get(item['telefone'])
+            if livre and livre > inicio:
+                heapq.heappush(bloqueados, (livre, *prioridade(item)))
+            else:
+                heapq.heappush(prontos, prioridade(item))
+
+        envios: List[Dict] = []
+        nao_planejados: List[Dict] = []
+        horario = inicio
+
+        while horario < fim and (prontos or bloqueados):
+            while bloqueados and bloqueados[0][0] <= horario:
+                heapq.heappush(prontos, heapq.heappop(bloqueados)[1:])
+
+            if not prontos:
+                horario = bloqueados[0][0]
+                continue
+
+            item = self._fila[heapq.heappop(prontos)[1]]
+            telefone = item['telefone']
+
+            if item['consulta'] <= horario:
+                nao_planejados.append({**item, 'motivo': 'consulta_passada'})
+                continue
+
+            if item['tipo'] in TIPOS_COM_TETO_DIARIO and teto_restante <= 0:
+                nao_planejados.append({**item, 'motivo': 'limite_diario'})
+                continue
+
+            if tentativas.get(telefone, max_tentativas) <= 0:
+                nao_planejados.append({**item, 'motivo': 'limite_numero'})
+                continue
+
+            livre = livre_em.get(telefone)
+            if livre and livre > horario:
+                # Mesmo número já planejado há pouco: volta quando liberar
+                heapq.heappush(bloqueados, (livre, *prioridade(item)))
+                continue
+
+            # O intervalo mínimo vale por número (como no RateLimiter):
+            # números diferentes podem ir no mesmo horário
+            envios.append({**item, 'horario': horario})
+            livre_em[telefone] = horario + intervalo
+            tentativas[telefone] = tentativas.get(telefone, max_tentativas) - 1
+            if item['tipo'] in TIPOS_COM_TETO_DIARIO:
+                teto_restante -= 1
+
+        for _, pid in prontos:
+            nao_planejados.append({**self._fila[pid], 'motivo': 'fora_do_horario'})
+        for _, _, pid in bloqueados:
+            nao_planejados.append({**self._fila[pid], 'motivo': 'fora_do_horario'})
+
+        return {
+            'calculado_em': agora,
+            'inicio': inicio,
+            'fim': fim,
+            'envios': envios,
+            'nao_planejados': nao_planejados,
+            'restantes_hoje': restantes_hoje,
+        }
@@ -0,0 +1,160 @@
+"""
+Pré-preparação de mensagens em segundo plano
+Enquanto o atendente percorre a lista, os próximos pacientes pendentes já
+têm a mensagem renderizada, e o MessagePreview abre sem ir ao banco.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+from backend.connection import get_connection
+from backend.messaging import MessageManager
+
+
+class MessagePrefetcher:
+    """
+    Worker que renderiza a mensagem dos próximos `quantidade` pacientes
+    pendentes da fila informada por definir_fila().
+
+    As entradas valem por `validade` segundos e são descartadas quando a
+    linha do paciente muda (descartar()). Nada é gravado no banco nem na
+    memória anti-repetição: a mensagem só vira 'mensagem_preparada' (e o
+    template conta como usado) quando o atendente confirma.
+    """
+
+    def __init__(self, db_path: str, quantidade: int = 10, validade: float = 300.0):
+        self.db_path = db_path
+        self.quantidade = quantidade
+        self.validade = validade
+        self.logger = logging.getLogger('MessagePrefetcher')
+        self.msg_manager = MessageManager(db_path)
+
+        self._lock = threading.Lock()
+        self._evento = threading.Event()
+        self._fila: List[int] = []
+        self._cache: Dict[int, Dict] = {}
+        self._epoca = 0
+        self._descartes: Dict[int, int] = {}  # paciente_id -> época do descarte
+        self._rodando = False
+        self._thread = None
+
+    def iniciar(self):
+        if self._rodando:
+            return
+        self._rodando = True
+        self._thread = threading.Thread(target=self._loop, daemon=True, name='MessagePrefetcher')
+        self._thread.start()
+
+    def parar(self):
+        self._rodando = False
+        self._evento.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def definir_fila(self, paciente_ids: Iterable[int]):
+        """Informa a ordem de trabalho atual (próximos pacientes primeiro)"""
+        with self._lock:
+            self._fila = list(paciente_ids)[:self.quantidade]
+        self._evento.set()
+
+    def descartar(self, paciente_ids: Iterable[int]):
+        """Remove entradas de pacientes cuja linha mudou"""
+        with self._lock:
+            self._epoca += 1
+            for pid in paciente_ids:
+                self._cache.pop(pid, None)
+                self._descartes[pid] = self._epoca
+
+            # Só descartes recentes importam (renderizações em andamento)
+            if len(self._descartes) > 1000:
+                self._descartes = {p: e for p, e in self._descartes.items() if e > self._epoca - 10}
+        self._evento.set()
+
+    def obter(self, paciente_id: int) -> Optional[Dict]:
+        """
+        Retorna (e consome) a mensagem pré-renderizada do paciente, ou None.
+
+        Dict com 'paciente' (mesmos campos carregados pelo MessagePreview),
+        'tipo', 'mensagem_id' e 'mensagem'.
+        """
+        with self._lock:
+            entrada = self._cache.pop(paciente_id, None)
+
+        if entrada and time.monotonic() - entrada['criado_em'] <= self.validade:
+            return entrada
+        return None
+
+    def _pendentes_sem_cache(self) -> List[int]:
+        agora = time.monotonic()
+        with self._lock:
+            for pid in [p for p, e in self._cache.items() if agora - e['criado_em'] > self.validade]:
+                del self._cache[pid]
+
+            # Mantém só a fila atual: o cache não cresce com a navegação
+            for pid in [p for p in self._cache if p not in self._fila]:
+                del self._cache[pid]
+
+            return [pid for pid in self._fila if pid not in self._cache]
+
+    def _loop(self):
+        while self._rodando:
+            self._evento.wait(timeout=self.validade / 2)
+            self._evento.clear()
+
+            if not self._rodando:
+                break
+
+            try:
+                ids = self._pendentes_sem_cache()
+                if ids:
+                    self._renderizar(ids)
+            except Exception as e:
+                self.logger.error(f"Erro ao pré-preparar mensagens: {str(e)}")
+
+    def _renderizar(self, paciente_ids: List[int]):
+        with self._lock:
+            epoca = self._epoca
+
+        conn = get_connection(self.db_path)
+        marcadores = ', '.join('?' * len(paciente_ids))
+        rows = conn.execute(f"""
+            SELECT id, nome, telefone, data_consulta, hora_consulta,
+                   tipo_consulta, profissional, status, mensagem_preparada,
+                   consentimento_whatsapp
+            FROM pacientes
+            WHERE id IN ({marcadores}) AND status = 'pendente'
+        """, paciente_ids).fetchall()
+        conn.close()
+
+        entradas = {}
+        for row in rows:
+            paciente = {
+                'id': row[0],
+                'nome': row[1],
+                'telefone': row[2],
+                'data_consulta': row[3],
+                'hora_consulta': row[4],
+                'tipo_consulta': row[5],
+                'profissional': row[6],
+                'status': row[7],
+                'mensagem_preparada': row[8],
+                'consentimento': row[9]
+            }
+            tipo = MessageManager.tipo_por_status(paciente['status'])
+            mensagem_id, mensagem = self.msg_manager.renderizar_mensagem(tipo, paciente)
+
+            entradas[row[0]] = {
+                'paciente': paciente,
+                'tipo': tipo,
+                'mensagem_id': mensagem_id,
+                'mensagem': mensagem,
+                'criado_em': time.monotonic()
+            }
+
+        with self._lock:
+            for pid, entrada in entradas.items():
+                # Linha alterada enquanto renderizávamos: dados já obsoletos
+                if self._descartes.get(pid, -1) > epoca or pid not in self._fila:
+                    continue
+                self._cache[pid] = entrada
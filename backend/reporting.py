@@ -1,18 +1,18 @@
-import sqlite3
 from datetime import date, datetime
-from typing import Dict, List
+from typing import Dict, List, Tuple
+from backend.connection import get_connection
 
 class ReportingManager:
     def __init__(self, db_path: str):
         self.db_path = db_path
     
     def _get_connection(self):
-        return sqlite3.connect(self.db_path, timeout=10)
+        return get_connection(self.db_path)
     
     def gerar_relatorio_diario(self, data: str = None) -> Dict:
         """Gera relatório diário de confirmações"""
         if not data:
-            data = date.today().strftime('%d/%m/%Y')
+            data = date.today().isoformat()
         
         conn = self._get_connection()
         cursor = conn.cursor()
@@ -57,6 +57,32 @@ class ReportingManager:
             'taxa_confirmacao': round(taxa_confirmacao, 2)
         }
     
+    def estatisticas_por_dia(self, data_inicio: str, data_fim: str) -> Dict[str, Tuple[int, int, int, int]]:
+        """
+        (total, confirmados, aguardando, sem_resposta) por data de consulta no
+        período, numa única consulta agrupada (o custo não cresce em consultas
+        com o tamanho do período). Dias sem pacientes não aparecem.
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT
+                data_consulta,
+                COUNT(*) as total,
+                SUM(CASE WHEN status = 'confirmado' THEN 1 ELSE 0 END) as confirmados,
+                SUM(CASE WHEN status IN ('mensagem_preparada', 'mensagem_enviada') THEN 1 ELSE 0 END) as aguardando,
+                SUM(CASE WHEN status = 'sem_resposta' THEN 1 ELSE 0 END) as sem_resposta
+            FROM pacientes
+            WHERE data_consulta BETWEEN ? AND ?
+            GROUP BY data_consulta
+        """, (data_inicio, data_fim))
+
+        estatisticas = {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+        conn.close()
+
+        return estatisticas
+
     def obter_estatisticas_gerais(self) -> Dict:
         """Retorna estatísticas gerais do sistema"""
         conn = self._get_connection()
@@ -2,7 +2,90 @@ import re
 import validators
 import phonenumbers
 from datetime import datetime, time
-from typing import Dict, Tuple
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+from backend.connection import get_connection
+
+# DDDs em uso no Brasil (plano de numeração da Anatel)
+DDDS_VALIDOS = frozenset({
+    11, 12, 13, 14, 15, 16, 17, 18, 19, 21, 22, 24, 27, 28,
+    31, 32, 33, 34, 35, 37, 38, 41, 42, 43, 44, 45, 46, 47, 48, 49,
+    51, 53, 54, 55, 61, 62, 63, 64, 65, 66, 67, 68, 69,
+    71, 73, 74, 75, 77, 79, 81, 82, 83, 84, 85, 86, 87, 88, 89,
+    91, 92, 93, 94, 95, 96, 97, 98, 99,
+})
+
+# Celular brasileiro bem formado: DDD + 9 + 8 dígitos, com ou sem +55
+_CELULAR_BR = re.compile(r'(?:\+55)?(\d{2})(9\d{8})')
+
+
+# Códigos de erro de validar_cpfs_lote / validar_emails_lote
+CPF_OK, CPF_TAMANHO, CPF_REPETIDO, CPF_DIGITO = 0, 1, 2, 3
+ERROS_CPF = {
+    CPF_TAMANHO: 'CPF deve ter 11 dígitos',
+    CPF_REPETIDO: 'CPF inválido',
+    CPF_DIGITO: 'CPF inválido',
+}
+EMAIL_OK, EMAIL_INVALIDO = 0, 1
+ERROS_EMAIL = {EMAIL_INVALIDO: 'Email inválido'}
+
+_NAO_DIGITO = re.compile(r'[^0-9]')
+
+# Forma comum de email, sempre aceita por validators.email; o resto vai para ele
+_EMAIL_COMUM = re.compile(
+    r'[A-Za-z0-9_+-]+(?:\.[A-Za-z0-9_+-]+)*'
+    r'@(?:[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?\.)+[A-Za-z]{2,63}'
+)
+
+
+def _vazio(valor) -> bool:
+    """None, NaN (pandas) ou texto em branco"""
+    return valor is None or valor != valor or (isinstance(valor, str) and not valor.strip())
+
+
+def _texto(valor) -> str:
+    # Colunas numéricas com NaN chegam como float (12345678909.0)
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+@lru_cache(maxsize=65536)
+def _validar_telefone(numero: str) -> Tuple[bool, str, str]:
+    """Validação de SecurityValidator.validar_telefone (memoizada)"""
+    # Remover caracteres não numéricos
+    numero_limpo = re.sub(r'[^\d+]', '', numero)
+    
+    # Caso comum (celular com DDD) dispensa o parse completo; o resultado é
+    # o mesmo que o phonenumbers daria para esses números
+    celular = _CELULAR_BR.fullmatch(numero_limpo)
+    if celular and int(celular.group(1)) in DDDS_VALIDOS:
+        return True, f'+55{celular.group(1)}{celular.group(2)}', ''
+    
+    # Adicionar código do país se não tiver
+    if not numero_limpo.startswith('+'):
+        numero_limpo = '+55' + numero_limpo
+    
+    try:
+        telefone = phonenumbers.parse(numero_limpo)
+        
+        if not phonenumbers.is_valid_number(telefone):
+            return False, '', 'Número de telefone inválido'
+        
+        # Verificar se é brasileiro
+        if telefone.country_code != 55:
+            return False, '', 'Sistema aceita apenas números brasileiros'
+        
+        # Formatar número
+        numero_formatado = phonenumbers.format_number(
+            telefone, 
+            phonenumbers.PhoneNumberFormat.E164
+        )
+        
+        return True, numero_formatado, ''
+    
+    except phonenumbers.NumberParseException:
+        return False, '', 'Formato de número inválido'
 
 class SecurityValidator:
     def __init__(self, db_path: str):
@@ -13,33 +96,27 @@ class SecurityValidator:
         Valida número de telefone brasileiro
         Retorna: (válido, número_formatado, mensagem_erro)
         """
-        # Remover caracteres não numéricos
-        numero_limpo = re.sub(r'[^\d+]', '', numero)
-        
-        # Adicionar código do país se não tiver
-        if not numero_limpo.startswith('+'):
-            numero_limpo = '+55' + numero_limpo
+        return _validar_telefone(numero)
+    
+    def validar_telefones_lote(self, numeros: Iterable) -> List[Tuple[bool, str, str]]:
+        """
+        Valida uma coluna inteira de telefones (ex: planilha importada).
+        Retorna um resultado de validar_telefone por item, na mesma ordem;
+        valores vazios (None/NaN) contam como número inválido.
+        """
+        resultados = {}
+        saida = []
         
-        try:
-            telefone = phonenumbers.parse(numero_limpo)
-            
-            if not phonenumbers.is_valid_number(telefone):
-                return False, '', 'Número de telefone inválido'
+        for numero in numeros:
+            texto = '' if numero is None or numero != numero else str(numero)
             
-            # Verificar se é brasileiro
-            if telefone.country_code != 55:
-                return False, '', 'Sistema aceita apenas números brasileiros'
-            
-            # Formatar número
-            numero_formatado = phonenumbers.format_number(
-                telefone, 
-                phonenumbers.PhoneNumberFormat.E164
-            )
-            
-            return True, numero_formatado, ''
+            # Planilhas repetem muitos números: cada valor distinto é validado uma vez
+            resultado = resultados.get(texto)
+            if resultado is None:
+                resultado = resultados[texto] = _validar_telefone(texto)
+            saida.append(resultado)
         
-        except phonenumbers.NumberParseException:
-            return False, '', 'Formato de número inválido'
+        return saida
     
     def validar_email(self, email: str) -> Tuple[bool, str]:
         """Valida formato de email"""
@@ -51,6 +128,89 @@ class SecurityValidator:
         
         return True, ''
     
+    def validar_emails_lote(self, emails: Iterable):
+        """
+        Valida uma coluna de emails (vazios são aceitos, email é opcional).
+        
+        Ao contrário dos CPFs, não há cálculo vetorizável: cada valor distinto
+        passa uma vez pela regex _EMAIL_COMUM (validators.email só para o que
+        ela não aceita) e os repetidos reaproveitam o resultado. O NumPy só
+        guarda os códigos, no mesmo formato de validar_cpfs_lote.
+        Retorna (máscara de válidos, códigos de erro) como arrays NumPy;
+        ERROS_EMAIL traduz os códigos.
+        """
+        # Import local de propósito: este módulo é carregado no login e o
+        # numpy fica fora da inicialização (ver scripts/benchmark_inicializacao.py)
+        import numpy as np
+        
+        valores = list(emails)
+        codigos = np.zeros(len(valores), dtype=np.int8)
+        resultados = {}
+        
+        for i, email in enumerate(valores):
+            if _vazio(email):
+                continue
+            
+            texto = _texto(email)
+            codigo = resultados.get(texto)
+            if codigo is None:
+                arroba = texto.find('@')
+                comum = arroba <= 64 and len(texto) - arroba <= 254 and _EMAIL_COMUM.fullmatch(texto)
+                codigo = resultados[texto] = EMAIL_OK if comum or validators.email(texto) else EMAIL_INVALIDO
+            codigos[i] = codigo
+        
+        return codigos == EMAIL_OK, codigos
+    
+    def validar_cpfs_lote(self, cpfs: Iterable):
+        """
+        Valida uma coluna de CPFs de uma vez (vazios são aceitos, CPF é opcional).
+        
+        Os dígitos verificadores são calculados sobre uma matriz N x 11 de
+        inteiros NumPy. Retorna (máscara de válidos, códigos de erro);
+        ERROS_CPF traduz os códigos nas mesmas mensagens de validar_cpf.
+        """
+        import numpy as np  # Local, como em validar_emails_lote
+        
+        valores = list(cpfs)
+        codigos = np.zeros(len(valores), dtype=np.int8)
+        
+        limpos = []
+        indices = []
+        for i, cpf in enumerate(valores):
+            if cpf.__class__ is not str:
+                if _vazio(cpf):
+                    continue
+                cpf = _texto(cpf)
+            
+            # Atalho para os formatos usuais (só dígitos ou 000.000.000-00)
+            digitos = cpf.replace('.', '').replace('-', '')
+            if len(digitos) != 11 or not (digitos.isascii() and digitos.isdigit()):
+                if not cpf.strip():
+                    continue
+                digitos = _NAO_DIGITO.sub('', cpf)
+                if len(digitos) != 11:
+                    codigos[i] = CPF_TAMANHO
+                    continue
+            
+            limpos.append(digitos)
+            indices.append(i)
+        
+        if limpos:
+            matriz = np.frombuffer(''.join(limpos).encode('ascii'), dtype=np.uint8)
+            matriz = matriz.reshape(-1, 11).astype(np.int64) - ord('0')
+            
+            repetidos = (matriz == matriz[:, :1]).all(axis=1)
+            
+            resto1 = (matriz[:, :9] @ np.arange(10, 1, -1)) % 11
+            resto2 = (matriz[:, :10] @ np.arange(11, 1, -1)) % 11
+            digito1 = np.where(resto1 < 2, 0, 11 - resto1)
+            digito2 = np.where(resto2 < 2, 0, 11 - resto2)
+            corretos = (matriz[:, 9] == digito1) & (matriz[:, 10] == digito2)
+            
+            codigos[indices] = np.where(repetidos, CPF_REPETIDO, np.where(corretos, CPF_OK, CPF_DIGITO))
+        
+        return codigos == CPF_OK, codigos
+    
     def validar_cpf(self, cpf: str) -> Tuple[bool, str]:
         """Valida CPF brasileiro"""
         if not cpf:
@@ -83,9 +243,7 @@ class SecurityValidator:
     
     def verificar_horario_permitido(self) -> Tuple[bool, str]:
         """Verifica se está no horário permitido para envios"""
-        import sqlite3
-
-        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
 
         # Verificar se trabalha 24h
@@ -119,9 +277,7 @@ class SecurityValidator:
     
     def validar_intervalo_envio(self, ultimo_envio: datetime) -> Tuple[bool, str]:
         """Verifica intervalo mínimo entre envios"""
-        import sqlite3
-        
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
         
         cursor.execute("""
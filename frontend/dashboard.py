@@ -1,14 +1,29 @@
 import tkinter as tk
 from tkinter import ttk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
+import math
 import sqlite3
 from datetime import date, timedelta
+from backend.reporting import ReportingManager
+
+# Períodos do gráfico de barras (dias)
+PERIODOS = (7, 30, 90)
+SEM_PACIENTES = (0, 0, 0, 0)
+
+ROTULOS_PIZZA = ['Confirmados', 'Aguardando', 'Sem Resposta', 'Outros']
+CORES_PIZZA = ['#2ecc71', '#f39c12', '#e74c3c', '#95a5a6']
 
 class Dashboard:
-    def __init__(self, parent, db_path: str):
+    def __init__(self, parent, db_path: str, periodo: int = PERIODOS[0]):
         self.db_path = db_path
+        self.reporting = ReportingManager(db_path)
+        self.periodo = periodo
+        self._hoje = None
+        self.kpis = SEM_PACIENTES
+        self.confirmados_por_dia = {}
+        # Gráficos (e o matplotlib) só são criados quando a aba é exibida
+        self._exibido = False
+        self.canvas_pizza = None
+        self.barras = None
         
         self.frame = ttk.Frame(parent)
         self._criar_interface()
@@ -30,27 +45,16 @@ class Dashboard:
         for i, (key, label, cor) in enumerate(metricas):
             card = self._criar_card(cards_frame, label, "0", cor)
             card.grid(row=0, column=i, padx=5, sticky=(tk.W, tk.E))
+            self.cards[key] = card
 
         cards_frame.columnconfigure(0, weight=1)
         cards_frame.columnconfigure(1, weight=1)
         cards_frame.columnconfigure(2, weight=1)
         cards_frame.columnconfigure(3, weight=1)
 
-        # Frame de gráficos - mais compacto
-        graficos_frame = ttk.Frame(self.frame)
-        graficos_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
-
-        # Gráfico de Pizza - menor
-        self.fig_pizza = Figure(figsize=(4, 3), dpi=80)
-        self.ax_pizza = self.fig_pizza.add_subplot(111)
-        self.canvas_pizza = FigureCanvasTkAgg(self.fig_pizza, graficos_frame)
-        self.canvas_pizza.get_tk_widget().pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 5))
-
-        # Gráfico de Barras - menor
-        self.fig_barras = Figure(figsize=(4, 3), dpi=80)
-        self.ax_barras = self.fig_barras.add_subplot(111)
-        self.canvas_barras = FigureCanvasTkAgg(self.fig_barras, graficos_frame)
-        self.canvas_barras.get_tk_widget().pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        # Frame de gráficos - mais compacto (preenchido por _criar_graficos)
+        self.graficos_frame = ttk.Frame(self.frame)
+        self.graficos_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
 
         # Mensagem quando não há dados
         self.msg_frame = ttk.Frame(self.frame)
@@ -65,12 +69,60 @@ class Dashboard:
         self.msg_label.pack(pady=20)
         self.msg_frame.pack(fill=tk.BOTH, expand=True)
 
-        # Botão Atualizar - mais compacto
+        # Período e botão Atualizar - mais compacto
+        controles_frame = ttk.Frame(self.frame)
+        controles_frame.pack(pady=5)
+
+        ttk.Label(controles_frame, text="Período:").pack(side=tk.LEFT)
+        self.periodo_var = tk.IntVar(value=self.periodo)
+        for dias in PERIODOS:
+            ttk.Radiobutton(
+                controles_frame,
+                text=f"{dias} dias",
+                value=dias,
+                variable=self.periodo_var,
+                command=self._mudar_periodo
+            ).pack(side=tk.LEFT, padx=2)
+
         ttk.Button(
-            self.frame,
+            controles_frame,
             text="🔄 Atualizar",
             command=self._atualizar_dados
-        ).pack(pady=5)
+        ).pack(side=tk.LEFT, padx=(10, 0))
+
+    def _criar_graficos(self):
+        # Importado aqui: matplotlib é a dependência mais lenta de carregar e
+        # não deve atrasar o login (frontend/warmup.py pode adiantá-lo)
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+
+        # Gráfico de Pizza - menor. Fatias e textos são criados uma vez e
+        # reposicionados a cada atualização (_atualizar_pizza)
+        self.fig_pizza = Figure(figsize=(4, 3), dpi=80)
+        self.ax_pizza = self.fig_pizza.add_subplot(111)
+        self.fatias, self.rotulos, self.percentuais = self.ax_pizza.pie(
+            [1] * len(ROTULOS_PIZZA), labels=ROTULOS_PIZZA, colors=CORES_PIZZA, autopct='%1.1f%%', startangle=90
+        )
+        self.texto_sem_dados = self.ax_pizza.text(
+            0.5, 0.5, 'Sem dados\npara hoje', ha='center', va='center',
+            transform=self.ax_pizza.transAxes, fontsize=12, visible=False
+        )
+        self.ax_pizza.set_title('Distribuição de Status - Hoje')
+        self.canvas_pizza = FigureCanvasTkAgg(self.fig_pizza, self.graficos_frame)
+        self.canvas_pizza.get_tk_widget().pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 5))
+
+        # Gráfico de Barras - menor (barras criadas em _atualizar_barras)
+        self.fig_barras = Figure(figsize=(4, 3), dpi=80)
+        self.ax_barras = self.fig_barras.add_subplot(111)
+        self.ax_barras.set_xlabel('Data')
+        self.ax_barras.set_ylabel('Confirmados')
+        self.canvas_barras = FigureCanvasTkAgg(self.fig_barras, self.graficos_frame)
+        self.canvas_barras.get_tk_widget().pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+    def exibir(self):
+        """Chamado quando a aba é selecionada: cria os gráficos na primeira vez e atualiza"""
+        self._exibido = True
+        self._atualizar_dados()
 
     def _criar_card(self, parent, titulo, valor, cor):
         card_frame = ttk.Frame(parent, relief=tk.RAISED, borderwidth=2)
@@ -93,80 +145,47 @@ class Dashboard:
         return card_frame
     
     def _atualizar_dados(self):
+        self._carregar(None)
+
+    def _mudar_periodo(self):
+        self.periodo = self.periodo_var.get()
+        self._carregar(None)
+
+    def aplicar_alteracoes(self, alteracoes: dict):
+        """
+        Recalcula apenas os dias afetados pelas alterações (ver ChangeMonitor).
+        Alterações fora do período exibido não geram consulta nem redesenho.
+        """
+        if alteracoes['recarregar'] or self._hoje != date.today().isoformat():
+            self._carregar(None)
+            return
+
+        dias = alteracoes['datas'] & set(self.confirmados_por_dia)
+        if dias:
+            self._carregar(dias)
+
+    def _carregar(self, dias):
+        """Consulta os dias informados (None = período inteiro) e redesenha"""
         try:
-            conn = sqlite3.connect(self.db_path, timeout=10)
-            cursor = conn.cursor()
-
-            # Formatar data no formato DD/MM/YYYY (como armazenado no banco)
-            hoje = date.today().strftime('%d/%m/%Y')
-
-            # KPIs do dia
-            cursor.execute("""
-                SELECT
-                    COUNT(*) as total,
-                    COALESCE(SUM(CASE WHEN status = 'confirmado' THEN 1 ELSE 0 END), 0) as confirmados,
-                    COALESCE(SUM(CASE WHEN status IN ('mensagem_preparada', 'mensagem_enviada') THEN 1 ELSE 0 END), 0) as aguardando,
-                    COALESCE(SUM(CASE WHEN status = 'sem_resposta' THEN 1 ELSE 0 END), 0) as sem_resposta
-                FROM pacientes
-                WHERE data_consulta = ?
-            """, (hoje,))
-
-            result = cursor.fetchone()
-
-            # Atualizar cards
-            self.cards['total'].valor_label.config(text=str(result[0]))
-            self.cards['confirmados'].valor_label.config(text=str(result[1]))
-            self.cards['aguardando'].valor_label.config(text=str(result[2]))
-            self.cards['sem_resposta'].valor_label.config(text=str(result[3]))
-
-            # Mostrar/ocultar mensagem de ajuda
-            if result[0] == 0:
-                self.msg_label.config(text="📊 Adicione pacientes para ver as estatísticas do dashboard\n\nUse 'Pacientes > Novo Paciente' ou importe uma planilha")
-            else:
-                self.msg_label.config(text="")
+            hoje = date.today().isoformat()
 
-            # Dados para gráfico de pizza
-            labels = ['Confirmados', 'Aguardando', 'Sem Resposta', 'Outros']
-            sizes = [result[1], result[2], result[3], result[0] - (result[1] + result[2] + result[3])]
-            colors = ['#2ecc71', '#f39c12', '#e74c3c', '#95a5a6']
+            if dias is None:
+                self._hoje = hoje
+                self.confirmados_por_dia = {
+                    (date.today() - timedelta(days=i)).isoformat(): 0 for i in range(self.periodo - 1, -1, -1)
+                }
+                dias = set(self.confirmados_por_dia)
 
-            # Atualizar gráfico de pizza
-            self.ax_pizza.clear()
-            if sum(sizes) > 0:
-                self.ax_pizza.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
-            else:
-                self.ax_pizza.text(0.5, 0.5, 'Sem dados\npara hoje', ha='center', va='center', transform=self.ax_pizza.transAxes, fontsize=12)
-            self.ax_pizza.set_title('Distribuição de Status - Hoje')
-            self.canvas_pizza.draw()
-
-            # Dados últimos 7 dias
-            datas = []
-            confirmados_por_dia = []
-
-            for i in range(6, -1, -1):
-                data_obj = date.today() - timedelta(days=i)
-                data_formatada = data_obj.strftime('%d/%m/%Y')  # Formato DD/MM/YYYY
-                datas.append(data_obj.strftime('%m-%d'))  # MM-DD para exibição
-
-                cursor.execute("""
-                    SELECT COUNT(*)
-                    FROM pacientes
-                    WHERE data_consulta = ? AND status = 'confirmado'
-                """, (data_formatada,))
-
-                confirmados_por_dia.append(cursor.fetchone()[0])
-
-            conn.close()
-
-            # Atualizar gráfico de barras
-            self.ax_barras.clear()
-            self.ax_barras.bar(datas, confirmados_por_dia, color='#3498db')
-            self.ax_barras.set_title('Confirmações - Últimos 7 Dias')
-            self.ax_barras.set_xlabel('Data')
-            self.ax_barras.set_ylabel('Confirmados')
-            self.ax_barras.tick_params(axis='x', rotation=45)
-            self.fig_barras.tight_layout()
-            self.canvas_barras.draw()
+            # Uma consulta agrupada por dia cobre os KPIs de hoje e as barras
+            estatisticas = self.reporting.estatisticas_por_dia(min(dias), max(dias))
+
+            if hoje in dias:
+                self.kpis = estatisticas.get(hoje, SEM_PACIENTES)
+
+            for dia in dias:
+                self.confirmados_por_dia[dia] = estatisticas.get(dia, SEM_PACIENTES)[1]
+
+            self._desenhar()
 
         except sqlite3.OperationalError as e:
             if "database is locked" in str(e):
@@ -177,4 +196,81 @@ class Dashboard:
                 raise
         except Exception as e:
             # Para outros erros, também ignorar para não quebrar a interface
-            pass
\ No newline at end of file
+            pass
+
+    def _desenhar(self):
+        result = self.kpis
+
+        # Atualizar cards
+        self.cards['total'].valor_label.config(text=str(result[0]))
+        self.cards['confirmados'].valor_label.config(text=str(result[1]))
+        self.cards['aguardando'].valor_label.config(text=str(result[2]))
+        self.cards['sem_resposta'].valor_label.config(text=str(result[3]))
+
+        # Mostrar/ocultar mensagem de ajuda
+        if result[0] == 0:
+            self.msg_label.config(text="📊 Adicione pacientes para ver as estatísticas do dashboard\n\nUse 'Pacientes > Novo Paciente' ou importe uma planilha")
+        else:
+            self.msg_label.config(text="")
+
+        if not self._exibido:
+            return
+        if self.canvas_pizza is None:
+            self._criar_graficos()
+
+        # Dados para gráfico de pizza
+        sizes = [result[1], result[2], result[3], result[0] - (result[1] + result[2] + result[3])]
+        self._atualizar_pizza(sizes)
+        self._atualizar_barras()
+
+    def _atualizar_pizza(self, sizes):
+        """Reposiciona as fatias e os textos criados em _criar_graficos (sem recriar o gráfico)"""
+        total = sum(sizes)
+        self.texto_sem_dados.set_visible(total == 0)
+
+        angulo = 90.0
+        for fatia, rotulo, percentual, valor in zip(self.fatias, self.rotulos, self.percentuais, sizes):
+            abertura = 360.0 * valor / total if total else 0.0
+            fatia.set_theta1(angulo)
+            fatia.set_theta2(angulo + abertura)
+
+            # Mesmas distâncias que o pie() usa por padrão
+            meio = math.radians(angulo + abertura / 2)
+            x, y = math.cos(meio), math.sin(meio)
+            rotulo.set_position((1.1 * x, 1.1 * y))
+            rotulo.set_horizontalalignment('left' if x >= 0 else 'right')
+            percentual.set_position((0.6 * x, 0.6 * y))
+            percentual.set_text(f'{100.0 * valor / total:.1f}%' if total else '')
+
+            for artista in (fatia, rotulo, percentual):
+                artista.set_visible(valor > 0)
+            angulo += abertura
+
+        self.canvas_pizza.draw_idle()
+
+    def _atualizar_barras(self):
+        """Atualiza a altura das barras; só recria quando o período muda"""
+        dias = list(self.confirmados_por_dia)
+        valores = list(self.confirmados_por_dia.values())
+
+        novo_periodo = self.barras is None or len(self.barras) != len(dias)
+        if novo_periodo:
+            if self.barras is not None:
+                self.barras.remove()
+            self.barras = self.ax_barras.bar(range(len(dias)), valores, color='#3498db')
+            self.ax_barras.set_xlim(-0.6, len(dias) - 0.4)
+            self.ax_barras.set_title(f'Confirmações - Últimos {len(dias)} Dias')
+        else:
+            for barra, valor in zip(self.barras, valores):
+                barra.set_height(valor)
+
+        # Rótulos MM-DD (no máximo ~10) refeitos sempre: o período anda à meia-noite
+        passo = max(1, len(dias) // 10)
+        posicoes = list(range(len(dias) - 1, -1, -passo))[::-1]
+        self.ax_barras.set_xticks(posicoes)
+        self.ax_barras.set_xticklabels([dias[i][5:] for i in posicoes], rotation=45)
+        self.ax_barras.set_ylim(0, max(max(valores, default=0), 1) * 1.15)
+
+        if novo_periodo:
+            self.fig_barras.tight_layout()
+        self.canvas_barras.draw_idle()
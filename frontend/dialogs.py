@@ -2,14 +2,14 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from backend.security import SecurityValidator
 from backend.lgpd import LGPDManager
+from backend.connection import PERFIS_ARMAZENAMENTO, PERFIL_PADRAO, connection_manager, get_connection
+from backend.dates import para_iso, normalizar_hora, para_exibicao
+from backend.messaging import template_cache
+from backend.limits import rate_limiter
+from backend.importer import PatientImporter, ImportJob
 import sqlite3
 from datetime import datetime
-import pandas as pd
 import os
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib import colors
 
 class Dialogs:
     @staticmethod
@@ -186,20 +186,24 @@ class PatientDialog:
                 messagebox.showerror("Erro", f"CPF inválido: {erro}")
                 return
 
-        # Validar datas
+        # Validar datas (gravadas em ISO)
         try:
-            if dados['data_nascimento']:
-                datetime.strptime(dados['data_nascimento'], '%d/%m/%Y')
-            if dados['data_consulta']:
-                datetime.strptime(dados['data_consulta'], '%d/%m/%Y')
+            dados['data_nascimento'] = para_iso(dados['data_nascimento'])
+            dados['data_consulta'] = para_iso(dados['data_consulta'])
         except ValueError:
             messagebox.showerror("Erro", "Formato de data inválido. Use DD/MM/YYYY")
             return
 
+        try:
+            dados['hora_consulta'] = normalizar_hora(dados['hora_consulta'])
+        except ValueError:
+            messagebox.showerror("Erro", "Formato de hora inválido. Use HH:MM")
+            return
+
         # Salvar no banco
         conn = None
         try:
-            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn = get_connection(self.db_path)
             cursor = conn.cursor()
 
             cursor.execute("""
@@ -225,8 +229,10 @@ class PatientDialog:
             ))
 
             paciente_id = cursor.lastrowid
+            conn.commit()
 
-            # Registrar consentimento se fornecido
+            # Registrar consentimento se fornecido (o LGPDManager usa a
+            # mesma conexão compartilhada, por isso o cadastro já está gravado)
             if self.consentimento_var.get():
                 lgpd = LGPDManager(self.db_path)
                 lgpd.registrar_consentimento(
@@ -236,9 +242,6 @@ class PatientDialog:
                     'Consentimento obtido no cadastro'
                 )
 
-            conn.commit()
-            conn.close()
-
             messagebox.showinfo("Sucesso", "Paciente cadastrado com sucesso!")
             self.window.destroy()
 
@@ -247,6 +250,9 @@ class PatientDialog:
 
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao salvar: {str(e)}")
+        finally:
+            if conn:
+                conn.close()
 
     def _center_window(self):
         self.window.update_idletasks()
@@ -376,41 +382,25 @@ class ReportDialog:
     def _converter_data_para_sql(self, data_str: str) -> str:
         """Converte data de DD/MM/YYYY para YYYY-MM-DD"""
         try:
-            if not data_str or not data_str.strip():
-                return None
-            partes = data_str.strip().split('/')
-            if len(partes) == 3:
-                return f"{partes[2]}-{partes[1]}-{partes[0]}"
-            return data_str  # Já está no formato correto
-        except:
+            return para_iso(data_str)
+        except ValueError:
             return data_str
     
     def _converter_data_para_exibicao(self, data_str: str) -> str:
         """Converte data de YYYY-MM-DD para DD/MM/YYYY"""
-        try:
-            if not data_str:
-                return ''
-            if '/' in data_str:
-                return data_str  # Já está no formato correto
-            partes = data_str.split('-')
-            if len(partes) == 3:
-                return f"{partes[2]}/{partes[1]}/{partes[0]}"
-            return data_str
-        except:
-            return data_str
+        return para_exibicao(data_str)
 
     def _relatorio_diario(self, formato):
         from backend.reporting import ReportingManager
         from datetime import date
 
         reporting = ReportingManager(self.db_path)
-        # Usar formato DD/MM/YYYY que a função espera
-        data = date.today().strftime('%d/%m/%Y')
+        data = date.today().isoformat()
 
         relatorio = reporting.gerar_relatorio_diario(data)
 
         if formato == "tela":
-            msg = f"RELATÓRIO DIÁRIO - {relatorio['data']}\n\n"
+            msg = f"RELATÓRIO DIÁRIO - {para_exibicao(relatorio['data'])}\n\n"
             msg += f"Total de Pacientes: {relatorio['total_pacientes']}\n"
             msg += f"Confirmados: {relatorio['confirmados']}\n"
             msg += f"Aguardando Resposta: {relatorio['aguardando']}\n"
@@ -491,7 +481,7 @@ class ReportDialog:
             msg += f"Período: {self._converter_data_para_exibicao(data_inicio)} a {self._converter_data_para_exibicao(data_fim)}\n\n"
 
             for item in relatorio[:20]:  # Limitar a 20 primeiros
-                msg += f"Data: {item['data']} | Tipo: {item['tipo_mensagem']} | Envios: {item['total_envios']} | Únicos: {item['numeros_unicos']}\n"
+                msg += f"Data: {self._converter_data_para_exibicao(item['data'])} | Tipo: {item['tipo_mensagem']} | Envios: {item['total_envios']} | Únicos: {item['numeros_unicos']}\n"
 
             if len(relatorio) > 20:
                 msg += f"\n... e mais {len(relatorio) - 20} registros"
@@ -518,13 +508,18 @@ class ReportDialog:
                 defaultextension=".pdf",
                 filetypes=[("PDF files", "*.pdf")],
                 title="Salvar Relatório Diário",
-                initialfile=f"relatorio_diario_{relatorio['data'].replace('/', '-')}.pdf"
+                initialfile=f"relatorio_diario_{relatorio['data']}.pdf"
             )
 
             if not filename:
                 return
 
-            # Criar PDF
+            # Criar PDF (reportlab é carregado só ao exportar)
+            from reportlab.lib.pagesizes import letter
+            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+            from reportlab.lib import colors
+
             doc = SimpleDocTemplate(filename, pagesize=letter)
             styles = getSampleStyleSheet()
             story = []
@@ -537,7 +532,7 @@ class ReportDialog:
                 spaceAfter=30,
                 alignment=1  # Center
             )
-            story.append(Paragraph(f"Relatório Diário - {relatorio['data']}", title_style))
+            story.append(Paragraph(f"Relatório Diário - {para_exibicao(relatorio['data'])}", title_style))
             story.append(Spacer(1, 12))
 
             # Dados
@@ -595,6 +590,11 @@ class ReportDialog:
             if not filename:
                 return
 
+            from reportlab.lib.pagesizes import letter
+            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+            from reportlab.lib import colors
+
             doc = SimpleDocTemplate(filename, pagesize=letter)
             styles = getSampleStyleSheet()
             story = []
@@ -688,6 +688,11 @@ class ReportDialog:
             if not filename:
                 return
 
+            from reportlab.lib.pagesizes import letter
+            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+            from reportlab.lib import colors
+
             doc = SimpleDocTemplate(filename, pagesize=letter)
             styles = getSampleStyleSheet()
             story = []
@@ -864,7 +869,7 @@ class UserManagementDialog:
         for item in self.tree.get_children():
             self.tree.delete(item)
 
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
 
         cursor.execute("""
@@ -908,7 +913,7 @@ class UserManagementDialog:
         username = self.tree.item(selection[0])['values'][0]
 
         if messagebox.askyesno("Confirmar", f"Alterar status do usuário {username}?"):
-            conn = sqlite3.connect(self.db_path)
+            conn = get_connection(self.db_path)
             cursor = conn.cursor()
 
             cursor.execute("SELECT ativo FROM usuarios WHERE username = ?", (username,))
@@ -951,7 +956,7 @@ class UserManagementDialog:
 
         if messagebox.askyesno("Confirmar Exclusão",
                               f"Tem certeza que deseja excluir o usuário {username}?\n\nEsta ação não pode ser desfeita!"):
-            conn = sqlite3.connect(self.db_path)
+            conn = get_connection(self.db_path)
             cursor = conn.cursor()
 
             cursor.execute("DELETE FROM usuarios WHERE username = ?", (username,))
@@ -1041,7 +1046,7 @@ class UserDialog:
 
     def _load_user_data(self):
         """Carrega dados do usuário para edição"""
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
 
         cursor.execute("""
@@ -1076,7 +1081,7 @@ class UserDialog:
 
             if self.is_edit:
                 # Para edição, não alterar senha
-                conn = sqlite3.connect(self.db_path, timeout=10)
+                conn = get_connection(self.db_path)
                 cursor = conn.cursor()
                 cursor.execute("""
                     UPDATE usuarios
@@ -1193,7 +1198,7 @@ class PasswordDialog:
             # Gerar novo hash
             hashed = auth.hash_password(senha)
 
-            conn = sqlite3.connect(self.db_path)
+            conn = get_connection(self.db_path)
             cursor = conn.cursor()
             cursor.execute(
                 "UPDATE usuarios SET senha_hash = ? WHERE username = ?",
@@ -1310,6 +1315,28 @@ class SettingsDialog:
         self.horario_fim = ttk.Entry(limites_frame, width=20)
         self.horario_fim.grid(row=5, column=1, pady=5, padx=(10, 0))
 
+        # Aba Banco de Dados
+        banco_frame = ttk.Frame(self.notebook, padding="10")
+        self.notebook.add(banco_frame, text="Banco de Dados")
+
+        ttk.Label(banco_frame, text="Perfil de armazenamento:").grid(row=0, column=0, sticky=tk.W, pady=5)
+        self.perfil_armazenamento = ttk.Combobox(
+            banco_frame,
+            values=list(PERFIS_ARMAZENAMENTO.keys()),
+            state='readonly',
+            width=20
+        )
+        self.perfil_armazenamento.grid(row=0, column=1, pady=5, padx=(10, 0))
+
+        ttk.Label(
+            banco_frame,
+            text="desktop-safe: um computador, máxima segurança\n"
+                 "multi-attendant: vários atendentes no mesmo banco\n"
+                 "bulk-import: importações grandes de planilhas",
+            justify=tk.LEFT,
+            font=('Arial', 8)
+        ).grid(row=1, column=0, columnspan=2, sticky=tk.W, pady=5)
+
         # Botões
         btn_frame = ttk.Frame(main_frame)
         btn_frame.pack(fill=tk.X, pady=(20, 0))
@@ -1328,7 +1355,7 @@ class SettingsDialog:
 
     def _load_settings(self):
         """Carrega configurações atuais"""
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
 
         # Configurações gerais
@@ -1358,13 +1385,16 @@ class SettingsDialog:
         self.trabalha_24h.set(trabalha_24h)
         self._toggle_horarios()
 
+        # Perfil de armazenamento
+        self.perfil_armazenamento.set(configs.get('perfil_armazenamento', PERFIL_PADRAO))
+
         conn.close()
 
     def _salvar(self):
         """Salva configurações"""
         conn = None
         try:
-            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn = get_connection(self.db_path)
             cursor = conn.cursor()
 
             # Configurações gerais
@@ -1379,6 +1409,9 @@ class SettingsDialog:
             # Adicionar configuração 24h
             configs.append(('trabalha_24h', 'true' if self.trabalha_24h.get() else 'false'))
 
+            perfil = self.perfil_armazenamento.get() or PERFIL_PADRAO
+            configs.append(('perfil_armazenamento', perfil))
+
             for chave, valor in configs:
                 cursor.execute("""
                     INSERT OR REPLACE INTO configuracoes (chave, valor, tipo, descricao)
@@ -1406,6 +1439,11 @@ class SettingsDialog:
                 """, (valor, tipo))
 
             conn.commit()
+
+            # Novas conexões passam a usar o perfil escolhido
+            connection_manager.definir_perfil(perfil)
+            rate_limiter.recarregar_limites(self.db_path)
+
             messagebox.showinfo("Sucesso", "Configurações salvas com sucesso!")
             self.window.destroy()
 
@@ -1452,7 +1490,7 @@ class RescheduleDialog:
         self._center_window()
 
     def _load_current_data(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
 
         cursor.execute("""
@@ -1489,7 +1527,7 @@ class RescheduleDialog:
         current_frame.pack(fill=tk.X, pady=(0, 10))
 
         hora_atual_formatada = str(self.hora_atual)[:5] if self.hora_atual else ''
-        ttk.Label(current_frame, text=f"Data: {self.data_atual}").pack(anchor=tk.W)
+        ttk.Label(current_frame, text=f"Data: {para_exibicao(self.data_atual)}").pack(anchor=tk.W)
         ttk.Label(current_frame, text=f"Hora: {hora_atual_formatada}").pack(anchor=tk.W)
 
         # Novos dados
@@ -1530,9 +1568,8 @@ class RescheduleDialog:
 
         # Validar formato
         try:
-            from datetime import datetime
-            datetime.strptime(nova_data, '%d/%m/%Y')
-            datetime.strptime(nova_hora, '%H:%M')
+            data_iso = para_iso(nova_data)
+            hora_normalizada = normalizar_hora(nova_hora)
         except ValueError:
             messagebox.showerror("Erro", "Formato inválido. Use DD/MM/YYYY para data e HH:MM para hora")
             return
@@ -1546,14 +1583,14 @@ class RescheduleDialog:
 
         # Atualizar no banco
         try:
-            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn = get_connection(self.db_path)
             cursor = conn.cursor()
 
             cursor.execute("""
                 UPDATE pacientes
                 SET data_consulta = ?, hora_consulta = ?, status = 'reagendado'
                 WHERE id = ?
-            """, (nova_data, nova_hora, self.paciente_id))
+            """, (data_iso, hora_normalizada, self.paciente_id))
 
             conn.commit()
             conn.close()
@@ -1676,7 +1713,7 @@ class MessageManagementDialog:
         for item in self.tree.get_children():
             self.tree.delete(item)
 
-        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
 
         cursor.execute("""
@@ -1733,12 +1770,13 @@ class MessageManagementDialog:
 
         if messagebox.askyesno("Confirmar Exclusão",
                               "Tem certeza que deseja excluir esta mensagem?\n\nEsta ação não pode ser desfeita!"):
-            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn = get_connection(self.db_path)
             cursor = conn.cursor()
 
             cursor.execute("DELETE FROM mensagens WHERE id = ?", (mensagem_id,))
             conn.commit()
             conn.close()
+            template_cache.invalidar(self.db_path)
 
             self._load_messages()
             messagebox.showinfo("Sucesso", "Mensagem excluída com sucesso")
@@ -1757,7 +1795,7 @@ class MessageManagementDialog:
         if not mensagem_id:
             return
 
-        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
 
         cursor.execute("SELECT ativo FROM mensagens WHERE id = ?", (mensagem_id,))
@@ -1770,6 +1808,7 @@ class MessageManagementDialog:
 
         conn.commit()
         conn.close()
+        template_cache.invalidar(self.db_path)
 
         self._load_messages()
         status = "desativada" if ativo_atual else "ativada"
@@ -1872,7 +1911,7 @@ class MessageDialog:
 
     def _load_message_data(self):
         """Carrega dados da mensagem para edição"""
-        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
 
         cursor.execute("""
@@ -1904,7 +1943,7 @@ class MessageDialog:
             return
 
         try:
-            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn = get_connection(self.db_path)
             cursor = conn.cursor()
 
             if self.is_edit:
@@ -1923,6 +1962,7 @@ class MessageDialog:
 
             conn.commit()
             conn.close()
+            template_cache.invalidar(self.db_path)
 
             self.window.destroy()
             if self.on_save_callback:
@@ -1940,18 +1980,22 @@ class MessageDialog:
         self.window.geometry(f'{width}x{height}+{x}+{y}')
 
 class ImportDialog:
+    INTERVALO_PROGRESSO_MS = 100
+
     def __init__(self, parent, db_path, user_session, on_import_callback=None):
         self.parent = parent
         self.db_path = db_path
         self.user_session = user_session
         self.on_import_callback = on_import_callback
         self.security = SecurityValidator(db_path)
+        self.job = None
 
         self.window = tk.Toplevel(parent)
         self.window.title("Importar Planilha de Pacientes")
         self.window.geometry("700x500")
         self.window.resizable(False, False)
         self.window.grab_set()
+        self.window.protocol("WM_DELETE_WINDOW", self._fechar)
 
         self._create_interface()
         self._center_window()
@@ -1971,7 +2015,7 @@ class ImportDialog:
         instr_frame = ttk.LabelFrame(main_frame, text="Instruções", padding="5")
         instr_frame.grid(row=1, column=0, columnspan=2, pady=(0, 10), sticky=(tk.W, tk.E))
 
-        instr_text = "Colunas obrigatórias: nome, telefone\nOpcionais: email, data_nascimento, cpf, data_consulta, hora_consulta, tipo_consulta, profissional, observacoes, consentimento_whatsapp\nFormatos: .xlsx, .xls, .csv"
+        instr_text = "Colunas obrigatórias: nome, telefone, data_consulta, hora_consulta\nOpcionais: email, data_nascimento, cpf, tipo_consulta, profissional, observacoes, consentimento_whatsapp\nFormatos: .xlsx, .xls, .csv"
 
         ttk.Label(
             instr_frame,
@@ -2017,28 +2061,39 @@ class ImportDialog:
             variable=self.skip_duplicates_var
         ).pack(anchor=tk.W)
 
+        self.update_existing_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            options_frame,
+            text="Atualizar consultas existentes (mesmo telefone e data)",
+            variable=self.update_existing_var
+        ).pack(anchor=tk.W)
+
         # Progresso
+        self.progress_bar = ttk.Progressbar(main_frame, mode='indeterminate')
+        self.progress_bar.grid(row=5, column=0, columnspan=2, pady=(0, 5), sticky=(tk.W, tk.E))
+
         self.progress_var = tk.StringVar(value="")
         ttk.Label(
             main_frame,
             textvariable=self.progress_var,
             font=('Arial', 8)
-        ).grid(row=5, column=0, columnspan=2, pady=(0, 10), sticky=tk.W)
+        ).grid(row=6, column=0, columnspan=2, pady=(0, 10), sticky=tk.W)
 
         # Botões principais
         btn_frame = ttk.Frame(main_frame)
-        btn_frame.grid(row=6, column=0, columnspan=2, pady=(10, 0), sticky=(tk.W, tk.E))
+        btn_frame.grid(row=7, column=0, columnspan=2, pady=(10, 0), sticky=(tk.W, tk.E))
 
-        ttk.Button(
+        self.import_button = ttk.Button(
             btn_frame,
             text="📤 Importar Planilha",
             command=self._importar
-        ).pack(side=tk.LEFT, padx=5)
+        )
+        self.import_button.pack(side=tk.LEFT, padx=5)
 
         ttk.Button(
             btn_frame,
             text="Cancelar",
-            command=self.window.destroy
+            command=self._fechar
         ).pack(side=tk.RIGHT, padx=5)
 
         # Configurar grid
@@ -2106,163 +2161,99 @@ class ImportDialog:
             messagebox.showerror("Erro", "Arquivo não encontrado")
             return
 
-        try:
-            # Ler arquivo
-            if arquivo.endswith('.csv'):
-                df = pd.read_csv(arquivo)
-            else:
-                df = pd.read_excel(arquivo)
-
-            self.progress_var.set("Lendo arquivo...")
-
-            # Validar colunas obrigatórias
-            colunas_obrigatorias = ['nome', 'telefone']
-            colunas_faltando = [col for col in colunas_obrigatorias if col not in df.columns]
+        importer = PatientImporter(
+            self.db_path,
+            self.user_session['user_id'],
+            pular_duplicados=self.skip_duplicates_var.get(),
+            atualizar_existentes=self.update_existing_var.get(),
+            processos=PatientImporter.processos_para(arquivo)
+        )
 
-            if colunas_faltando:
-                messagebox.showerror(
-                    "Erro",
-                    f"Colunas obrigatórias faltando: {', '.join(colunas_faltando)}"
+        # A importação roda numa thread; a janela acompanha pela fila de eventos
+        self.job = ImportJob(importer, arquivo)
+        self.job.iniciar()
+
+        self.import_button.config(state='disabled')
+        self.progress_bar.start(10)
+        self.progress_var.set("Lendo arquivo...")
+        self.window.after(self.INTERVALO_PROGRESSO_MS, self._acompanhar_importacao)
+
+    def _acompanhar_importacao(self):
+        for evento in self.job.eventos_pendentes():
+            if evento['tipo'] == 'progresso':
+                parcial = evento['resultado']
+                self.progress_var.set(
+                    f"Processando {parcial['total']} registros... "
+                    f"({parcial['importados']} importados, {parcial['erros']} com erro)"
                 )
-                return
 
-            # Processar dados
-            total = len(df)
-            importados = 0
-            erros = 0
-            duplicados = 0
+            elif evento['tipo'] == 'erro':
+                self._encerrar_acompanhamento()
+                messagebox.showerror("Erro", evento['mensagem'])
+                return
 
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            elif evento['tipo'] == 'concluido':
+                self._encerrar_acompanhamento()
+                self._mostrar_resultado(evento['resultado'])
+                return
 
-            for idx, row in df.iterrows():
-                try:
-                    self.progress_var.set(f"Processando {idx + 1}/{total}...")
-
-                    # Extrair dados
-                    dados = {
-                        'nome': str(row.get('nome', '')).strip(),
-                        'telefone': str(row.get('telefone', '')).strip(),
-                        'email': str(row.get('email', '')).strip() if pd.notna(row.get('email')) else '',
-                        'data_nascimento': str(row.get('data_nascimento', '')).strip() if pd.notna(row.get('data_nascimento')) else '',
-                        'cpf': str(row.get('cpf', '')).strip() if pd.notna(row.get('cpf')) else '',
-                        'data_consulta': str(row.get('data_consulta', '')).strip() if pd.notna(row.get('data_consulta')) else '',
-                        'hora_consulta': str(row.get('hora_consulta', '')).strip() if pd.notna(row.get('hora_consulta')) else '',
-                        'tipo_consulta': str(row.get('tipo_consulta', '')).strip() if pd.notna(row.get('tipo_consulta')) else '',
-                        'profissional': str(row.get('profissional', '')).strip() if pd.notna(row.get('profissional')) else '',
-                        'observacoes': str(row.get('observacoes', '')).strip() if pd.notna(row.get('observacoes')) else '',
-                    }
-
-                    # Verificar consentimento
-                    consentimento_str = str(row.get('consentimento_whatsapp', '')).strip().upper()
-                    consentimento = consentimento_str in ['SIM', 'S', 'YES', 'Y', '1', 'TRUE']
-
-                    # Validações básicas
-                    if not dados['nome']:
-                        erros += 1
-                        continue
-
-                    if not dados['telefone']:
-                        erros += 1
-                        continue
-
-                    # Validar telefone
-                    valido, telefone_formatado, erro = self.security.validar_telefone(dados['telefone'])
-                    if not valido:
-                        erros += 1
-                        continue
-
-                    # Validar datas se fornecidas
-                    try:
-                        from datetime import datetime
-                        if dados['data_nascimento']:
-                            datetime.strptime(dados['data_nascimento'], '%d/%m/%Y')
-                        if dados['data_consulta']:
-                            datetime.strptime(dados['data_consulta'], '%d/%m/%Y')
-                    except ValueError:
-                        erros += 1
-                        continue
-
-                    # Validar email se fornecido
-                    if dados['email']:
-                        valido, erro = self.security.validar_email(dados['email'])
-                        if not valido:
-                            erros += 1
-                            continue
-
-                    # Validar CPF se fornecido
-                    if dados['cpf']:
-                        valido, erro = self.security.validar_cpf(dados['cpf'])
-                        if not valido:
-                            erros += 1
-                            continue
-
-                    # Verificar duplicatas se opção ativada
-                    if self.skip_duplicates_var.get():
-                        cursor.execute("SELECT id FROM pacientes WHERE telefone = ?", (dados['telefone'],))
-                        if cursor.fetchone():
-                            duplicados += 1
-                            continue
-
-                    # Inserir paciente
-                    cursor.execute("""
-                        INSERT INTO pacientes (
-                            nome, telefone, telefone_formatado, email, data_nascimento, cpf,
-                            data_consulta, hora_consulta, tipo_consulta, profissional, observacoes,
-                            cadastrado_por, data_cadastro
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        dados['nome'],
-                        dados['telefone'],
-                        telefone_formatado,
-                        dados['email'] or None,
-                        dados['data_nascimento'] or None,
-                        dados['cpf'] or None,
-                        dados['data_consulta'] or None,
-                        dados['hora_consulta'] or None,
-                        dados['tipo_consulta'] or None,
-                        dados['profissional'] or None,
-                        dados['observacoes'] or None,
-                        self.user_session['user_id'],
-                        datetime.now()
-                    ))
-
-                    paciente_id = cursor.lastrowid
-
-                    # Registrar consentimento se fornecido
-                    if consentimento:
-                        lgpd = LGPDManager(self.db_path)
-                        lgpd.registrar_consentimento(
-                            paciente_id,
-                            'planilha',
-                            self.user_session['user_id'],
-                            'Consentimento informado na planilha de importação'
-                        )
-
-                    importados += 1
-
-                except Exception as e:
-                    erros += 1
-                    continue
+        self.window.after(self.INTERVALO_PROGRESSO_MS, self._acompanhar_importacao)
+
+    def _encerrar_acompanhamento(self):
+        self.progress_bar.stop()
+        self.progress_var.set("")
+        self.import_button.config(state='normal')
+
+    def _mostrar_resultado(self, resultado):
+        titulo = "Importação Cancelada" if resultado['cancelado'] else "Importação Concluída"
+
+        msg = "Importação cancelada. Os lotes já processados foram gravados.\n\n" if resultado['cancelado'] \
+            else "Importação concluída!\n\n"
+        if resultado['retomado_de']:
+            msg += f"Importação anterior deste arquivo retomada a partir da linha {resultado['retomado_de']}.\n\n"
+        msg += f"Registros processados: {resultado['total']}\n"
+        msg += f"Importados: {resultado['importados']}\n"
+        if resultado['atualizados']:
+            msg += f"Consultas atualizadas: {resultado['atualizados']}\n"
+        msg += f"Duplicados pulados: {resultado['duplicados']}\n"
+        msg += f"Erros: {resultado['erros']}"
+
+        if self.job.relatorio:
+            msg += "\n\nDeseja salvar o relatório das linhas rejeitadas?"
+            if messagebox.askyesno(titulo, msg):
+                self._salvar_relatorio()
+        else:
+            messagebox.showinfo(titulo, msg)
 
-            conn.commit()
-            conn.close()
+        self.job.descartar_relatorio()
+        self.window.destroy()
 
-            # Resultado
-            msg = f"Importação concluída!\n\n"
-            msg += f"Total de registros: {total}\n"
-            msg += f"Importados: {importados}\n"
-            msg += f"Duplicados pulados: {duplicados}\n"
-            msg += f"Erros: {erros}"
+        if self.on_import_callback:
+            self.on_import_callback()
 
-            messagebox.showinfo("Importação Concluída", msg)
-            self.window.destroy()
+    def _salvar_relatorio(self):
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv")],
+            title="Salvar Relatório de Rejeitados",
+            initialfile="linhas_rejeitadas.csv"
+        )
 
-            if self.on_import_callback:
-                self.on_import_callback()
+        if filename:
+            try:
+                self.job.salvar_relatorio(filename)
+            except OSError as e:
+                messagebox.showerror("Erro", f"Erro ao salvar relatório: {str(e)}")
+
+    def _fechar(self):
+        # Com importação em andamento, o botão cancela; o resultado parcial
+        # é mostrado quando a thread terminar o lote atual
+        if self.job is not None and self.job.em_andamento():
+            self.job.cancelar()
+            self.progress_var.set("Cancelando após o lote atual...")
+            return
 
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro durante importação: {str(e)}")
+        self.window.destroy()
 
     def _center_window(self):
         self.window.update_idletasks()
@@ -3,9 +3,18 @@ from tkinter import ttk, messagebox
 from frontend.patient_view import PatientView
 from frontend.message_preview import MessagePreview
 from frontend.dashboard import Dashboard
+from frontend.send_plan_view import SendPlanView
 from backend.auth import AuthManager
+from backend.changes import ChangeMonitor
+from backend.prefetch import MessagePrefetcher
+from frontend.warmup import aquecer, modulos_para_perfil
 
 class MainWindow:
+    # Intervalo de verificação de alterações feitas por outras estações
+    INTERVALO_MONITOR_MS = 1000
+    # Pré-carregamento do matplotlib/reportlab depois que a janela aparece
+    ATRASO_PRECARREGAMENTO_MS = 1500
+
     def __init__(self, user_session: dict, db_path: str):
         self.user_session = user_session
         self.db_path = db_path
@@ -15,8 +24,18 @@ class MainWindow:
         self.window.title(f"Titanium Clínica - {user_session['nome']} ({user_session['perfil']})")
         self.window.geometry("1200x700")
         
+        # Pré-preparação das próximas mensagens da fila
+        self.prefetcher = MessagePrefetcher(db_path)
+        self.prefetcher.iniciar()
+        
         self._criar_menu()
         self._criar_interface()
+        self._iniciar_monitor()
+
+        self.window.after(
+            self.ATRASO_PRECARREGAMENTO_MS,
+            lambda: aquecer(modulos_para_perfil(user_session['perfil']))
+        )
     
     def _criar_menu(self):
         menubar = tk.Menu(self.window)
@@ -70,7 +89,8 @@ class MainWindow:
             self.notebook,
             self.db_path,
             self.user_session,
-            on_preparar_mensagem=self._preparar_mensagem
+            on_preparar_mensagem=self._preparar_mensagem,
+            prefetcher=self.prefetcher
         )
         self.notebook.add(self.patient_view.frame, text="📋 Pacientes")
         
@@ -80,7 +100,27 @@ class MainWindow:
             self.notebook.add(self.dashboard.frame, text="📊 Dashboard")
             # Atualizar dados quando aba for selecionada
             self.notebook.bind('<<NotebookTabChanged>>', self._on_tab_change)
+
+        # Aba Plano de Envios
+        self.send_plan_view = SendPlanView(self.notebook, self.db_path)
+        self.notebook.add(self.send_plan_view.frame, text="🗓️ Plano de Envios")
     
+    def _iniciar_monitor(self):
+        """Propaga para as telas as alterações de pacientes feitas em outras estações"""
+        self.change_monitor = ChangeMonitor(self.db_path)
+        self.change_monitor.registrar(self.patient_view.aplicar_alteracoes)
+        self.change_monitor.registrar(self.send_plan_view.aplicar_alteracoes)
+        if hasattr(self, 'dashboard'):
+            self.change_monitor.registrar(self.dashboard.aplicar_alteracoes)
+
+        self._monitor_job = self.window.after(self.INTERVALO_MONITOR_MS, self._verificar_alteracoes)
+
+    def _verificar_alteracoes(self):
+        try:
+            self.change_monitor.verificar()
+        finally:
+            self._monitor_job = self.window.after(self.INTERVALO_MONITOR_MS, self._verificar_alteracoes)
+
     def _preparar_mensagem(self, paciente_id: int):
         """Abre janela de preview da mensagem"""
         MessagePreview(
@@ -88,12 +128,16 @@ class MainWindow:
             self.db_path,
             paciente_id,
             self.user_session,
-            on_enviado=self.patient_view.atualizar_lista
+            on_enviado=self.patient_view.atualizar_lista,
+            prefetcher=self.prefetcher
         )
     
     def _fazer_logout(self):
         if messagebox.askyesno("Sair", "Deseja realmente sair do sistema?"):
             self.auth_manager.logout(self.user_session['token'])
+            self.window.after_cancel(self._monitor_job)
+            self.change_monitor.fechar()
+            self.prefetcher.parar()
             self.window.destroy()
     
     def _novo_paciente(self):
@@ -118,7 +162,7 @@ class MainWindow:
         """Atualiza dados do dashboard quando a aba é selecionada"""
         current_tab = self.notebook.index(self.notebook.select())
         if current_tab == 1 and hasattr(self, 'dashboard'):  # Aba Dashboard
-            self.dashboard._atualizar_dados()
+            self.dashboard.exibir()
 
     def _abrir_dashboard(self):
         # Verificar se a aba dashboard existe (apenas para admin/gestor)
@@ -2,19 +2,28 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from backend.messaging import MessageManager
 from backend.limits import LimitsController
+from backend.connection import get_connection
+from backend.ledger import SendLedger
 from backend.security import SecurityValidator
+from backend.dates import para_exibicao
 from automation.whatsapp import WhatsAppAutomation
-import sqlite3
 
 class MessagePreview:
-    def __init__(self, parent, db_path: str, paciente_id: int, user_session: dict, on_enviado):
+    def __init__(self, parent, db_path: str, paciente_id: int, user_session: dict, on_enviado,
+                 prefetcher=None):
         self.db_path = db_path
         self.paciente_id = paciente_id
         self.user_session = user_session
         self.on_enviado = on_enviado
         
+        # Mensagem já renderizada em segundo plano (ver MessagePrefetcher)
+        self.pre_renderizada = prefetcher.obter(paciente_id) if prefetcher else None
+        
         self.msg_manager = MessageManager(db_path)
         self.limits = LimitsController(db_path)
+        self.ledger = SendLedger(db_path)
+        # Um envio por janela: registrar de novo após erro reaproveita a chave
+        self.tentativa_envio = SendLedger.nova_tentativa()
         self.security = SecurityValidator(db_path)
         self.whatsapp = WhatsAppAutomation()
         
@@ -30,7 +39,11 @@ class MessagePreview:
         self._centralizar()
     
     def _carregar_dados_paciente(self):
-        conn = sqlite3.connect(self.db_path)
+        if self.pre_renderizada and not hasattr(self, 'paciente'):
+            self.paciente = dict(self.pre_renderizada['paciente'])
+            return
+        
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -71,7 +84,7 @@ class MessagePreview:
         ttk.Label(info_frame, text=f"Nome: {self.paciente['nome']}").pack(anchor=tk.W)
         ttk.Label(info_frame, text=f"Telefone: {self.paciente['telefone']}").pack(anchor=tk.W)
         hora_formatada = str(self.paciente['hora_consulta'])[:5] if self.paciente['hora_consulta'] else ''
-        ttk.Label(info_frame, text=f"Data: {self.paciente['data_consulta']} às {hora_formatada}").pack(anchor=tk.W)
+        ttk.Label(info_frame, text=f"Data: {para_exibicao(self.paciente['data_consulta'])} às {hora_formatada}").pack(anchor=tk.W)
         
         # Verificar consentimento
         if not self.paciente['consentimento']:
@@ -92,6 +105,10 @@ class MessagePreview:
         if self.paciente['mensagem_preparada']:
             self.text_mensagem.insert(1.0, self.paciente['mensagem_preparada'])
             self.text_mensagem.config(state=tk.DISABLED)
+        elif self.pre_renderizada:
+            # Prévia: só é gravada ao clicar em "Preparar Mensagem"
+            self.text_mensagem.insert(1.0, self.pre_renderizada['mensagem'])
+            self.text_mensagem.config(state=tk.DISABLED)
         
         # Botões - usar atributo para poder atualizar depois
         self.btn_frame = ttk.Frame(main_frame)
@@ -133,8 +150,13 @@ class MessagePreview:
         # Determinar tipo de mensagem baseado no status
         tipo_msg = self._determinar_tipo_mensagem()
         
-        # Gerar mensagem
-        result = self.msg_manager.preparar_mensagem_paciente(self.paciente_id, tipo_msg)
+        # Gerar mensagem (ou gravar a prévia já renderizada)
+        pre_renderizada = None
+        if self.pre_renderizada and self.pre_renderizada['tipo'] == tipo_msg:
+            pre_renderizada = (self.pre_renderizada['mensagem_id'], self.pre_renderizada['mensagem'])
+        self.pre_renderizada = None
+        
+        result = self.msg_manager.preparar_mensagem_paciente(self.paciente_id, tipo_msg, pre_renderizada)
         
         if result['success']:
             # Atualizar campo de texto (permitir edição para revisão)
@@ -188,15 +210,8 @@ class MessagePreview:
             )
             
             if sucesso:
-                # Atualizar status para "mensagem_enviada"
-                self._atualizar_status_enviado()
-                
-                # Registrar no controle de limites
-                self.limits.registrar_envio(
-                    self.paciente['telefone'],
-                    self._determinar_tipo_mensagem(),
-                    self.user_session['user_id']
-                )
+                # Status, histórico e controle de limites numa única transação
+                self._atualizar_status_enviado(mensagem)
                 
                 messagebox.showinfo(
                     "Sucesso",
@@ -219,16 +234,7 @@ class MessagePreview:
     
     def _determinar_tipo_mensagem(self) -> str:
         """Determina tipo de mensagem baseado no status atual"""
-        status = self.paciente['status']
-        
-        if status == 'pendente':
-            return 'primeiro_contato'
-        elif status in ['mensagem_preparada', 'mensagem_enviada']:
-            return 'confirmacao'
-        elif status == 'sem_resposta':
-            return 'follow_up'
-        
-        return 'confirmacao'
+        return MessageManager.tipo_por_status(self.paciente['status'])
     
     def _atualizar_botoes(self):
         """Atualiza botões baseado no estado atual"""
@@ -284,54 +290,14 @@ class MessagePreview:
             'Consentimento obtido durante preparação de mensagem'
         )
     
-    def _atualizar_status_enviado(self):
+    def _atualizar_status_enviado(self, mensagem: str):
         """Atualiza status do paciente após envio"""
-        conn = sqlite3.connect(self.db_path, timeout=10)
-        cursor = conn.cursor()
-        
-        from datetime import datetime
+        result = self.ledger.registrar_envio(
+            self.paciente_id, mensagem, self.user_session['user_id'], self.tentativa_envio
+        )
         
-        try:
-            agora = datetime.now()
-            
-            # Buscar data_preparo para incluir no histórico
-            cursor.execute("""
-                SELECT data_preparo FROM pacientes WHERE id = ?
-            """, (self.paciente_id,))
-            result_prep = cursor.fetchone()
-            data_preparacao = result_prep[0] if result_prep and result_prep[0] else agora
-            
-            # Atualizar status do paciente
-            cursor.execute("""
-                UPDATE pacientes
-                SET status = 'mensagem_enviada',
-                    data_envio = ?,
-                    tentativas_contato = tentativas_contato + 1,
-                    ultima_tentativa = ?
-                WHERE id = ?
-            """, (agora, agora, self.paciente_id))
-            
-            # Registrar no histórico com data_preparacao
-            cursor.execute("""
-                INSERT INTO historico_mensagens 
-                (paciente_id, mensagem_texto, tipo_mensagem, data_preparacao,
-                 data_envio, enviado_por, status_envio)
-                VALUES (?, ?, ?, ?, ?, ?, 'enviada')
-            """, (
-                self.paciente_id,
-                self.text_mensagem.get(1.0, tk.END).strip(),
-                self._determinar_tipo_mensagem(),
-                data_preparacao,
-                agora,
-                self.user_session['user_id']
-            ))
-            
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+        if not result['success']:
+            raise RuntimeError(result['message'])
     
     def _centralizar(self):
         self.window.update_idletasks()
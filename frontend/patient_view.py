@@ -1,11 +1,29 @@
+import bisect
 import tkinter as tk
-from tkinter import ttk, messagebox
-import sqlite3
+from tkinter import ttk, messagebox, simpledialog
 from datetime import date
+from backend.connection import get_connection
+from backend.dates import para_exibicao
+from backend.models import Patient
+from backend.messaging import MessageManager
 
 class PatientView:
-    def __init__(self, parent, db_path: str, user_session: dict, on_preparar_mensagem):
+    # Lista virtualizada: páginas buscadas por chave conforme a rolagem,
+    # com no máximo JANELA_MAXIMA linhas mantidas no Treeview
+    TAMANHO_PAGINA = 200
+    JANELA_MAXIMA = 1000
+    MARGEM_ROLAGEM = 0.1
+
+    def __init__(self, parent, db_path: str, user_session: dict, on_preparar_mensagem, prefetcher=None):
         self.db_path = db_path
+        self.patient_model = Patient(db_path)
+        self.prefetcher = prefetcher
+        self._filtros = {}
+        self._chaves = {}
+        self._pendentes = set()
+        self._inicio_alcancado = True
+        self._fim_alcancado = True
+        self._carregando = False
         self.user_session = user_session
         self.on_preparar_mensagem = on_preparar_mensagem
         
@@ -63,7 +81,7 @@ class PatientView:
         table_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
         
         # Scrollbars
-        scroll_y = ttk.Scrollbar(table_frame, orient=tk.VERTICAL)
+        scroll_y = self.scroll_y = ttk.Scrollbar(table_frame, orient=tk.VERTICAL)
         scroll_x = ttk.Scrollbar(table_frame, orient=tk.HORIZONTAL)
         
         # Treeview
@@ -71,7 +89,7 @@ class PatientView:
             table_frame,
             columns=('nome', 'telefone', 'data', 'hora', 'status', 'tentativas'),
             show='headings',
-            yscrollcommand=scroll_y.set,
+            yscrollcommand=self._on_rolagem,
             xscrollcommand=scroll_x.set
         )
         
@@ -100,6 +118,7 @@ class PatientView:
         
         # Bind duplo clique
         self.tree.bind('<Double-1>', self._on_double_click)
+        self.tree.bind('<<TreeviewSelect>>', lambda e: self._atualizar_fila_prefetch())
         
         # Menu de contexto (botão direito)
         self.context_menu = tk.Menu(self.tree, tearoff=0)
@@ -124,6 +143,12 @@ class PatientView:
             command=self._preparar_mensagem_selecionado
         ).pack(side=tk.LEFT, padx=5)
         
+        ttk.Button(
+            actions_frame,
+            text="📋 Preparar Todos",
+            command=self._preparar_todos
+        ).pack(side=tk.LEFT, padx=5)
+        
         ttk.Button(
             actions_frame,
             text="✅ Marcar Confirmado",
@@ -149,103 +174,244 @@ class PatientView:
         ).pack(side=tk.RIGHT, padx=5)
     
     def atualizar_lista(self):
-        """Atualiza lista de pacientes"""
+        """Atualiza lista de pacientes (recarrega a partir da primeira página)"""
         # Limpar tabela
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        conn = sqlite3.connect(self.db_path, timeout=10)
-        cursor = conn.cursor()
+        self.tree.delete(*self.tree.get_children())
+        self._chaves = {}
+        self._pendentes = set()
+        self._inicio_alcancado = True
+        self._fim_alcancado = False
 
         # Filtro
         filtro = self.filtro_status.get()
         mostrar_todos = self.mostrar_todos_var.get()
-        hoje = date.today().isoformat()
 
-        if filtro == 'Todos':
-            if mostrar_todos:
-                # Mostrar todos os pacientes
-                cursor.execute("""
-                    SELECT id, nome, telefone, data_consulta, hora_consulta,
-                           status, tentativas_contato
-                    FROM pacientes
-                    ORDER BY data_consulta DESC, hora_consulta DESC
-                """)
-            else:
-                # Mostrar apenas consultas futuras (hoje em diante)
-                cursor.execute("""
-                    SELECT id, nome, telefone, data_consulta, hora_consulta,
-                           status, tentativas_contato
-                    FROM pacientes
-                    WHERE data_consulta >= ?
-                    ORDER BY data_consulta, hora_consulta
-                """, (hoje,))
+        status_map = {
+            'Pendente': 'pendente',
+            'Mensagem Preparada': 'mensagem_preparada',
+            'Enviada': 'mensagem_enviada',
+            'Confirmado': 'confirmado',
+            'Sem Resposta': 'sem_resposta',
+            'Reagendado': 'reagendado'
+        }
+
+        if mostrar_todos:
+            # Todos os pacientes, mais recentes primeiro
+            self._filtros = {'status': status_map.get(filtro), 'decrescente': True}
         else:
-            status_map = {
-                'Pendente': 'pendente',
-                'Mensagem Preparada': 'mensagem_preparada',
-                'Enviada': 'mensagem_enviada',
-                'Confirmado': 'confirmado',
-                'Sem Resposta': 'sem_resposta',
-                'Reagendado': 'reagendado'
+            # Apenas consultas futuras (hoje em diante)
+            self._filtros = {
+                'status': status_map.get(filtro),
+                'data_inicio': date.today().isoformat(),
+                'decrescente': False
             }
 
-            status_filtro = status_map[filtro]
+        self._carregar_pagina(anteriores=False)
+        self._atualizar_fila_prefetch()
 
-            if mostrar_todos:
-                cursor.execute("""
-                    SELECT id, nome, telefone, data_consulta, hora_consulta,
-                           status, tentativas_contato
-                    FROM pacientes
-                    WHERE status = ?
-                    ORDER BY data_consulta DESC, hora_consulta DESC
-                """, (status_filtro,))
-            else:
-                cursor.execute("""
-                    SELECT id, nome, telefone, data_consulta, hora_consulta,
-                           status, tentativas_contato
-                    FROM pacientes
-                    WHERE status = ? AND data_consulta >= ?
-                    ORDER BY data_consulta, hora_consulta
-                """, (status_filtro, hoje))
-
-        pacientes = cursor.fetchall()
-        conn.close()
-        
-        # Inserir dados
-        for paciente in pacientes:
-            pid, nome, tel, data, hora, status, tentativas = paciente
-            
-            # Traduzir status
-            status_display = {
-                'pendente': 'Pendente',
-                'mensagem_preparada': 'Mensagem Preparada',
-                'mensagem_enviada': 'Enviada',
-                'confirmado': 'Confirmado',
-                'reagendado': 'Reagendado',
-                'sem_resposta': 'Sem Resposta',
-                'cancelado': 'Cancelado'
-            }.get(status, status)
-            
-            # Colorir por status
-            tag = ''
-            if status == 'confirmado':
-                tag = 'confirmado'
-            elif status == 'sem_resposta':
-                tag = 'sem_resposta'
-            
-            hora_formatada = str(hora)[:5] if hora else ''
-            self.tree.insert(
-                '',
-                tk.END,
-                values=(nome, tel, data, hora_formatada, status_display, tentativas),
-                tags=(tag, str(pid))
-            )
-        
         # Configurar tags
         self.tree.tag_configure('confirmado', background='#d4edda')
         self.tree.tag_configure('sem_resposta', background='#f8d7da')
-    
+
+    def _on_rolagem(self, primeiro, ultimo):
+        """Repassa a posição à scrollbar e busca páginas perto das bordas"""
+        self.scroll_y.set(primeiro, ultimo)
+
+        if self._carregando:
+            return
+
+        if float(ultimo) >= 1 - self.MARGEM_ROLAGEM and not self._fim_alcancado:
+            self._carregando = True
+            self.tree.after_idle(self._carregar_pagina, False)
+        elif float(primeiro) <= self.MARGEM_ROLAGEM and not self._inicio_alcancado:
+            self._carregando = True
+            self.tree.after_idle(self._carregar_pagina, True)
+
+    def _carregar_pagina(self, anteriores: bool):
+        """
+        Busca a página seguinte (ou anterior) a partir da chave da última (ou
+        primeira) linha exibida e descarta do lado oposto o que passar de
+        JANELA_MAXIMA linhas, para a tabela não crescer sem limite.
+        """
+        try:
+            itens = self.tree.get_children()
+            cursor = None
+            if itens:
+                cursor = self._chaves[itens[0] if anteriores else itens[-1]]
+
+            pacientes = self.patient_model.get_all(
+                limit=self.TAMANHO_PAGINA, cursor=cursor, anteriores=anteriores, **self._filtros
+            )
+
+            if anteriores:
+                self._inicio_alcancado = len(pacientes) < self.TAMANHO_PAGINA
+                for indice, paciente in enumerate(pacientes):
+                    self._inserir_paciente(paciente, indice)
+                # Mantém as mesmas linhas visíveis após inserir acima delas
+                self.tree.yview_scroll(len(pacientes), 'units')
+            else:
+                self._fim_alcancado = len(pacientes) < self.TAMANHO_PAGINA
+                for paciente in pacientes:
+                    self._inserir_paciente(paciente, tk.END)
+
+            self._limitar_janela(manter_fim=not anteriores)
+        finally:
+            self._carregando = False
+
+    def _limitar_janela(self, manter_fim: bool):
+        """Remove linhas do lado oposto ao da rolagem quando a janela excede o limite"""
+        itens = self.tree.get_children()
+        excesso = len(itens) - self.JANELA_MAXIMA
+        if excesso <= 0:
+            return
+
+        if manter_fim:
+            removidos = itens[:excesso]
+            self._inicio_alcancado = False
+        else:
+            removidos = itens[-excesso:]
+            self._fim_alcancado = False
+
+        self.tree.delete(*removidos)
+        for item in removidos:
+            self._chaves.pop(item, None)
+            self._pendentes.discard(item)
+
+        if manter_fim:
+            self.tree.yview_scroll(-excesso, 'units')
+
+    def _inserir_paciente(self, paciente: dict, indice):
+        """Insere (ou atualiza) a linha de um paciente na tabela"""
+        pid = paciente['id']
+        status = paciente['status']
+
+        # Traduzir status
+        status_display = {
+            'pendente': 'Pendente',
+            'mensagem_preparada': 'Mensagem Preparada',
+            'mensagem_enviada': 'Enviada',
+            'confirmado': 'Confirmado',
+            'reagendado': 'Reagendado',
+            'sem_resposta': 'Sem Resposta',
+            'cancelado': 'Cancelado'
+        }.get(status, status)
+
+        # Colorir por status
+        tag = ''
+        if status == 'confirmado':
+            tag = 'confirmado'
+        elif status == 'sem_resposta':
+            tag = 'sem_resposta'
+
+        hora = paciente['hora_consulta']
+        hora_formatada = str(hora)[:5] if hora else ''
+        valores = (
+            paciente['nome'], paciente['telefone'], para_exibicao(paciente['data_consulta']),
+            hora_formatada, status_display, paciente['tentativas_contato']
+        )
+
+        item = str(pid)
+        if self.tree.exists(item):
+            self.tree.item(item, values=valores, tags=(tag, item))
+        else:
+            self.tree.insert('', indice, iid=item, values=valores, tags=(tag, item))
+
+        self._chaves[item] = Patient.chave_paginacao(paciente)
+        if status == 'pendente':
+            self._pendentes.add(item)
+        else:
+            self._pendentes.discard(item)
+
+    def aplicar_alteracoes(self, alteracoes: dict):
+        """
+        Aplica na tabela apenas as linhas alteradas (ver ChangeMonitor).
+
+        Cada linha é inserida, movida ou removida conforme os filtros atuais
+        e a faixa de chaves já carregada; o restante da tabela, a rolagem e a
+        seleção não são tocados.
+        """
+        if self.prefetcher:
+            self.prefetcher.descartar(alteracoes['alterados'] | alteracoes['excluidos'])
+
+        if alteracoes['recarregar']:
+            self.atualizar_lista()
+            return
+
+        selecionados = self.tree.selection()
+
+        for pid in alteracoes['excluidos']:
+            self._remover_linha(str(pid))
+
+        for paciente in self.patient_model.get_by_ids(alteracoes['alterados']):
+            item = str(paciente['id'])
+            self._remover_linha(item)
+
+            if self._pertence_a_janela(paciente):
+                self._inserir_paciente(paciente, self._posicao(Patient.chave_paginacao(paciente)))
+
+        self.tree.selection_set([item for item in selecionados if self.tree.exists(item)])
+        self._atualizar_fila_prefetch()
+
+    def _remover_linha(self, item: str):
+        if self.tree.exists(item):
+            self.tree.delete(item)
+        self._chaves.pop(item, None)
+        self._pendentes.discard(item)
+
+    def _pertence_a_janela(self, paciente: dict) -> bool:
+        """Indica se o paciente passa nos filtros e cai na faixa carregada"""
+        status = self._filtros.get('status')
+        if status and paciente['status'] != status:
+            return False
+
+        data_inicio = self._filtros.get('data_inicio')
+        if data_inicio and paciente['data_consulta'] < data_inicio:
+            return False
+
+        itens = self.tree.get_children()
+        if not itens:
+            return self._inicio_alcancado and self._fim_alcancado
+
+        chave = Patient.chave_paginacao(paciente)
+        menor, maior = self._chaves[itens[0]], self._chaves[itens[-1]]
+        completo_menor, completo_maior = self._inicio_alcancado, self._fim_alcancado
+        if self._filtros.get('decrescente'):
+            menor, maior = maior, menor
+            completo_menor, completo_maior = completo_maior, completo_menor
+
+        # Fora da faixa carregada: aparece quando a rolagem chegar nela
+        if chave < menor and not completo_menor:
+            return False
+        if chave > maior and not completo_maior:
+            return False
+        return True
+
+    def _atualizar_fila_prefetch(self):
+        """Informa ao prefetcher os próximos pendentes a partir da seleção"""
+        if not self.prefetcher:
+            return
+
+        itens = self.tree.get_children()
+        selecao = self.tree.selection()
+        inicio = self.tree.index(selecao[0]) if selecao else 0
+
+        fila = []
+        for item in itens[inicio:]:
+            if item in self._pendentes:
+                fila.append(int(item))
+                if len(fila) >= self.prefetcher.quantidade:
+                    break
+
+        self.prefetcher.definir_fila(fila)
+
+    def _posicao(self, chave) -> int:
+        """Índice em que a chave entra na tabela, mantendo a ordenação"""
+        chaves = [self._chaves[item] for item in self.tree.get_children()]
+
+        if self._filtros.get('decrescente'):
+            return len(chaves) - bisect.bisect_left(chaves[::-1], chave)
+        return bisect.bisect_left(chaves, chave)
+
     def _on_double_click(self, event):
         """Duplo clique abre preparação de mensagem"""
         self._preparar_mensagem_selecionado()
@@ -280,6 +446,33 @@ class PatientView:
         if paciente_id:
             self.on_preparar_mensagem(paciente_id)
     
+    def _preparar_todos(self):
+        """Prepara de uma vez as mensagens dos pendentes de um dia"""
+        data_texto = simpledialog.askstring(
+            "Preparar Todos",
+            "Data das consultas (DD/MM/AAAA):",
+            initialvalue=date.today().strftime('%d/%m/%Y'),
+            parent=self.frame.winfo_toplevel()
+        )
+        if not data_texto:
+            return
+
+        result = MessageManager(self.db_path).preparar_mensagens_lote(data_texto)
+
+        if not result['success']:
+            messagebox.showerror("Erro", result['message'])
+            return
+
+        self.atualizar_lista()
+
+        texto = f"{result['preparados']} mensagem(ns) preparada(s)."
+        if result['sem_consentimento']:
+            texto += (
+                f"\n\n{result['sem_consentimento']} paciente(s) sem consentimento registrado "
+                "ficaram pendentes. Prepare individualmente para registrar o consentimento."
+            )
+        messagebox.showinfo("Preparar Todos", texto)
+    
     def _marcar_confirmado(self):
         """Marca paciente como confirmado"""
         paciente_id = self._get_selected_id()
@@ -287,7 +480,7 @@ class PatientView:
             return
         
         if messagebox.askyesno("Confirmar", "Marcar como confirmado?"):
-            conn = sqlite3.connect(self.db_path)
+            conn = get_connection(self.db_path)
             cursor = conn.cursor()
             
             from datetime import datetime
@@ -312,7 +505,7 @@ class PatientView:
             return
         
         if messagebox.askyesno("Confirmar", "Marcar como sem resposta?"):
-            conn = sqlite3.connect(self.db_path)
+            conn = get_connection(self.db_path)
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -333,7 +526,7 @@ class PatientView:
             return
 
         # Buscar status atual
-        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
 
         cursor.execute("SELECT nome, status FROM pacientes WHERE id = ?", (paciente_id,))
@@ -379,7 +572,7 @@ class PatientView:
             novo_status = [k for k, v in status_options.items() if v == novo_status_display][0]
 
             if messagebox.askyesno("Confirmar", f"Alterar status para '{novo_status_display}'?"):
-                conn = sqlite3.connect(self.db_path, timeout=10)
+                conn = get_connection(self.db_path)
                 cursor = conn.cursor()
 
                 cursor.execute("""
@@ -419,7 +612,7 @@ class PatientView:
 
         if messagebox.askyesno("Reverter Reagendamento",
                               "Deseja reverter o reagendamento e marcar o paciente como pendente novamente?"):
-            conn = sqlite3.connect(self.db_path)
+            conn = get_connection(self.db_path)
             cursor = conn.cursor()
 
             cursor.execute("""
@@ -445,7 +638,7 @@ class PatientView:
             "⚠️ Tem certeza que deseja excluir este paciente?\n\n"
             "Esta ação não pode ser desfeita!"
         ):
-            conn = sqlite3.connect(self.db_path)
+            conn = get_connection(self.db_path)
             cursor = conn.cursor()
             
             cursor.execute("DELETE FROM pacientes WHERE id = ?", (paciente_id,))
@@ -0,0 +1,151 @@
+import tkinter as tk
+from tkinter import ttk
+from backend.dates import para_exibicao
+from backend.planner import SendPlanner, MOTIVOS
+
+class SendPlanView:
+    # Reavalia o plano periodicamente para tirar horários que já passaram
+    INTERVALO_ATUALIZACAO_MS = 60000
+
+    TIPOS = {
+        'primeiro_contato': 'Primeiro contato',
+        'confirmacao': 'Confirmação',
+        'lembrete': 'Lembrete',
+        'reagendamento': 'Reagendamento',
+        'follow_up': 'Follow-up'
+    }
+
+    def __init__(self, parent, db_path: str):
+        self.db_path = db_path
+        self.planner = SendPlanner(db_path)
+        self._plano_exibido = None
+        self._linhas = {}  # iid -> (values, tags) exibidos
+
+        self.frame = ttk.Frame(parent)
+        self._criar_interface()
+        self.recarregar()
+
+    def _criar_interface(self):
+        toolbar = ttk.Frame(self.frame)
+        toolbar.pack(fill=tk.X, padx=10, pady=10)
+
+        self.resumo_label = ttk.Label(toolbar, text="", font=('Arial', 10, 'bold'))
+        self.resumo_label.pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(
+            toolbar,
+            text="🔄 Atualizar",
+            command=self.recarregar
+        ).pack(side=tk.RIGHT, padx=5)
+
+        table_frame = ttk.Frame(self.frame)
+        table_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+
+        scroll_y = ttk.Scrollbar(table_frame, orient=tk.VERTICAL)
+
+        self.tree = ttk.Treeview(
+            table_frame,
+            columns=('horario', 'nome', 'telefone', 'consulta', 'tipo', 'situacao'),
+            show='headings',
+            yscrollcommand=scroll_y.set
+        )
+
+        self.tree.heading('horario', text='Enviar às')
+        self.tree.heading('nome', text='Nome')
+        self.tree.heading('telefone', text='Telefone')
+        self.tree.heading('consulta', text='Consulta')
+        self.tree.heading('tipo', text='Mensagem')
+        self.tree.heading('situacao', text='Situação')
+
+        self.tree.column('horario', width=80, anchor=tk.CENTER)
+        self.tree.column('nome', width=200)
+        self.tree.column('telefone', width=120)
+        self.tree.column('consulta', width=130)
+        self.tree.column('tipo', width=120)
+        self.tree.column('situacao', width=260)
+
+        self.tree.tag_configure('fora', foreground='gray')
+
+        scroll_y.config(command=self.tree.yview)
+        scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        self.frame.after(self.INTERVALO_ATUALIZACAO_MS, self._atualizacao_periodica)
+
+    def recarregar(self):
+        """Relê a fila e a configuração de horários"""
+        self.planner.carregar()
+        self.atualizar()
+
+    def aplicar_alteracoes(self, alteracoes: dict):
+        """Atualiza a fila com os pacientes alterados (ver ChangeMonitor)"""
+        self.planner.aplicar_alteracoes(alteracoes)
+        self.atualizar()
+
+    def _atualizacao_periodica(self):
+        try:
+            self.atualizar()
+        finally:
+            self.frame.after(self.INTERVALO_ATUALIZACAO_MS, self._atualizacao_periodica)
+
+    def atualizar(self):
+        plano = self.planner.plano()
+
+        # plano() devolve o mesmo dict enquanto nada mudou (tique de 60 s)
+        if plano is self._plano_exibido:
+            return
+        self._plano_exibido = plano
+
+        linhas = []
+        for envio in plano['envios']:
+            linhas.append((str(envio['paciente_id']), (
+                envio['horario'].strftime('%H:%M'),
+                envio['nome'],
+                envio['telefone'],
+                f"{para_exibicao(envio['data_consulta'])} {envio['hora_consulta'] or ''}",
+                self.TIPOS.get(envio['tipo'], envio['tipo']),
+                'Planejado'
+            ), ()))
+
+        for item in plano['nao_planejados']:
+            linhas.append((str(item['paciente_id']), (
+                '—',
+                item['nome'],
+                item['telefone'],
+                f"{para_exibicao(item['data_consulta'])} {item['hora_consulta'] or ''}",
+                self.TIPOS.get(item['tipo'], item['tipo']),
+                MOTIVOS[item['motivo']]
+            ), ('fora',)))
+
+        self._aplicar_linhas(linhas)
+
+        if plano['inicio'] >= plano['fim']:
+            janela = "fora do horário de envios"
+        else:
+            janela = f"{plano['inicio'].strftime('%H:%M')} às {plano['fim'].strftime('%H:%M')}"
+
+        self.resumo_label.config(
+            text=f"Hoje ({janela}): {len(plano['envios'])} envios planejados · "
+                 f"{len(plano['nao_planejados'])} fora do plano · "
+                 f"{plano['restantes_hoje']} primeiros contatos restantes"
+        )
+
+    def _aplicar_linhas(self, linhas):
+        """Mexe só nas linhas que mudaram (iid = id do paciente)"""
+        novas = {iid for iid, _, _ in linhas}
+        removidas = [iid for iid in self._linhas if iid not in novas]
+        if removidas:
+            self.tree.delete(*removidas)
+            for iid in removidas:
+                del self._linhas[iid]
+
+        for posicao, (iid, valores, tags) in enumerate(linhas):
+            anterior = self._linhas.get(iid)
+            if anterior is None:
+                self.tree.insert('', posicao, iid=iid, values=valores, tags=tags)
+            else:
+                if anterior != (valores, tags):
+                    self.tree.item(iid, values=valores, tags=tags)
+                if self.tree.index(iid) != posicao:
+                    self.tree.move(iid, '', posicao)
+            self._linhas[iid] = (valores, tags)
@@ -0,0 +1,51 @@
+"""
+Pré-carregamento de dependências pesadas
+matplotlib (dashboard) e reportlab (relatórios em PDF) só são importados
+quando usados, para não atrasar a abertura do login. Depois do login,
+aquecer() importa esses módulos numa thread em segundo plano, e a primeira
+abertura do dashboard ou do PDF não espera pelo carregamento.
+
+Desative com a variável de ambiente TITANIUM_PRECARREGAR=0.
+"""
+
+import importlib
+import logging
+import os
+import threading
+import time
+from typing import Iterable, Optional, Tuple
+
+MODULOS_DASHBOARD = ('matplotlib.figure', 'matplotlib.backends.backend_tkagg')
+MODULOS_RELATORIOS = ('reportlab.platypus', 'reportlab.lib.styles', 'reportlab.lib.pagesizes')
+
+logger = logging.getLogger('Warmup')
+
+
+def modulos_para_perfil(perfil: str) -> Tuple[str, ...]:
+    """Dashboard e relatórios só aparecem para admin e gestor"""
+    if perfil in ('admin', 'gestor'):
+        return MODULOS_DASHBOARD + MODULOS_RELATORIOS
+    return ()
+
+
+def aquecer(modulos: Iterable[str]) -> Optional[threading.Thread]:
+    """Importa os módulos em segundo plano; retorna a thread (ou None se desativado)"""
+    modulos = tuple(modulos)
+    if not modulos or os.getenv('TITANIUM_PRECARREGAR', '1') == '0':
+        return None
+
+    thread = threading.Thread(target=_importar, args=(modulos,), daemon=True, name='Warmup')
+    thread.start()
+    return thread
+
+
+def _importar(modulos: Tuple[str, ...]):
+    for nome in modulos:
+        inicio = time.perf_counter()
+        try:
+            importlib.import_module(nome)
+        except ImportError as e:
+            # Dependência opcional ausente: o erro aparece quando a função for usada
+            logger.warning(f"Pré-carregamento de {nome} falhou: {str(e)}")
+            continue
+        logger.debug(f"{nome} carregado em {(time.perf_counter() - inicio) * 1000:.0f} ms")
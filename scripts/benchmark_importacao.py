@@ -0,0 +1,125 @@
+"""
+Benchmark da importação de planilhas
+
+Gera uma planilha sintética de pacientes e mede a importação completa
+(leitura, validação e gravação) com PatientImporter, em linhas por segundo.
+Com --reimportar, mede também a reimportação do mesmo arquivo no modo de
+atualização (agenda noturna: chaves carregadas uma vez, nada muda).
+Com --memoria, mede também o pico de memória alocada pelo Python (tracemalloc
+deixa a importação bem mais lenta, então o tempo dessa execução não vale).
+
+Uso:
+    python scripts/benchmark_importacao.py [--linhas 100000] [--formato csv|xlsx] [--reimportar] [--memoria]
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.database import criar_banco
+from backend.migrations import aplicar_migracoes
+from backend.importer import PatientImporter
+
+CABECALHO = ['nome', 'telefone', 'email', 'data_nascimento', 'cpf', 'data_consulta',
+             'hora_consulta', 'tipo_consulta', 'profissional', 'observacoes', 'consentimento_whatsapp']
+
+
+def gerar_cpf(rnd: random.Random) -> str:
+    digitos = [rnd.randint(0, 9) for _ in range(9)]
+    for peso in (10, 11):
+        resto = sum(d * (peso - i) for i, d in enumerate(digitos)) % 11
+        digitos.append(0 if resto < 2 else 11 - resto)
+    return ''.join(map(str, digitos))
+
+
+def gerar_linhas(quantidade: int, semente: int = 42):
+    rnd = random.Random(semente)
+    profissionais = ['Dra. Helena', 'Dr. Paulo', 'Dra. Marta']
+
+    for i in range(quantidade):
+        yield [
+            f'Paciente {i} da Silva',
+            f'({rnd.choice([11, 21, 31, 41])}) 9{rnd.randint(0, 99999999):08d}',
+            f'paciente.{i}@gmail.com' if rnd.random() < 0.6 else '',
+            f'{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/{rnd.randint(1940, 2015)}',
+            gerar_cpf(rnd) if rnd.random() < 0.7 else '',
+            f'{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/2026',
+            f'{rnd.randint(8, 17):02d}:{rnd.choice(["00", "15", "30", "45"])}',
+            'Retorno',
+            rnd.choice(profissionais),
+            '',
+            rnd.choice(['SIM', 'NÃO']),
+        ]
+
+
+def gravar_planilha(caminho: str, quantidade: int, formato: str):
+    if formato == 'csv':
+        with open(caminho, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(CABECALHO)
+            writer.writerows(gerar_linhas(quantidade))
+    else:
+        from openpyxl import Workbook
+        livro = Workbook(write_only=True)
+        planilha = livro.create_sheet()
+        planilha.append(CABECALHO)
+        for linha in gerar_linhas(quantidade):
+            planilha.append(linha)
+        livro.save(caminho)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=100000)
+    parser.add_argument('--formato', choices=['csv', 'xlsx'], default='csv')
+    parser.add_argument('--reimportar', action='store_true')
+    parser.add_argument('--memoria', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, 'benchmark.db')
+        criar_banco(db_path)
+        aplicar_migracoes(db_path)
+
+        arquivo = os.path.join(tmpdir, f'pacientes.{args.formato}')
+        gravar_planilha(arquivo, args.linhas, args.formato)
+
+        importer = PatientImporter(db_path, 1)
+
+        if args.memoria:
+            tracemalloc.start()
+
+        inicio = time.perf_counter()
+        resultado = importer.importar(arquivo)
+        duracao = time.perf_counter() - inicio
+
+        if args.memoria:
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        if args.reimportar:
+            inicio = time.perf_counter()
+            reimportacao = PatientImporter(db_path, 1, atualizar_existentes=True).importar(arquivo)
+            duracao_reimportacao = time.perf_counter() - inicio
+
+    print(f"{resultado['total']:,} linhas ({args.formato}): {resultado['importados']:,} importadas, "
+          f"{resultado['duplicados']:,} duplicadas, {resultado['erros']:,} com erro")
+    if args.memoria:
+        print(f"Pico de memória alocada: {pico / 1024 / 1024:.1f} MB")
+    else:
+        print(f"Tempo: {duracao:.2f} s ({resultado['total'] / duracao:,.0f} linhas/s)")
+    if args.reimportar:
+        print(f"Reimportação (atualizar existentes): {reimportacao['atualizados']:,} atualizadas, "
+              f"{reimportacao['importados']:,} novas em {duracao_reimportacao:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
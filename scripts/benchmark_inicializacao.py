@@ -0,0 +1,76 @@
+"""
+Benchmark do tempo de inicialização
+
+Mede, com `python -X importtime`, quanto custa importar o módulo de entrada
+da aplicação (app.py) num processo novo, e lista os módulos mais caros.
+Dependências pesadas (pandas, matplotlib, reportlab...) não podem ser
+carregadas antes do login: o orçamento abaixo é verificado também por
+tests/test_startup.py.
+
+Uso:
+    python scripts/benchmark_inicializacao.py [--execucoes 5] [--top 15]
+"""
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Tuple
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# Importar app.py (login + janela principal, sem abrir janelas)
+ORCAMENTO_MS = 500
+# Carregados só quando a função é usada (ver frontend/warmup.py)
+MODULOS_PROIBIDOS = ('pandas', 'matplotlib', 'reportlab', 'numpy', 'openpyxl')
+
+
+def medir(modulo: str = 'app') -> Tuple[float, Dict[str, float]]:
+    """
+    Importa `modulo` num processo novo com -X importtime.
+    Retorna (tempo total do módulo em ms, {módulo: tempo acumulado em ms}).
+    """
+    processo = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+        cwd=RAIZ, capture_output=True, text=True, check=True
+    )
+
+    tempos = {}
+    for linha in processo.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not linha.startswith('import time:') or 'cumulative' in linha:
+            continue
+        _, acumulado, nome = linha[len('import time:'):].split('|')
+        tempos[nome.strip()] = int(acumulado) / 1000
+
+    return tempos[modulo], tempos
+
+
+def proibidos_carregados(tempos: Dict[str, float]) -> list:
+    return sorted({nome.split('.')[0] for nome in tempos} & set(MODULOS_PROIBIDOS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--execucoes', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    # A primeira execução paga o cache de disco e os .pyc: vale a melhor
+    medicoes = [medir() for _ in range(args.execucoes)]
+    total, tempos = min(medicoes, key=lambda m: m[0])
+
+    print(f"Importar app.py: {total:.0f} ms (melhor de {args.execucoes}; orçamento {ORCAMENTO_MS} ms)")
+    print("\nMódulos mais caros (acumulado):")
+    for nome, ms in sorted(tempos.items(), key=lambda item: -item[1])[1:args.top + 1]:
+        print(f"  {ms:8.1f} ms  {nome}")
+
+    proibidos = proibidos_carregados(tempos)
+    if proibidos:
+        print(f"\nCarregados na inicialização (não deveriam): {', '.join(proibidos)}")
+    if proibidos or total > ORCAMENTO_MS:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark da validação de telefones
+
+Compara a validação anterior (regex + phonenumbers completo a cada chamada)
+com SecurityValidator.validar_telefones_lote, numa coluna de telefones como
+a de uma planilha importada: maioria de celulares, alguns fixos, números
+inválidos e repetidos.
+
+Uso:
+    python scripts/benchmark_telefones.py [--quantidade 100000]
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+import phonenumbers
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.security import SecurityValidator, DDDS_VALIDOS, _validar_telefone
+
+
+def validar_antigo(numero: str):
+    """Implementação anterior de SecurityValidator.validar_telefone (referência)"""
+    numero_limpo = re.sub(r'[^\d+]', '', numero)
+
+    if not numero_limpo.startswith('+'):
+        numero_limpo = '+55' + numero_limpo
+
+    try:
+        telefone = phonenumbers.parse(numero_limpo)
+
+        if not phonenumbers.is_valid_number(telefone):
+            return False, '', 'Número de telefone inválido'
+
+        if telefone.country_code != 55:
+            return False, '', 'Sistema aceita apenas números brasileiros'
+
+        return True, phonenumbers.format_number(telefone, phonenumbers.PhoneNumberFormat.E164), ''
+
+    except phonenumbers.NumberParseException:
+        return False, '', 'Formato de número inválido'
+
+
+def gerar_coluna(quantidade: int, semente: int = 42):
+    rnd = random.Random(semente)
+    ddds = sorted(DDDS_VALIDOS)
+    coluna = []
+
+    for _ in range(quantidade):
+        sorteio = rnd.random()
+        ddd = rnd.choice(ddds)
+
+        if sorteio < 0.70:
+            numero = f'9{rnd.randint(0, 99999999):08d}'
+            formato = rnd.choice(['({}) {}-{}', '{}{}{}', '+55 {} {}-{}', '{} {}{}'])
+            coluna.append(formato.format(ddd, numero[:5], numero[5:]))
+        elif sorteio < 0.85:
+            coluna.append(f'({ddd}) {rnd.randint(2000, 5999)}-{rnd.randint(0, 9999):04d}')
+        elif sorteio < 0.95:
+            # Repetidos: mesmo responsável para vários pacientes
+            coluna.append(coluna[rnd.randrange(len(coluna))] if coluna else f'{ddd}987654321')
+        else:
+            coluna.append(rnd.choice(['', '123', f'{ddd}12345', '+1 202 555 0143', 'sem telefone']))
+
+    return coluna
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quantidade', type=int, default=100000)
+    args = parser.parse_args()
+
+    coluna = gerar_coluna(args.quantidade)
+    validator = SecurityValidator(':memory:')
+
+    # Mesmos resultados nas duas implementações
+    for numero in coluna[:5000]:
+        assert validator.validar_telefone(numero) == validar_antigo(numero), numero
+
+    print(f"{len(coluna):,} telefones ({len(set(coluna)):,} distintos)")
+
+    inicio = time.perf_counter()
+    for numero in coluna:
+        validar_antigo(numero)
+    antigo = time.perf_counter() - inicio
+    print(f"Anterior (phonenumbers por linha): {len(coluna) / antigo:,.0f} telefones/s")
+
+    _validar_telefone.cache_clear()
+    inicio = time.perf_counter()
+    validator.validar_telefones_lote(coluna)
+    novo = time.perf_counter() - inicio
+    print(f"validar_telefones_lote:            {len(coluna) / novo:,.0f} telefones/s")
+
+    print(f"Ganho: {antigo / novo:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
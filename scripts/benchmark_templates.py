@@ -0,0 +1,125 @@
+"""
+Benchmark da personalização de mensagens
+
+Compara a implementação anterior (str.replace encadeado + strptime a cada
+chamada) com os templates compilados, renderizando todo o banco de
+templates gerado por popular_mensagens para um conjunto de pacientes.
+
+Uso:
+    python scripts/benchmark_templates.py [--pacientes 200]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.database import criar_banco
+from backend.migrations import aplicar_migracoes
+from backend.populate_messages import popular_mensagens
+from backend.messaging import MessageManager, template_cache, compilar_template, _formatar_data
+
+
+def personalizar_antigo(texto: str, dados: dict) -> str:
+    """Implementação anterior de MessageManager._personalizar_mensagem (referência)"""
+    if dados.get('data_consulta'):
+        data_obj = None
+        formatos = ['%Y-%m-%d', '%d/%m/%Y', '%Y/%m/%d', '%d-%m-%Y']
+
+        for fmt in formatos:
+            try:
+                data_obj = datetime.strptime(str(dados['data_consulta']), fmt)
+                break
+            except (ValueError, TypeError):
+                continue
+
+        if data_obj:
+            data_formatada = data_obj.strftime('%d/%m/%Y')
+            dia_semana = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo'][data_obj.weekday()]
+            texto = texto.replace('{data}', data_formatada)
+            texto = texto.replace('{dia_semana}', dia_semana)
+        else:
+            texto = texto.replace('{data}', str(dados['data_consulta']))
+            texto = texto.replace('{dia_semana}', 'o dia')
+    else:
+        texto = texto.replace('{data}', 'hoje')
+        texto = texto.replace('{dia_semana}', 'hoje')
+
+    if dados.get('hora_consulta'):
+        texto = texto.replace('{hora}', str(dados['hora_consulta'])[:5])
+    else:
+        texto = texto.replace('{hora}', 'agora')
+
+    if dados.get('nome'):
+        texto = texto.replace('{nome}', dados['nome'].split()[0])
+
+    if dados.get('tipo_consulta'):
+        texto = texto.replace('{tipo}', dados['tipo_consulta'])
+
+    if dados.get('profissional'):
+        texto = texto.replace('{profissional}', dados['profissional'])
+
+    return texto.strip()
+
+
+def medir(funcao, templates, pacientes) -> float:
+    """Retorna renderizações por segundo"""
+    inicio = time.perf_counter()
+    for dados in pacientes:
+        for texto in templates:
+            funcao(texto, dados)
+    duracao = time.perf_counter() - inicio
+    return len(templates) * len(pacientes) / duracao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pacientes', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, 'benchmark.db')
+        criar_banco(db_path)
+        aplicar_migracoes(db_path)
+        popular_mensagens(db_path)
+
+        manager = MessageManager(db_path)
+        tipos = ['primeiro_contato', 'confirmacao', 'lembrete', 'reagendamento', 'follow_up']
+        templates = [texto for tipo in tipos for _, texto in template_cache.obter(db_path, tipo)]
+
+    # Agenda realista: poucas datas distintas para muitos pacientes
+    hoje = date.today()
+    pacientes = [{
+        'id': i,
+        'nome': f'Paciente {i} da Silva',
+        'data_consulta': (hoje + timedelta(days=i % 30)).isoformat(),
+        'hora_consulta': f'{8 + i % 10:02d}:{(i * 15) % 60:02d}',
+        'tipo_consulta': 'Retorno',
+        'profissional': 'Dra. Helena'
+    } for i in range(args.pacientes)]
+
+    # Mesma saída nas duas implementações
+    for dados in pacientes[:20]:
+        for texto in templates:
+            assert manager._personalizar_mensagem(texto, dados) == personalizar_antigo(texto, dados), texto
+
+    print(f"{len(templates)} templates x {len(pacientes)} pacientes")
+
+    antigo = medir(personalizar_antigo, templates, pacientes)
+    print(f"Anterior (str.replace + strptime): {antigo:,.0f} renderizações/s")
+
+    compilar_template.cache_clear()
+    _formatar_data.cache_clear()
+    novo = medir(manager._personalizar_mensagem, templates, pacientes)
+    print(f"Templates compilados:              {novo:,.0f} renderizações/s")
+
+    print(f"Ganho: {novo / antigo:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark da validação de CPF e email em lote
+
+Compara a validação linha a linha (validar_cpf / validar_email) com
+validar_cpfs_lote / validar_emails_lote numa planilha sintética de
+pacientes, e mostra quanto tempo a leitura do mesmo arquivo CSV leva,
+para comparar validação com I/O.
+
+Uso:
+    python scripts/benchmark_validacao.py [--linhas 200000]
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.security import SecurityValidator
+
+
+def gerar_cpf(rnd: random.Random) -> str:
+    digitos = [rnd.randint(0, 9) for _ in range(9)]
+    for peso in (10, 11):
+        resto = sum(d * (peso - i) for i, d in enumerate(digitos)) % 11
+        digitos.append(0 if resto < 2 else 11 - resto)
+    cpf = ''.join(map(str, digitos))
+    return rnd.choice([cpf, f'{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}'])
+
+
+def gerar_linhas(quantidade: int, semente: int = 42):
+    rnd = random.Random(semente)
+    dominios = ['gmail.com', 'hotmail.com', 'uol.com.br', 'yahoo.com.br', 'clinica.med.br']
+
+    for i in range(quantidade):
+        sorteio = rnd.random()
+        if sorteio < 0.80:
+            cpf = gerar_cpf(rnd)
+        elif sorteio < 0.90:
+            cpf = f'{rnd.randint(0, 10**11 - 1):011d}'
+        else:
+            cpf = ''
+
+        email = f'paciente.{i}@{rnd.choice(dominios)}' if rnd.random() < 0.7 else rnd.choice(['', 'sem email', 'a@b'])
+        yield cpf, email
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=200000)
+    args = parser.parse_args()
+
+    linhas = list(gerar_linhas(args.linhas))
+    cpfs = [cpf for cpf, _ in linhas]
+    emails = [email for _, email in linhas]
+    validator = SecurityValidator(':memory:')
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        caminho = os.path.join(tmpdir, 'pacientes.csv')
+        with open(caminho, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['nome', 'telefone', 'data_consulta', 'hora_consulta', 'cpf', 'email'])
+            for i, (cpf, email) in enumerate(linhas):
+                writer.writerow([f'Paciente {i}', '11987654321', '2026-01-05', '09:00', cpf, email])
+
+        inicio = time.perf_counter()
+        with open(caminho, newline='', encoding='utf-8') as f:
+            for _ in csv.reader(f):
+                pass
+        leitura = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    antigos = [validator.validar_cpf(cpf)[0] for cpf in cpfs]
+    antigos_email = [validator.validar_email(email)[0] for email in emails]
+    linha_a_linha = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    mascara_cpf, _ = validator.validar_cpfs_lote(cpfs)
+    mascara_email, _ = validator.validar_emails_lote(emails)
+    lote = time.perf_counter() - inicio
+
+    assert antigos == mascara_cpf.tolist()
+    assert antigos_email == mascara_email.tolist()
+
+    print(f"{len(linhas):,} linhas")
+    print(f"Leitura do CSV:            {leitura * 1000:8.0f} ms")
+    print(f"Validação linha a linha:   {linha_a_linha * 1000:8.0f} ms")
+    print(f"Validação em lote (NumPy): {lote * 1000:8.0f} ms")
+    print(f"Ganho: {linha_a_linha / lote:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
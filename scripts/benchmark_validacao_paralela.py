@@ -0,0 +1,77 @@
+"""
+Benchmark da validação paralela da importação
+
+Mede, para 1, 2, 4 e 8 processos, a etapa de leitura + validação de
+PatientImporter (sem gravar) e a importação completa, numa planilha
+sintética grande. A gravação continua numa única conexão, então o ganho
+da importação completa fica limitado pelo SQLite.
+
+Uso:
+    python scripts/benchmark_validacao_paralela.py [--linhas 500000] [--processos 1 2 4 8]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.database import criar_banco
+from backend.migrations import aplicar_migracoes
+from backend.importer import PatientImporter
+from benchmark_importacao import gravar_planilha
+
+
+def medir_validacao(db_path: str, arquivo: str, processos: int) -> float:
+    importer = PatientImporter(db_path, 1, processos=processos)
+    executor = importer._criar_executor()
+
+    inicio = time.perf_counter()
+    try:
+        for _ in importer._lotes_validados(importer.ler_lotes(arquivo), executor):
+            pass
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return time.perf_counter() - inicio
+
+
+def medir_importacao(tmpdir: str, arquivo: str, processos: int) -> float:
+    db_path = os.path.join(tmpdir, f'benchmark_{processos}.db')
+    criar_banco(db_path)
+    aplicar_migracoes(db_path)
+
+    inicio = time.perf_counter()
+    PatientImporter(db_path, 1, processos=processos).importar(arquivo)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=500000)
+    parser.add_argument('--processos', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        arquivo = os.path.join(tmpdir, 'pacientes.csv')
+        gravar_planilha(arquivo, args.linhas, 'csv')
+        db_path = os.path.join(tmpdir, 'validacao.db')
+        criar_banco(db_path)
+
+        print(f"{args.linhas:,} linhas, {os.cpu_count()} CPUs")
+        print(f"{'processos':>9}  {'validação':>12}  {'importação':>12}")
+
+        base = None
+        for processos in args.processos:
+            validacao = medir_validacao(db_path, arquivo, processos)
+            importacao = medir_importacao(tmpdir, arquivo, processos)
+            base = base or validacao
+            print(f"{processos:>9}  {args.linhas / validacao:>8,.0f} l/s  {args.linhas / importacao:>8,.0f} l/s"
+                  f"  (validação {base / validacao:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from backend.changes import ChangeMonitor, suspender_registro, retomar_registro
+from backend.database import criar_banco
+from backend.migrations import aplicar_migracoes
+
+class TestChangeMonitor(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'teste.db')
+        criar_banco(self.db_path)
+        aplicar_migracoes(self.db_path)
+
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("""
+            INSERT INTO pacientes (nome, telefone, data_consulta, hora_consulta)
+            VALUES ('Ana', '11999999999', '2026-01-05', '09:00')
+        """)
+        self.conn.commit()
+
+        self.monitor = ChangeMonitor(self.db_path)
+
+    def tearDown(self):
+        self.monitor.fechar()
+        self.conn.close()
+        self.tmpdir.cleanup()
+
+    def test_sem_alteracoes(self):
+        self.assertIsNone(self.monitor.verificar())
+
+        # Alterações em outras tabelas não geram notificação
+        self.conn.execute("UPDATE configuracoes SET valor = valor")
+        self.conn.commit()
+        self.assertIsNone(self.monitor.verificar())
+
+    def test_detecta_alteracoes_de_outra_conexao(self):
+        recebidas = []
+        self.monitor.registrar(recebidas.append)
+
+        self.conn.execute("UPDATE pacientes SET status = 'confirmado', data_consulta = '2026-01-06' WHERE id = 1")
+        self.conn.execute("""
+            INSERT INTO pacientes (nome, telefone, data_consulta, hora_consulta)
+            VALUES ('Bia', '11988888888', '2026-01-07', '10:00')
+        """)
+        self.conn.commit()
+
+        alteracoes = self.monitor.verificar()
+
+        self.assertFalse(alteracoes['recarregar'])
+        self.assertEqual(alteracoes['alterados'], {1, 2})
+        self.assertEqual(alteracoes['datas'], {'2026-01-05', '2026-01-06', '2026-01-07'})
+        self.assertEqual(recebidas, [alteracoes])
+        self.assertIsNone(self.monitor.verificar())
+
+    def test_exclusao_prevalece_sobre_alteracao(self):
+        self.conn.execute("UPDATE pacientes SET status = 'confirmado' WHERE id = 1")
+        self.conn.execute("DELETE FROM pacientes WHERE id = 1")
+        self.conn.commit()
+
+        alteracoes = self.monitor.verificar()
+
+        self.assertEqual(alteracoes['alterados'], set())
+        self.assertEqual(alteracoes['excluidos'], {1})
+
+    def test_volume_alto_pede_recarga(self):
+        self.monitor.LIMITE_INCREMENTAL = 3
+        self.conn.executemany("""
+            INSERT INTO pacientes (nome, telefone, data_consulta, hora_consulta)
+            VALUES (?, '11999999999', '2026-01-05', '09:00')
+        """, [(f'Paciente {i}',) for i in range(5)])
+        self.conn.commit()
+
+        self.assertTrue(self.monitor.verificar()['recarregar'])
+        self.assertIsNone(self.monitor.verificar())
+
+    def test_gravacao_em_massa_registra_so_a_marca_de_recarga(self):
+        suspender_registro(self.conn)
+        self.conn.executemany("""
+            INSERT INTO pacientes (nome, telefone, data_consulta, hora_consulta)
+            VALUES (?, '11999999999', '2026-01-05', '09:00')
+        """, [(f'Paciente {i}',) for i in range(5)])
+        retomar_registro(self.conn)
+        self.conn.commit()
+
+        total = self.conn.execute("SELECT COUNT(*) FROM pacientes_alteracoes WHERE seq > 1").fetchone()[0]
+        self.assertEqual(total, 1)
+        self.assertTrue(self.monitor.verificar()['recarregar'])
+
+        # Fora da gravação em massa o registro por linha continua
+        self.conn.execute("UPDATE pacientes SET status = 'confirmado' WHERE id = 1")
+        self.conn.commit()
+        self.assertEqual(self.monitor.verificar()['alterados'], {1})
+
+    def test_limpeza_periodica(self):
+        self.conn.execute("UPDATE pacientes_alteracoes SET alterado_em = datetime('now', '-2 days')")
+        self.conn.commit()
+
+        self.monitor.verificar()
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM pacientes_alteracoes").fetchone()[0], 1)
+
+        self.monitor.INTERVALO_LIMPEZA = 0
+        self.monitor.verificar()
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM pacientes_alteracoes").fetchone()[0], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from backend.connection import ConnectionManager, ConexaoReutilizavel
+
+class TestConnectionManager(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'teste.db')
+        self.manager = ConnectionManager()
+
+    def tearDown(self):
+        self.manager.invalidar()
+        self.tmpdir.cleanup()
+
+    def test_reutiliza_conexao_na_mesma_thread(self):
+        conn1 = self.manager.obter_conexao(self.db_path)
+        conn1.close()
+        conn2 = self.manager.obter_conexao(self.db_path)
+
+        self.assertIs(conn1, conn2)
+        stats = self.manager.estatisticas()
+        self.assertEqual(stats['aberturas'], 1)
+        self.assertEqual(stats['reutilizacoes'], 1)
+
+    def test_close_descarta_transacao_pendente(self):
+        conn = self.manager.obter_conexao(self.db_path)
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        conn.execute("INSERT INTO t VALUES (1)")
+        conn.close()
+
+        conn = self.manager.obter_conexao(self.db_path)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM t").fetchone()[0], 0)
+
+    def test_conexao_por_thread(self):
+        principal = self.manager.obter_conexao(self.db_path)
+        outras = []
+
+        t = threading.Thread(target=lambda: outras.append(self.manager.obter_conexao(self.db_path)))
+        t.start()
+        t.join()
+
+        self.assertIsNot(principal, outras[0])
+
+    def test_invalidar_reabre_conexao(self):
+        conn1 = self.manager.obter_conexao(self.db_path)
+        self.manager.invalidar(self.db_path)
+        conn2 = self.manager.obter_conexao(self.db_path)
+
+        self.assertIsNot(conn1, conn2)
+        self.assertEqual(self.manager.estatisticas()['aberturas'], 2)
+
+    def test_verificacao_de_saude_substitui_conexao_quebrada(self):
+        self.manager.intervalo_verificacao = 0
+        conn1 = self.manager.obter_conexao(self.db_path)
+        conn1.encerrar()
+
+        conn2 = self.manager.obter_conexao(self.db_path)
+
+        self.assertIsNot(conn1, conn2)
+        self.assertEqual(self.manager.estatisticas()['falhas_verificacao'], 1)
+
+    def test_fabrica_plugavel(self):
+        chamadas = []
+
+        def fabrica(db_path):
+            chamadas.append(db_path)
+            return sqlite3.connect(db_path, factory=ConexaoReutilizavel)
+
+        self.manager.definir_fabrica(fabrica)
+        self.manager.obter_conexao(self.db_path)
+
+        self.assertEqual(chamadas, [self.db_path])
+
+if __name__ == '__main__':
+    unittest.main()
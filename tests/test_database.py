@@ -1,11 +1,57 @@
+import os
+import sqlite3
+import tempfile
 import unittest
-from backend.database import criar_banco
+from backend.database import criar_banco, configurar_armazenamento
+from backend.connection import connection_manager, PERFIL_PADRAO
 
 class TestDatabase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'teste.db')
+
+    def tearDown(self):
+        connection_manager.definir_perfil(PERFIL_PADRAO)
+        self.tmpdir.cleanup()
+
     def test_criar_banco(self):
         # Teste básico de criação do banco
         # Nota: em produção, usar banco de teste
         pass
 
+    def test_configurar_armazenamento_converte_banco_existente(self):
+        criar_banco(self.db_path)
+
+        # Simular instalação antiga (rollback journal)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.execute("DELETE FROM configuracoes WHERE chave = 'perfil_armazenamento'")
+        conn.commit()
+        conn.close()
+
+        perfil = configurar_armazenamento(self.db_path)
+
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+        self.assertEqual(perfil, PERFIL_PADRAO)
+        conn.close()
+
+    def test_perfil_aplicado_nas_conexoes(self):
+        criar_banco(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("""
+            INSERT INTO configuracoes (chave, valor, tipo)
+            VALUES ('perfil_armazenamento', 'multi-attendant', 'string')
+        """)
+        conn.commit()
+        conn.close()
+
+        configurar_armazenamento(self.db_path)
+        conn = connection_manager.obter_conexao(self.db_path)
+
+        self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+        self.assertEqual(conn.execute("PRAGMA busy_timeout").fetchone()[0], 15000)
+        self.assertEqual(conn.execute("PRAGMA temp_store").fetchone()[0], 2)  # MEMORY
+
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+from datetime import datetime
+from backend.dates import para_iso, normalizar_hora, para_exibicao
+
+class TestDates(unittest.TestCase):
+    def test_para_iso(self):
+        self.assertEqual(para_iso('25/12/2025'), '2025-12-25')
+        self.assertEqual(para_iso('2025-12-25'), '2025-12-25')
+        self.assertEqual(para_iso('2025-12-25 00:00:00'), '2025-12-25')
+        self.assertEqual(para_iso(datetime(2025, 12, 25, 14, 30)), '2025-12-25')
+        self.assertIsNone(para_iso(''))
+
+        with self.assertRaises(ValueError):
+            para_iso('31/02/2025')
+
+    def test_normalizar_hora(self):
+        self.assertEqual(normalizar_hora('9:05'), '09:05')
+        self.assertEqual(normalizar_hora('14:30:00'), '14:30')
+
+        with self.assertRaises(ValueError):
+            normalizar_hora('25:00')
+
+    def test_para_exibicao(self):
+        self.assertEqual(para_exibicao('2025-12-25'), '25/12/2025')
+        self.assertEqual(para_exibicao(None), '')
+
+if __name__ == '__main__':
+    unittest.main()
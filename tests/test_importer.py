@@ -0,0 +1,265 @@
+import csv
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from datetime import datetime, time
+from openpyxl import Workbook
+from backend.database import criar_banco
+from backend.migrations import aplicar_migracoes
+from backend.importer import PatientImporter, ImportJob, ImportacaoError
+
+LINHAS = [
+    # nome, telefone, email, data_consulta, hora_consulta, cpf, consentimento_whatsapp
+    ('Ana Souza', '(11) 98765-4321', 'ana@gmail.com', '05/01/2026', '09:00', '529.982.247-25', 'SIM'),
+    ('Bia Lima', '11987654322', '', '2026-01-05', '9h', '', 'não'),
+    ('', '11987654323', '', '', '', '', ''),                                  # sem nome
+    ('Caio', '123', '', '', '', '', ''),                                      # telefone inválido
+    ('Davi', '11987654324', 'davi@', '06/01/2026', '10:00', '', ''),         # email inválido
+    ('Eva', '11987654325', '', '31/02/2026', '10:00', '', ''),               # data inválida
+    ('Fábio', '11987654326', '', '06/01/2026', '10:00', '52998224724', ''),  # CPF inválido
+    ('Ana Repetida', '(11) 98765-4321', '', '06/01/2026', '10:00', '', ''),  # duplicada no arquivo
+]
+
+
+class TestPatientImporter(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'teste.db')
+        criar_banco(self.db_path)
+        aplicar_migracoes(self.db_path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _csv(self, linhas, cabecalho=('nome', 'telefone', 'email', 'data_consulta', 'hora_consulta',
+                                      'cpf', 'consentimento_whatsapp')):
+        caminho = os.path.join(self.tmpdir.name, 'pacientes.csv')
+        with open(caminho, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(cabecalho)
+            writer.writerows(linhas)
+        return caminho
+
+    def _pacientes(self):
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute("""
+            SELECT nome, telefone_formatado, data_consulta, hora_consulta,
+                   consentimento_whatsapp, forma_consentimento, termos_versao
+            FROM pacientes ORDER BY id
+        """).fetchall()
+        conn.close()
+        return rows
+
+    def test_importa_csv_em_lotes(self):
+        resultados = []
+        importer = PatientImporter(self.db_path, 1, tamanho_lote=3)
+        resultado = importer.importar(self._csv(LINHAS), resultados.append)
+
+        self.assertEqual(resultado, {'total': 8, 'importados': 2, 'atualizados': 0, 'duplicados': 1,
+                                     'erros': 5, 'cancelado': False, 'retomado_de': None})
+        # Um aviso de progresso por lote
+        self.assertEqual([r['total'] for r in resultados], [3, 6, 8])
+
+        self.assertEqual(self._pacientes(), [
+            ('Ana Souza', '+5511987654321', '2026-01-05', '09:00', 1, 'escrito', '1.0'),
+            ('Bia Lima', '+5511987654322', '2026-01-05', '09:00', 0, None, None),
+        ])
+
+        conn = sqlite3.connect(self.db_path)
+        auditoria = conn.execute("SELECT acao, registro_id FROM log_auditoria").fetchall()
+        conn.close()
+        self.assertEqual(auditoria, [('consentimento_lgpd', 1)])
+
+    def test_motivos_de_rejeicao(self):
+        importer = PatientImporter(self.db_path, 1)
+        lote = next(importer.ler_lotes(self._csv(LINHAS)))
+        _, rejeitados = importer.validar_lote(lote)
+
+        self.assertEqual(rejeitados, [
+            (4, 'Nome não informado'),
+            (5, 'Número de telefone inválido'),
+            (6, 'Email inválido'),
+            (7, 'Data inválida: 31/02/2026'),
+            (8, 'CPF inválido'),
+        ])
+
+        # Data e hora da consulta são NOT NULL no banco
+        lote = next(importer.ler_lotes(self._csv([
+            ('Gil', '11987654327', '', '', '10:00', '', ''),
+            ('Hugo', '11987654328', '', '06/01/2026', '', '', ''),
+        ])))
+        self.assertEqual(importer.validar_lote(lote)[1], [
+            (2, 'Data da consulta não informada'),
+            (3, 'Hora da consulta não informada'),
+        ])
+
+    def test_duplicatas_no_banco(self):
+        PatientImporter(self.db_path, 1).importar(self._csv(LINHAS[:2]))
+        resultado = PatientImporter(self.db_path, 1).importar(self._csv(LINHAS[:2]))
+        self.assertEqual((resultado['importados'], resultado['duplicados']), (0, 2))
+
+        resultado = PatientImporter(self.db_path, 1, pular_duplicados=False).importar(self._csv(LINHAS[:2]))
+        self.assertEqual(resultado['importados'], 2)
+
+    def test_duplicatas_pelo_telefone_normalizado(self):
+        PatientImporter(self.db_path, 1).importar(self._csv(LINHAS[:1]))
+        resultado = PatientImporter(self.db_path, 1).importar(
+            self._csv([('Ana', '+55 11 98765 4321', '', '06/01/2026', '10:00', '', '')]))
+        self.assertEqual((resultado['importados'], resultado['duplicados']), (0, 1))
+
+    def test_atualiza_consulta_existente(self):
+        PatientImporter(self.db_path, 1).importar(self._csv(LINHAS[:2]))
+
+        agenda = [
+            ('Ana Souza', '11 98765-4321', '', '05/01/2026', '10:30', '', ''),   # horário mudou
+            ('Bia Lima', '11987654322', '', '05/01/2026', '09:00', '', ''),      # sem mudança
+            ('Ana Souza', '11987654321', '', '12/01/2026', '09:00', '', ''),     # nova consulta
+        ]
+        importer = PatientImporter(self.db_path, 1, atualizar_existentes=True)
+        resultado = importer.importar(self._csv(agenda))
+        self.assertEqual((resultado['importados'], resultado['atualizados'], resultado['duplicados']), (1, 1, 0))
+
+        pacientes = self._pacientes()
+        self.assertEqual([p[2:4] for p in pacientes],
+                         [('2026-01-05', '10:30'), ('2026-01-05', '09:00'), ('2026-01-12', '09:00')])
+        # Consentimento da primeira importação continua
+        self.assertEqual(pacientes[0][4:], (1, 'escrito', '1.0'))
+
+        # Reimportar a mesma agenda não altera nada
+        resultado = PatientImporter(self.db_path, 1, atualizar_existentes=True).importar(self._csv(agenda))
+        self.assertEqual((resultado['importados'], resultado['atualizados']), (0, 0))
+
+    def test_csv_do_excel_com_ponto_e_virgula(self):
+        caminho = os.path.join(self.tmpdir.name, 'agenda.csv')
+        with open(caminho, 'w', newline='', encoding='cp1252') as f:
+            f.write('nome;telefone;data_consulta;hora_consulta;cpf\r\n')
+            f.write('João Conceição;011987654321;05/01/2026;14:30;529.982.247-25\r\n')
+            f.write(';;;;\r\n')
+
+        resultado = PatientImporter(self.db_path, 1).importar(caminho)
+
+        self.assertEqual((resultado['total'], resultado['importados']), (1, 1))
+        self.assertEqual(self._pacientes()[0][:4], ('João Conceição', '+5511987654321', '2026-01-05', '14:30'))
+
+    def test_importa_xlsx_read_only(self):
+        caminho = os.path.join(self.tmpdir.name, 'pacientes.xlsx')
+        livro = Workbook()
+        planilha = livro.active
+        planilha.append(['nome', 'telefone', 'data_consulta', 'hora_consulta', 'cpf'])
+        planilha.append(['Ana', 11987654321, datetime(2026, 1, 5), time(14, 30), 52998224725])
+        planilha.append([None, None, None, None, None])
+        livro.save(caminho)
+
+        resultado = PatientImporter(self.db_path, 1).importar(caminho)
+
+        self.assertEqual(resultado['importados'], 1)
+        self.assertEqual(self._pacientes()[0][:4], ('Ana', '+5511987654321', '2026-01-05', '14:30'))
+
+    def test_validacao_em_processos_mantem_ordem(self):
+        sequencial = PatientImporter(self.db_path, 1, tamanho_lote=2, pular_duplicados=False)
+        lotes = list(sequencial.ler_lotes(self._csv(LINHAS)))
+        esperado = [sequencial.validar_lote(lote) for lote in lotes]
+
+        paralelo = PatientImporter(self.db_path, 1, tamanho_lote=2, processos=2)
+        executor = paralelo._criar_executor()
+        try:
+            obtido = [(v, r) for _, v, r in paralelo._lotes_validados(iter(lotes), executor)]
+        finally:
+            executor.shutdown()
+
+        self.assertEqual(obtido, esperado)
+
+    def test_cancelamento_mantem_lotes_gravados(self):
+        cancelar = threading.Event()
+        importer = PatientImporter(self.db_path, 1, tamanho_lote=1)
+        resultado = importer.importar(self._csv(LINHAS), lambda parcial: cancelar.set(), cancelar)
+
+        self.assertTrue(resultado['cancelado'])
+        self.assertEqual(resultado['total'], 1)
+        self.assertEqual([p[0] for p in self._pacientes()], ['Ana Souza'])
+
+    def test_retoma_do_checkpoint(self):
+        arquivo = self._csv(LINHAS)
+        importer = PatientImporter(self.db_path, 1, tamanho_lote=3, pular_duplicados=False)
+
+        # Falha ao gravar o segundo lote
+        gravar_lote = importer.gravar_lote
+        chamadas = []
+
+        def gravar_com_falha(*args):
+            chamadas.append(1)
+            if len(chamadas) == 2:
+                raise sqlite3.OperationalError('disk I/O error')
+            return gravar_lote(*args)
+
+        importer.gravar_lote = gravar_com_falha
+        with self.assertRaises(sqlite3.OperationalError):
+            importer.importar(arquivo)
+        self.assertEqual(len(self._pacientes()), 2)
+
+        # Mesmo arquivo de novo: continua da linha 5, sem repetir Ana e Bia
+        resultado = PatientImporter(self.db_path, 1, tamanho_lote=3, pular_duplicados=False).importar(arquivo)
+        self.assertEqual(resultado['retomado_de'], 5)
+        self.assertEqual((resultado['total'], resultado['importados'], resultado['erros']), (8, 3, 5))
+        self.assertEqual([p[0] for p in self._pacientes()], ['Ana Souza', 'Bia Lima', 'Ana Repetida'])
+
+        conn = sqlite3.connect(self.db_path)
+        diario = conn.execute("SELECT status, ultima_linha FROM importacoes").fetchall()
+        conn.close()
+        self.assertEqual(diario, [('concluida', 9)])
+
+        # Concluída: uma nova importação do arquivo começa do início
+        resultado = PatientImporter(self.db_path, 1).importar(arquivo)
+        self.assertIsNone(resultado['retomado_de'])
+
+    def test_registro_de_alteracoes_com_uma_marca_por_lote(self):
+        PatientImporter(self.db_path, 1, tamanho_lote=3).importar(self._csv(LINHAS))
+
+        conn = sqlite3.connect(self.db_path)
+        registro = conn.execute("SELECT paciente_id, operacao FROM pacientes_alteracoes").fetchall()
+        pausa = conn.execute("SELECT COUNT(*) FROM pacientes_alteracoes_pausa").fetchone()[0]
+        conn.close()
+
+        # Só o primeiro lote grava pacientes (Ana e Bia)
+        self.assertEqual(registro, [(None, 'R')])
+        self.assertEqual(pausa, 0)
+
+    def test_job_em_segundo_plano_com_relatorio(self):
+        job = ImportJob(PatientImporter(self.db_path, 1, tamanho_lote=3), self._csv(LINHAS))
+        job.iniciar()
+        job.aguardar(10)
+
+        eventos = job.eventos_pendentes()
+        self.assertEqual([e['tipo'] for e in eventos], ['progresso'] * 3 + ['concluido'])
+        self.assertEqual(eventos[-1]['resultado']['importados'], 2)
+
+        destino = os.path.join(self.tmpdir.name, 'rejeitados.csv')
+        job.salvar_relatorio(destino)
+        job.descartar_relatorio()
+        with open(destino, newline='', encoding='utf-8-sig') as f:
+            linhas = list(csv.DictReader(f))
+
+        self.assertEqual([(l['linha'], l['motivo']) for l in linhas][:2],
+                         [('4', 'Nome não informado'), ('5', 'Número de telefone inválido')])
+        self.assertEqual(linhas[1]['nome'], 'Caio')
+        self.assertEqual(len(linhas), 5)
+
+    def test_job_erro_de_arquivo(self):
+        job = ImportJob(PatientImporter(self.db_path, 1), self._csv([('Ana',)], cabecalho=('nome',)))
+        job.iniciar()
+        job.aguardar(10)
+
+        self.assertEqual(job.eventos_pendentes(),
+                         [{'tipo': 'erro', 'mensagem': 'Colunas obrigatórias faltando: '
+                                                       'telefone, data_consulta, hora_consulta'}])
+        self.assertIsNone(job.relatorio)
+
+    def test_colunas_obrigatorias(self):
+        with self.assertRaises(ImportacaoError):
+            PatientImporter(self.db_path, 1).importar(self._csv([('Ana',)], cabecalho=('nome',)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from backend.connection import connection_manager
+from backend.database import criar_banco
+from backend.migrations import aplicar_migracoes
+from backend.limits import rate_limiter
+from backend.ledger import SendLedger
+
+class TestSendLedger(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'teste.db')
+        criar_banco(self.db_path)
+        aplicar_migracoes(self.db_path)
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("""
+            INSERT INTO pacientes (nome, telefone, data_consulta, hora_consulta, status,
+                                   fase_conversa, data_preparo, mensagem_preparada)
+            VALUES ('Ana', '11911111111', '2026-01-05', '09:00', 'mensagem_preparada',
+                    'primeiro_contato', '2026-01-04T10:00:00', 'Oi Ana')
+        """)
+        conn.commit()
+        conn.close()
+
+        rate_limiter.carregar(self.db_path)
+        self.ledger = SendLedger(self.db_path)
+
+    def tearDown(self):
+        rate_limiter.limpar()
+        connection_manager.invalidar(self.db_path)
+        self.tmpdir.cleanup()
+
+    def _contar(self):
+        conn = sqlite3.connect(self.db_path)
+        historico = conn.execute("SELECT COUNT(*), MAX(tipo_mensagem) FROM historico_mensagens").fetchone()
+        controle = conn.execute("SELECT total_enviado, tipo_mensagem FROM controle_envio").fetchone()
+        paciente = conn.execute("SELECT status, tentativas_contato FROM pacientes").fetchone()
+        conn.close()
+        return historico, controle, paciente
+
+    def test_registra_tudo_numa_transacao(self):
+        result = self.ledger.registrar_envio(1, 'Oi Ana', 1)
+        self.assertTrue(result['success'])
+        self.assertFalse(result['duplicado'])
+
+        historico, controle, paciente = self._contar()
+        # Tipo da mensagem preparada, não o derivado do novo status
+        self.assertEqual(historico, (1, 'primeiro_contato'))
+        self.assertEqual(controle, (1, 'primeiro_contato'))
+        self.assertEqual(paciente, ('mensagem_enviada', 1))
+
+        self.assertEqual(rate_limiter.situacao(self.db_path)['por_tipo'], {'primeiro_contato': 1})
+
+    def test_envio_repetido_nao_conta_duas_vezes(self):
+        tentativa = SendLedger.nova_tentativa()
+        self.ledger.registrar_envio(1, 'Oi Ana', 1, tentativa)
+        result = self.ledger.registrar_envio(1, 'Oi Ana', 1, tentativa)
+
+        self.assertTrue(result['duplicado'])
+        historico, controle, paciente = self._contar()
+        self.assertEqual(historico[0], 1)
+        self.assertEqual(controle[0], 1)
+        self.assertEqual(paciente[1], 1)
+        self.assertEqual(rate_limiter.situacao(self.db_path)['por_tipo'], {'primeiro_contato': 1})
+
+    def test_novo_envio_da_mesma_mensagem_conta(self):
+        # Reenvio posterior sem preparar de novo: outra tentativa, outro registro
+        self.ledger.registrar_envio(1, 'Oi Ana', 1, SendLedger.nova_tentativa())
+        result = self.ledger.registrar_envio(1, 'Oi Ana', 1, SendLedger.nova_tentativa())
+
+        self.assertFalse(result['duplicado'])
+        historico, controle, paciente = self._contar()
+        self.assertEqual(historico[0], 2)
+        self.assertEqual(controle[0], 2)
+        self.assertEqual(paciente[1], 2)
+
+    def test_transacao_pendente_na_conexao(self):
+        conn = connection_manager.obter_conexao(self.db_path)
+        conn.execute("UPDATE pacientes SET observacoes = 'pendente' WHERE id = 1")
+
+        result = self.ledger.registrar_envio(1, 'Oi Ana', 1)
+
+        # Nada gravado, e a gravação pendente continua nas mãos de quem a abriu
+        self.assertFalse(result['success'])
+        self.assertTrue(conn.in_transaction)
+        conn.rollback()
+        self.assertEqual(self._contar()[0][0], 0)
+
+    def test_envios_simultaneos(self):
+        resultados = []
+        tentativa = SendLedger.nova_tentativa()
+
+        def enviar():
+            resultados.append(SendLedger(self.db_path).registrar_envio(1, 'Oi Ana', 1, tentativa))
+
+        threads = [threading.Thread(target=enviar) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(sum(not r['duplicado'] for r in resultados if r['success']), 1)
+        historico, controle, _ = self._contar()
+        self.assertEqual(historico[0], 1)
+        self.assertEqual(controle[0], 1)
+
+    def test_paciente_inexistente(self):
+        result = self.ledger.registrar_envio(99, 'Oi', 1)
+        self.assertFalse(result['success'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,106 @@
+import os
+import sqlite3
+import tempfile
 import unittest
-from backend.limits import LimitsController
+from datetime import datetime
+from backend.connection import connection_manager
+from backend.database import criar_banco
+from backend.limits import LimitsController, rate_limiter, MICROSSEGUNDOS
 
 class TestLimits(unittest.TestCase):
     def setUp(self):
-        self.limits = LimitsController(':memory:')
-    
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'teste.db')
+        criar_banco(self.db_path)
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE limites_sistema SET valor_limite = 2 WHERE tipo_limite = 'max_primeiros_contatos_dia'")
+        conn.execute("UPDATE limites_sistema SET valor_limite = 60 WHERE tipo_limite = 'intervalo_minimo_segundos'")
+        conn.commit()
+        conn.close()
+
+        rate_limiter.carregar(self.db_path)
+        self.limits = LimitsController(self.db_path)
+        self.agora = int(datetime.now().replace(hour=12, minute=0, second=0, microsecond=0).timestamp() * MICROSSEGUNDOS)
+
+    def tearDown(self):
+        rate_limiter.limpar()
+        connection_manager.invalidar(self.db_path)
+        self.tmpdir.cleanup()
+
+    def _registrar(self, telefone, segundos=0, tipo='primeiro_contato'):
+        rate_limiter.registrar(self.db_path, telefone, tipo, 1, agora_us=self.agora + segundos * MICROSSEGUNDOS)
+
     def test_verificar_limite_diario(self):
-        # Teste de limites diários
-        pass
+        self._registrar('11911111111')
+        self.assertTrue(rate_limiter.verificar_diario(self.db_path, agora_us=self.agora).permitido)
+
+        self._registrar('11922222222')
+        decisao = rate_limiter.verificar_diario(self.db_path, agora_us=self.agora)
+        self.assertFalse(decisao.permitido)
+        # Só libera na virada do dia (12h até a meia-noite)
+        self.assertEqual(decisao.retry_after_us, 12 * 3600 * MICROSSEGUNDOS)
+
+        # Outros tipos não entram no teto de primeiros contatos
+        self.assertTrue(rate_limiter.verificar_diario(self.db_path, 'lembrete', agora_us=self.agora).permitido)
+
+    def test_intervalo_lido_de_limites_sistema(self):
+        self._registrar('11911111111')
+
+        decisao = rate_limiter.verificar_numero(self.db_path, '11911111111', agora_us=self.agora + 45 * MICROSSEGUNDOS)
+        self.assertFalse(decisao.permitido)
+        self.assertEqual(decisao.retry_after_us, 15 * MICROSSEGUNDOS)
+
+        decisao = rate_limiter.verificar_numero(self.db_path, '11911111111', agora_us=self.agora + 60 * MICROSSEGUNDOS)
+        self.assertTrue(decisao.permitido)
+
+    def test_limite_inativo_usa_padrao(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE limites_sistema SET ativo = 0 WHERE tipo_limite = 'intervalo_minimo_segundos'")
+        conn.commit()
+        conn.close()
+        rate_limiter.recarregar_limites(self.db_path)
+
+        self._registrar('11911111111')
+
+        # 120 s de LIMITES_PADRAO em vez dos 60 s desativados
+        decisao = rate_limiter.verificar_numero(self.db_path, '11911111111', agora_us=self.agora + 60 * MICROSSEGUNDOS)
+        self.assertFalse(decisao.permitido)
+        self.assertEqual(decisao.retry_after_us, 60 * MICROSSEGUNDOS)
+
+    def test_max_tentativas_por_numero(self):
+        for i in range(3):
+            self._registrar('11911111111', segundos=i * 60, tipo='lembrete')
+
+        decisao = rate_limiter.verificar(self.db_path, '11911111111', 'lembrete',
+                                         agora_us=self.agora + 3600 * MICROSSEGUNDOS)
+        self.assertFalse(decisao.permitido)
+        self.assertIn('3 vezes', decisao.motivo)
+
+    def test_grava_e_recarrega_do_banco(self):
+        self._registrar('11911111111')
+        self._registrar('11911111111', segundos=120)
+        rate_limiter.descarregar(self.db_path)
+
+        conn = sqlite3.connect(self.db_path)
+        total = conn.execute(
+            "SELECT total_enviado FROM controle_envio WHERE numero_telefone = '11911111111'"
+        ).fetchone()[0]
+        conn.close()
+        self.assertEqual(total, 2)
+
+        # Nova sessão: contadores e último envio vêm do banco
+        rate_limiter.carregar(self.db_path)
+        decisao = rate_limiter.verificar_numero(self.db_path, '11911111111', agora_us=self.agora + 150 * MICROSSEGUNDOS)
+        self.assertFalse(decisao.permitido)
+        self.assertEqual(decisao.retry_after_us, 30 * MICROSSEGUNDOS)
+
+    def test_virada_do_dia_zera_janelas(self):
+        self._registrar('11911111111')
+        self._registrar('11922222222')
+
+        amanha = self.agora + 24 * 3600 * MICROSSEGUNDOS
+        self.assertTrue(rate_limiter.verificar(self.db_path, '11911111111', 'primeiro_contato', agora_us=amanha).permitido)
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
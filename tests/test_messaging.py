@@ -1,5 +1,11 @@
+import os
+import sqlite3
+import tempfile
 import unittest
-from backend.messaging import MessageManager
+from backend.connection import connection_manager
+from backend.database import criar_banco
+from backend.migrations import aplicar_migracoes
+from backend.messaging import MessageManager, RepetitionMemory, TemplateCache, repetition_memory, template_cache
 
 class TestMessaging(unittest.TestCase):
     def setUp(self):
@@ -9,5 +15,205 @@ class TestMessaging(unittest.TestCase):
         # Teste básico de geração de mensagem
         pass
 
+    def test_personalizar_mensagem(self):
+        dados = {
+            'nome': 'Ana Maria', 'data_consulta': '2026-01-05', 'hora_consulta': '09:30:00',
+            'tipo_consulta': 'Retorno'
+        }
+
+        texto = self.msg_manager._personalizar_mensagem(
+            ' Oi {nome}! {tipo} na {dia_semana}, {data} às {hora} com {profissional} ', dados
+        )
+
+        # Variável sem valor permanece como está
+        self.assertEqual(texto, 'Oi Ana! Retorno na Segunda, 05/01/2026 às 09:30 com {profissional}')
+
+    def test_personalizar_sem_data(self):
+        self.assertEqual(
+            self.msg_manager._personalizar_mensagem('{data} {dia_semana} {hora}', {}),
+            'hoje hoje agora'
+        )
+        self.assertEqual(
+            self.msg_manager._personalizar_mensagem('{data} {dia_semana}', {'data_consulta': 'amanhã'}),
+            'amanhã o dia'
+        )
+
+    def test_chaves_literais_preservadas(self):
+        self.assertEqual(
+            self.msg_manager._personalizar_mensagem('{{nome}} {outro} }{', {'nome': 'Ana'}),
+            '{Ana} {outro} }{'
+        )
+
+class TestTemplateCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'teste.db')
+        criar_banco(self.db_path)
+        aplicar_migracoes(self.db_path)
+
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("DELETE FROM mensagens")
+        self.conn.execute("INSERT INTO mensagens (tipo, texto) VALUES ('lembrete', 'Oi {nome}')")
+        self.conn.commit()
+
+        self.cache = TemplateCache()
+
+    def tearDown(self):
+        self.conn.close()
+        connection_manager.invalidar(self.db_path)
+        self.tmpdir.cleanup()
+
+    def _editar_em_outra_estacao(self):
+        self.conn.execute("UPDATE mensagens SET texto = 'Olá {nome}'")
+        self.conn.commit()
+
+    def test_mantem_templates_em_memoria(self):
+        self.assertEqual([t for _, t in self.cache.obter(self.db_path, 'lembrete')], ['Oi {nome}'])
+
+        self._editar_em_outra_estacao()
+
+        # Dentro do intervalo de verificação o banco nem é consultado
+        self.assertEqual([t for _, t in self.cache.obter(self.db_path, 'lembrete')], ['Oi {nome}'])
+        self.assertEqual(self.cache.obter(self.db_path, 'confirmacao'), [])
+
+    def test_versao_alterada_recarrega(self):
+        self.cache.INTERVALO_VERIFICACAO = 0
+        self.cache.obter(self.db_path, 'lembrete')
+
+        self._editar_em_outra_estacao()
+
+        self.assertEqual([t for _, t in self.cache.obter(self.db_path, 'lembrete')], ['Olá {nome}'])
+
+    def test_invalidar_recarrega(self):
+        self.cache.obter(self.db_path, 'lembrete')
+        self._editar_em_outra_estacao()
+
+        self.cache.invalidar(self.db_path)
+
+        self.assertEqual([t for _, t in self.cache.obter(self.db_path, 'lembrete')], ['Olá {nome}'])
+
+class TestRepetitionMemory(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'teste.db')
+        criar_banco(self.db_path)
+        aplicar_migracoes(self.db_path)
+
+        self.templates = [(i, f'Texto {i}') for i in range(1, 6)]
+        self.memoria = RepetitionMemory(capacidade=2)
+
+    def tearDown(self):
+        connection_manager.invalidar(self.db_path)
+        self.tmpdir.cleanup()
+
+    def test_nao_repete_ate_esgotar(self):
+        ids = [self.memoria.escolher(self.db_path, 1, 'lembrete', self.templates)[0] for _ in range(5)]
+        self.assertEqual(sorted(ids), [1, 2, 3, 4, 5])
+
+        # Nova rodada não começa pelo último enviado
+        self.assertNotEqual(self.memoria.escolher(self.db_path, 1, 'lembrete', self.templates)[0], ids[-1])
+
+    def test_memoria_limitada(self):
+        for paciente_id in range(1, 10):
+            self.memoria.escolher(self.db_path, paciente_id, 'lembrete', self.templates)
+
+        self.assertEqual(len(self.memoria), 2)
+
+    def test_escolha_sem_registro(self):
+        primeiro = self.memoria.escolher(self.db_path, 1, 'lembrete', self.templates, registrar=False)
+        self.assertEqual(self.memoria.escolher(self.db_path, 1, 'lembrete', self.templates, registrar=False), primeiro)
+
+        self.memoria.registrar(self.db_path, 1, 'lembrete', primeiro[0])
+
+        ids = [self.memoria.escolher(self.db_path, 1, 'lembrete', self.templates)[0] for _ in range(4)]
+        self.assertEqual(sorted(ids + [primeiro[0]]), [1, 2, 3, 4, 5])
+
+    def test_reconstroi_do_historico(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany("""
+            INSERT INTO historico_mensagens (paciente_id, mensagem_id, mensagem_texto, tipo_mensagem)
+            VALUES (?, ?, 'texto', 'lembrete')
+        """, [(1, 1), (1, 2), (1, 3), (2, 1), (3, 4)])
+        conn.commit()
+        conn.close()
+
+        # Pacientes 2 e 3 são os mais recentes; 1 é relido sob demanda
+        self.assertEqual(self.memoria.carregar(self.db_path), 2)
+
+        ids = {self.memoria.escolher(self.db_path, 1, 'lembrete', self.templates)[0] for _ in range(2)}
+        self.assertEqual(ids, {4, 5})
+
+class TestPreparoEmLote(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'teste.db')
+        criar_banco(self.db_path)
+        aplicar_migracoes(self.db_path)
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO mensagens (tipo, texto) VALUES ('primeiro_contato', 'Oi {nome}, {data} às {hora}')")
+        conn.executemany("""
+            INSERT INTO pacientes (nome, telefone, data_consulta, hora_consulta, status, consentimento_whatsapp)
+            VALUES (?, '11999999999', ?, '09:00', ?, ?)
+        """, [(f'Paciente{i}', '2026-01-05', 'pendente', 1) for i in range(200)] + [
+            ('Sem Consentimento', '2026-01-05', 'pendente', 0),
+            ('Outro Dia', '2026-01-06', 'pendente', 1),
+            ('Confirmado', '2026-01-05', 'confirmado', 1),
+        ])
+        conn.commit()
+        conn.close()
+
+        self.msg_manager = MessageManager(self.db_path)
+
+    def tearDown(self):
+        template_cache.invalidar(self.db_path)
+        repetition_memory.limpar()
+        connection_manager.invalidar(self.db_path)
+        self.tmpdir.cleanup()
+
+    def _usados(self, paciente_id):
+        entrada = repetition_memory._pacientes.get(repetition_memory._chave(self.db_path, paciente_id))
+        return entrada['usados'] if entrada else set()
+
+    def test_prepara_pendentes_do_dia(self):
+        result = self.msg_manager.preparar_mensagens_lote('05/01/2026')
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['preparados'], 200)
+        self.assertEqual(result['sem_consentimento'], 1)
+
+        conn = sqlite3.connect(self.db_path)
+        preparados = conn.execute("""
+            SELECT nome, mensagem_preparada FROM pacientes WHERE status = 'mensagem_preparada'
+        """).fetchall()
+        conn.close()
+
+        self.assertEqual(len(preparados), 200)
+        nome, mensagem = preparados[0]
+        self.assertEqual(mensagem, f'Oi {nome}, 05/01/2026 às 09:00')
+
+    def test_ignora_preparados_por_outra_estacao(self):
+        gerar = self.msg_manager._gerar
+
+        def gerar_com_concorrencia(tipo, dados, registrar=True):
+            # Outra estação prepara o paciente 1 enquanto o lote é montado
+            if dados['id'] == 1:
+                conn = sqlite3.connect(self.db_path)
+                conn.execute("UPDATE pacientes SET status = 'mensagem_preparada' WHERE id = 1")
+                conn.commit()
+                conn.close()
+            return gerar(tipo, dados, registrar)
+
+        self.msg_manager._gerar = gerar_com_concorrencia
+        result = self.msg_manager.preparar_mensagens_lote('05/01/2026')
+
+        self.assertEqual(result['preparados'], 199)
+        self.assertNotIn(1, result['mensagens'])
+        self.assertEqual(self._usados(1), set())
+        self.assertEqual(len(self._usados(2)), 1)
+
+    def test_data_invalida(self):
+        self.assertFalse(self.msg_manager.preparar_mensagens_lote('31/02/2026')['success'])
+
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from backend.database import criar_banco
+from backend import migrations
+from backend.migrations import aplicar_migracoes, versao_atual, MIGRACOES
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'teste.db')
+        criar_banco(self.db_path)
+        self.registradas = list(MIGRACOES)
+
+    def tearDown(self):
+        MIGRACOES[:] = self.registradas
+        self.tmpdir.cleanup()
+
+    def test_aplica_todas_e_registra_duracao(self):
+        aplicadas = aplicar_migracoes(self.db_path)
+
+        self.assertEqual([m['versao'] for m in aplicadas], [v for v, _, _ in MIGRACOES])
+        self.assertEqual(versao_atual(self.db_path), MIGRACOES[-1][0])
+
+        conn = sqlite3.connect(self.db_path)
+        duracoes = conn.execute("SELECT duracao_ms FROM schema_migracoes").fetchall()
+        conn.close()
+        self.assertTrue(all(d[0] is not None for d in duracoes))
+
+    def test_reexecucao_nao_aplica_novamente(self):
+        aplicar_migracoes(self.db_path)
+        self.assertEqual(aplicar_migracoes(self.db_path), [])
+
+    def test_converte_datas_para_iso(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("""
+            INSERT INTO pacientes (nome, telefone, data_consulta, hora_consulta, data_nascimento)
+            VALUES ('Ana', '11999999999', '05/01/2026', '9:30', '18/03/1983')
+        """)
+        conn.commit()
+        conn.close()
+
+        aplicar_migracoes(self.db_path)
+
+        conn = sqlite3.connect(self.db_path)
+        row = conn.execute(
+            "SELECT data_consulta, hora_consulta, data_nascimento FROM pacientes"
+        ).fetchone()
+        conn.close()
+
+        self.assertEqual(row, ('2026-01-05', '09:30', '1983-03-18'))
+
+    def test_relatorio_com_data_repetida_mantem_o_mais_recente(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany("""
+            INSERT INTO relatorios_diarios (data, total_pacientes, gerado_em)
+            VALUES (?, ?, ?)
+        """, [
+            ('2026-01-05', 10, '2026-01-05 18:00:00'),
+            ('05/01/2026', 12, '2026-01-05 20:00:00'),
+            ('06/01/2026', 7, '2026-01-06 08:00:00'),
+            ('2026-01-06', 9, '2026-01-06 19:00:00'),
+        ])
+        conn.commit()
+        conn.close()
+
+        with self.assertLogs('Migracoes', level='WARNING') as logs:
+            aplicar_migracoes(self.db_path)
+
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute(
+            "SELECT data, total_pacientes FROM relatorios_diarios ORDER BY data"
+        ).fetchall()
+        conn.close()
+
+        self.assertEqual(rows, [('2026-01-05', 12), ('2026-01-06', 9)])
+        self.assertEqual(sum('descartado' in linha for linha in logs.output), 2)
+
+    def test_falha_desfaz_migracao_inteira(self):
+        aplicar_migracoes(self.db_path)
+        versao = versao_atual(self.db_path)
+
+        @migrations.migracao(versao + 1, 'falha_teste')
+        def _falha(conn):
+            conn.execute("CREATE TABLE tabela_teste (id INTEGER)")
+            raise RuntimeError('erro proposital')
+
+        with self.assertRaises(RuntimeError):
+            aplicar_migracoes(self.db_path)
+
+        conn = sqlite3.connect(self.db_path)
+        tabela = conn.execute(
+            "SELECT name FROM sqlite_master WHERE name = 'tabela_teste'"
+        ).fetchone()
+        conn.close()
+
+        self.assertIsNone(tabela)
+        self.assertEqual(versao_atual(self.db_path), versao)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from backend.connection import connection_manager
+from backend.database import criar_banco
+from backend.migrations import aplicar_migracoes
+from backend.models import Patient
+
+class TestPatientPagination(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'teste.db')
+        criar_banco(self.db_path)
+        aplicar_migracoes(self.db_path)
+
+        # Vários pacientes no mesmo horário: o id desempata a chave
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany("""
+            INSERT INTO pacientes (nome, telefone, data_consulta, hora_consulta, status)
+            VALUES (?, '11999999999', ?, ?, ?)
+        """, [
+            (f'Paciente {i}', f'2026-01-{1 + i // 6:02d}', '09:00' if i % 2 else '08:00',
+             'confirmado' if i % 3 == 0 else 'pendente')
+            for i in range(25)
+        ])
+        conn.commit()
+        conn.close()
+
+        self.model = Patient(self.db_path)
+
+    def tearDown(self):
+        connection_manager.invalidar(self.db_path)
+        self.tmpdir.cleanup()
+
+    def _percorrer(self, **filtros):
+        ids, cursor = [], None
+        while True:
+            pagina = self.model.get_all(limit=4, cursor=cursor, **filtros)
+            ids.extend(p['id'] for p in pagina)
+            if len(pagina) < 4:
+                return ids
+            cursor = Patient.chave_paginacao(pagina[-1])
+
+    def _ordem_esperada(self, where='', params=(), decrescente=False):
+        ordem = 'DESC' if decrescente else 'ASC'
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute(f"""
+            SELECT id FROM pacientes {where}
+            ORDER BY data_consulta {ordem}, hora_consulta {ordem}, id {ordem}
+        """, params).fetchall()
+        conn.close()
+        return [r[0] for r in rows]
+
+    def test_paginas_cobrem_tudo_sem_repeticao(self):
+        self.assertEqual(self._percorrer(), self._ordem_esperada(decrescente=True))
+        self.assertEqual(
+            self._percorrer(decrescente=False, data_inicio='2026-01-03'),
+            self._ordem_esperada("WHERE data_consulta >= ?", ('2026-01-03',))
+        )
+        self.assertEqual(
+            self._percorrer(status='confirmado'),
+            self._ordem_esperada("WHERE status = ?", ('confirmado',), decrescente=True)
+        )
+
+    def test_pagina_anterior(self):
+        primeira = self.model.get_all(limit=4, decrescente=False)
+        segunda = self.model.get_all(limit=4, decrescente=False,
+                                     cursor=Patient.chave_paginacao(primeira[-1]))
+
+        anterior = self.model.get_all(limit=4, decrescente=False, anteriores=True,
+                                      cursor=Patient.chave_paginacao(segunda[0]))
+
+        self.assertEqual([p['id'] for p in anterior], [p['id'] for p in primeira])
+
+    def test_pagina_anterior_respeita_data_inicio(self):
+        pagina = self.model.get_all(limit=4, decrescente=False, data_inicio='2026-01-03')
+
+        anterior = self.model.get_all(limit=4, decrescente=False, anteriores=True,
+                                      data_inicio='2026-01-03',
+                                      cursor=Patient.chave_paginacao(pagina[0]))
+
+        self.assertEqual(anterior, [])
+
+if __name__ == '__main__':
+    unittest.main()
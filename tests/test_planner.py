@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from backend.connection import connection_manager
+from backend.database import criar_banco
+from backend.migrations import aplicar_migracoes
+from backend.limits import rate_limiter, MICROSSEGUNDOS
+from backend.planner import SendPlanner
+
+class TestSendPlanner(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'teste.db')
+        criar_banco(self.db_path)
+        aplicar_migracoes(self.db_path)
+
+        self.hoje = date.today().isoformat()
+        self.amanha = (date.today() + timedelta(days=1)).isoformat()
+        self.agora = datetime.combine(date.today(), datetime.min.time()).replace(hour=9)
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE limites_sistema SET valor_limite = 3 WHERE tipo_limite = 'max_primeiros_contatos_dia'")
+        conn.execute("UPDATE limites_sistema SET valor_limite = 600 WHERE tipo_limite = 'intervalo_minimo_segundos'")
+        conn.execute("UPDATE limites_sistema SET valor_limite = 10 WHERE tipo_limite = 'horario_fim'")
+        conn.executemany("""
+            INSERT INTO pacientes (nome, telefone, data_consulta, hora_consulta, status, fase_conversa)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [
+            ('Ana', '11911111111', self.amanha, '10:00', 'pendente', 'primeiro_contato'),
+            ('Bia', '11922222222', self.hoje, '15:00', 'pendente', 'primeiro_contato'),
+            ('Caio', '11933333333', self.hoje, '08:00', 'pendente', 'primeiro_contato'),
+            ('Davi', '11922222222', self.hoje, '16:00', 'mensagem_preparada', 'lembrete'),
+            ('Eva', '11944444444', self.hoje, '11:00', 'confirmado', 'primeiro_contato'),
+        ])
+        conn.commit()
+        conn.close()
+
+        rate_limiter.carregar(self.db_path)
+        self.planner = SendPlanner(self.db_path)
+        self.planner.carregar()
+
+    def tearDown(self):
+        rate_limiter.limpar()
+        connection_manager.invalidar(self.db_path)
+        self.tmpdir.cleanup()
+
+    def test_prioriza_consulta_mais_proxima(self):
+        plano = self.planner.plano(self.agora)
+
+        # Caio já passou; Davi divide o número com Bia e espera o intervalo
+        self.assertEqual([e['nome'] for e in plano['envios']], ['Bia', 'Ana', 'Davi'])
+        self.assertEqual([e['horario'].strftime('%H:%M') for e in plano['envios']], ['09:00', '09:00', '09:10'])
+        self.assertEqual(plano['envios'][2]['tipo'], 'lembrete')
+
+        motivos = {i['nome']: i['motivo'] for i in plano['nao_planejados']}
+        self.assertEqual(motivos, {'Caio': 'consulta_passada'})
+
+    def test_intervalo_vale_por_numero(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE limites_sistema SET valor_limite = 50 WHERE tipo_limite = 'max_primeiros_contatos_dia'")
+        conn.execute("UPDATE limites_sistema SET valor_limite = 120 WHERE tipo_limite = 'intervalo_minimo_segundos'")
+        conn.executemany("""
+            INSERT INTO pacientes (nome, telefone, data_consulta, hora_consulta, status)
+            VALUES (?, ?, ?, '18:00', 'pendente')
+        """, [(f'P{i}', f'1197{i:07d}', self.amanha) for i in range(20)])
+        conn.commit()
+        conn.close()
+
+        rate_limiter.carregar(self.db_path)
+        self.planner.carregar()
+        plano = self.planner.plano(self.agora)
+
+        # Números diferentes não esperam uns pelos outros; só Davi, que
+        # divide o número com Bia, fica 120 s depois
+        horarios = {e['nome']: e['horario'] for e in plano['envios']}
+        self.assertEqual(len(horarios), 23)
+        self.assertEqual({h for n, h in horarios.items() if n != 'Davi'}, {self.agora})
+        self.assertEqual(horarios['Davi'], self.agora + timedelta(seconds=120))
+        self.assertEqual({i['nome'] for i in plano['nao_planejados']}, {'Caio'})
+
+    def test_teto_diario_e_horario(self):
+        rate_limiter.registrar(self.db_path, '11955555555', 'primeiro_contato', 1,
+                               agora_us=int(self.agora.timestamp() * MICROSSEGUNDOS) - 3600 * MICROSSEGUNDOS)
+        rate_limiter.registrar(self.db_path, '11966666666', 'primeiro_contato', 1,
+                               agora_us=int(self.agora.timestamp() * MICROSSEGUNDOS) - 3600 * MICROSSEGUNDOS)
+
+        plano = self.planner.plano(self.agora)
+        self.assertEqual(plano['restantes_hoje'], 1)
+        self.assertEqual([e['nome'] for e in plano['envios']], ['Bia', 'Davi'])
+        self.assertEqual({i['nome']: i['motivo'] for i in plano['nao_planejados']}['Ana'], 'limite_diario')
+
+        # Às 9h55 só cabe um envio antes do fim do expediente (10h)
+        plano = self.planner.plano(self.agora.replace(minute=55))
+        self.assertEqual(len(plano['envios']), 1)
+        self.assertIn('fora_do_horario', {i['motivo'] for i in plano['nao_planejados']})
+
+    def test_recalcula_com_alteracoes(self):
+        self.planner.plano(self.agora)
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE pacientes SET status = 'mensagem_enviada' WHERE nome = 'Bia'")
+        conn.commit()
+        bia = conn.execute("SELECT id FROM pacientes WHERE nome = 'Bia'").fetchone()[0]
+        conn.close()
+
+        self.planner.aplicar_alteracoes({'recarregar': False, 'alterados': {bia}, 'excluidos': set(), 'datas': set()})
+        plano = self.planner.plano(self.agora)
+        self.assertEqual([e['nome'] for e in plano['envios']], ['Davi', 'Ana'])
+
+    def test_milhares_de_contatos(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE configuracoes SET valor = 'true' WHERE chave = 'trabalha_24h'")
+        conn.execute("INSERT OR IGNORE INTO configuracoes (chave, valor) VALUES ('trabalha_24h', 'true')")
+        conn.execute("UPDATE limites_sistema SET valor_limite = 5000 WHERE tipo_limite = 'max_primeiros_contatos_dia'")
+        conn.execute("UPDATE limites_sistema SET valor_limite = 1 WHERE tipo_limite = 'intervalo_minimo_segundos'")
+        conn.executemany("""
+            INSERT INTO pacientes (nome, telefone, data_consulta, hora_consulta, status)
+            VALUES (?, ?, ?, '18:00', 'pendente')
+        """, [(f'P{i}', f'1198{i:07d}', self.amanha) for i in range(5000)])
+        conn.commit()
+        conn.close()
+
+        rate_limiter.carregar(self.db_path)
+        self.planner.carregar()
+        plano = self.planner.plano(self.agora)
+
+        self.assertEqual(len(plano['envios']) + len(plano['nao_planejados']), 5004)
+        horarios = [e['horario'] for e in plano['envios']]
+        self.assertEqual(horarios, sorted(horarios))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from backend.connection import connection_manager
+from backend.database import criar_banco
+from backend.migrations import aplicar_migracoes
+from backend.messaging import MessageManager, repetition_memory, template_cache
+from backend.prefetch import MessagePrefetcher
+
+class TestMessagePrefetcher(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'teste.db')
+        criar_banco(self.db_path)
+        aplicar_migracoes(self.db_path)
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("DELETE FROM mensagens")
+        conn.execute("INSERT INTO mensagens (tipo, texto) VALUES ('primeiro_contato', 'Oi {nome}')")
+        conn.executemany("""
+            INSERT INTO pacientes (nome, telefone, data_consulta, hora_consulta, status)
+            VALUES (?, '11999999999', '2026-01-05', '09:00', ?)
+        """, [('Ana', 'pendente'), ('Bia', 'pendente'), ('Caio', 'confirmado')])
+        conn.commit()
+        conn.close()
+
+        self.prefetcher = MessagePrefetcher(self.db_path, quantidade=2)
+        self.prefetcher.iniciar()
+
+    def tearDown(self):
+        self.prefetcher.parar()
+        template_cache.invalidar(self.db_path)
+        repetition_memory.limpar()
+        connection_manager.invalidar(self.db_path)
+        self.tmpdir.cleanup()
+
+    def _aguardar_cache(self, quantidade):
+        limite = time.monotonic() + 5
+        while len(self.prefetcher._cache) < quantidade and time.monotonic() < limite:
+            time.sleep(0.01)
+
+    def test_pre_renderiza_pendentes_da_fila(self):
+        self.prefetcher.definir_fila([3, 1, 2])
+        self._aguardar_cache(1)
+
+        # Só os 'quantidade' primeiros da fila, e apenas pendentes
+        entrada = self.prefetcher.obter(1)
+        self.assertEqual(entrada['mensagem'], 'Oi Ana')
+        self.assertEqual(entrada['tipo'], 'primeiro_contato')
+        self.assertIsNone(self.prefetcher.obter(3))
+        self.assertIsNone(self.prefetcher.obter(2))
+
+        # Consumida ao ser obtida
+        self.assertIsNone(self.prefetcher.obter(1))
+
+    def test_descarta_linha_alterada(self):
+        self.prefetcher.definir_fila([1, 2])
+        self._aguardar_cache(2)
+        self.prefetcher.parar()  # Sem nova renderização após o descarte
+
+        self.prefetcher.descartar([2])
+
+        self.assertIsNone(self.prefetcher.obter(2))
+        self.assertIsNotNone(self.prefetcher.obter(1))
+
+    def test_template_registrado_so_ao_preparar(self):
+        self.prefetcher.definir_fila([1])
+        self._aguardar_cache(1)
+        self.prefetcher.parar()
+
+        chave = repetition_memory._chave(self.db_path, 1)
+        self.assertEqual(repetition_memory._pacientes[chave]['usados'], set())
+
+        entrada = self.prefetcher.obter(1)
+        MessageManager(self.db_path).preparar_mensagem_paciente(
+            1, entrada['tipo'], (entrada['mensagem_id'], entrada['mensagem'])
+        )
+
+        self.assertEqual(repetition_memory._pacientes[chave]['usados'], {entrada['mensagem_id']})
+
+if __name__ == '__main__':
+    unittest.main()
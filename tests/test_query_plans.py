@@ -0,0 +1,107 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from backend.database import criar_banco
+from backend.migrations import aplicar_migracoes
+
+# Consultas frequentes (lista de pacientes, dashboard, limites, histórico).
+# Cada uma deve ser resolvida por busca em índice, nunca varredura completa.
+CONSULTAS_FREQUENTES = {
+    'lista_futuros': ("""
+        SELECT id, nome, telefone, data_consulta, hora_consulta, status, tentativas_contato
+        FROM pacientes
+        WHERE data_consulta >= ?
+        ORDER BY data_consulta, hora_consulta
+    """, ('2026-01-01',)),
+    'lista_status_futuros': ("""
+        SELECT id, nome, telefone, data_consulta, hora_consulta, status, tentativas_contato
+        FROM pacientes
+        WHERE status = ? AND data_consulta >= ?
+        ORDER BY data_consulta, hora_consulta
+    """, ('confirmado', '2026-01-01')),
+    'pagina_seguinte': ("""
+        SELECT id, nome, telefone, data_consulta, hora_consulta, status, tentativas_contato
+        FROM pacientes
+        WHERE (data_consulta, hora_consulta, id) > (?, ?, ?) AND +data_consulta >= ?
+        ORDER BY data_consulta ASC, hora_consulta ASC, id ASC
+        LIMIT 200
+    """, ('2026-01-01', '08:00', 10, '2026-01-01')),
+    'pagina_anterior_status': ("""
+        SELECT id, nome, telefone, data_consulta, hora_consulta, status, tentativas_contato
+        FROM pacientes
+        WHERE status = ? AND (data_consulta, hora_consulta, id) < (?, ?, ?)
+        ORDER BY data_consulta DESC, hora_consulta DESC, id DESC
+        LIMIT 200
+    """, ('confirmado', '2026-01-01', '08:00', 10)),
+    'pendentes_do_dia': ("""
+        SELECT id FROM pacientes
+        WHERE status = 'pendente' AND data_consulta = ?
+        ORDER BY data_consulta, hora_consulta
+    """, ('2026-01-01',)),
+    'preparo_em_lote': ("""
+        SELECT id, nome, telefone, data_consulta, hora_consulta,
+               tipo_consulta, profissional, status, consentimento_whatsapp
+        FROM pacientes
+        WHERE status = 'pendente' AND data_consulta = ?
+        ORDER BY data_consulta, hora_consulta
+    """, ('2026-01-01',)),
+    'periodo_dashboard': ("""
+        SELECT data_consulta, COUNT(*), SUM(CASE WHEN status = 'confirmado' THEN 1 ELSE 0 END)
+        FROM pacientes
+        WHERE data_consulta BETWEEN ? AND ?
+        GROUP BY data_consulta
+    """, ('2025-10-04', '2026-01-01')),
+    'historico_paciente': ("""
+        SELECT mensagem_id FROM historico_mensagens WHERE paciente_id = ?
+    """, (1,)),
+    'templates_recebidos': ("""
+        SELECT mensagem_id FROM historico_mensagens
+        WHERE paciente_id = ? AND mensagem_id IS NOT NULL
+    """, (1,)),
+    'limite_diario': ("""
+        SELECT COALESCE(SUM(total_enviado), 0)
+        FROM controle_envio
+        WHERE data = ? AND tipo_mensagem = ?
+    """, ('2026-01-01', 'primeiro_contato')),
+    'limite_por_numero': ("""
+        SELECT total_enviado, ultimo_envio
+        FROM controle_envio
+        WHERE data = ? AND numero_telefone = ?
+    """, ('2026-01-01', '+5511999999999')),
+}
+
+TABELAS = ('pacientes', 'historico_mensagens', 'controle_envio')
+
+class TestQueryPlans(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.db_path = os.path.join(cls.tmpdir.name, 'teste.db')
+        criar_banco(cls.db_path)
+        aplicar_migracoes(cls.db_path)
+        cls.conn = sqlite3.connect(cls.db_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+        cls.tmpdir.cleanup()
+
+    def test_consultas_frequentes_usam_indice(self):
+        for nome, (sql, params) in CONSULTAS_FREQUENTES.items():
+            with self.subTest(consulta=nome):
+                plano = [row[3] for row in self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+                for detalhe in plano:
+                    for tabela in TABELAS:
+                        self.assertFalse(
+                            detalhe.startswith(f'SCAN {tabela}'),
+                            f'{nome}: varredura completa ({detalhe})'
+                        )
+                self.assertFalse(
+                    any(d.startswith('USE TEMP B-TREE') for d in plano),
+                    f'{nome}: ordenação sem índice ({plano})'
+                )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from backend.connection import connection_manager
+from backend.database import criar_banco
+from backend.migrations import aplicar_migracoes
+from backend.reporting import ReportingManager
+
+class TestReportingManager(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'teste.db')
+        criar_banco(self.db_path)
+        aplicar_migracoes(self.db_path)
+
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany("""
+            INSERT INTO pacientes (nome, telefone, data_consulta, hora_consulta, status)
+            VALUES (?, ?, ?, ?, ?)
+        """, [
+            ('Ana', '11911111111', '2026-01-05', '09:00', 'confirmado'),
+            ('Bia', '11922222222', '2026-01-05', '10:00', 'mensagem_enviada'),
+            ('Caio', '11933333333', '2026-01-05', '11:00', 'sem_resposta'),
+            ('Davi', '11944444444', '2026-01-05', '12:00', 'pendente'),
+            ('Eva', '11955555555', '2026-01-07', '09:00', 'confirmado'),
+            ('Fábio', '11966666666', '2026-01-09', '09:00', 'confirmado'),  # fora do período
+        ])
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        connection_manager.invalidar(self.db_path)
+        self.tmpdir.cleanup()
+
+    def test_estatisticas_por_dia(self):
+        estatisticas = ReportingManager(self.db_path).estatisticas_por_dia('2026-01-03', '2026-01-08')
+
+        self.assertEqual(estatisticas, {
+            '2026-01-05': (4, 1, 1, 1),
+            '2026-01-07': (1, 1, 0, 0),
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
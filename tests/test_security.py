@@ -1,5 +1,5 @@
 import unittest
-from backend.security import SecurityValidator
+from backend.security import SecurityValidator, CPF_OK, CPF_TAMANHO, CPF_REPETIDO, CPF_DIGITO, EMAIL_INVALIDO
 
 class TestSecurity(unittest.TestCase):
     def setUp(self):
@@ -9,6 +9,39 @@ class TestSecurity(unittest.TestCase):
         # Teste de validação de telefone
         valido, numero, erro = self.security.validar_telefone('+5511999999999')
         self.assertTrue(valido)
+    
+    def test_validar_telefone_celular_sem_parse(self):
+        # Celular bem formado: mesmo resultado que o phonenumbers daria
+        self.assertEqual(self.security.validar_telefone('(11) 98765-4321'), (True, '+5511987654321', ''))
+        self.assertEqual(self.security.validar_telefone('+55 21 98765-4321'), (True, '+5521987654321', ''))
+        # DDD inexistente e fixo seguem pelo parse completo
+        self.assertFalse(self.security.validar_telefone('20987654321')[0])
+        self.assertEqual(self.security.validar_telefone('(11) 3456-7890'), (True, '+551134567890', ''))
+    
+    def test_validar_telefones_lote(self):
+        resultados = self.security.validar_telefones_lote(['11987654321', None, '123', '11987654321'])
+        
+        self.assertEqual([r[0] for r in resultados], [True, False, False, True])
+        self.assertEqual(resultados[0][1], '+5511987654321')
+        self.assertEqual(resultados[0], resultados[3])
+    
+    def test_validar_cpfs_lote(self):
+        cpfs = ['529.982.247-25', '52998224724', '111.111.111-11', '123', '', None, float('nan'), 52998224725.0]
+        mascara, codigos = self.security.validar_cpfs_lote(cpfs)
+        
+        self.assertEqual(mascara.tolist(), [True, False, False, False, True, True, True, True])
+        self.assertEqual(codigos.tolist(), [CPF_OK, CPF_DIGITO, CPF_REPETIDO, CPF_TAMANHO, CPF_OK, CPF_OK, CPF_OK, CPF_OK])
+        
+        # Mesmo resultado da validação individual
+        for cpf, valido in zip(cpfs[:5], mascara):
+            self.assertEqual(self.security.validar_cpf(cpf)[0], valido)
+    
+    def test_validar_emails_lote(self):
+        emails = ['ana.silva@gmail.com', 'a..b@x.com', 'sem email', '', None, 'jose+clinica@uol.com.br']
+        mascara, codigos = self.security.validar_emails_lote(emails)
+        
+        self.assertEqual(mascara.tolist(), [True, False, False, True, True, True])
+        self.assertEqual(codigos[1], EMAIL_INVALIDO)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
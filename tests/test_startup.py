@@ -0,0 +1,21 @@
+import os
+import unittest
+from scripts.benchmark_inicializacao import ORCAMENTO_MS, medir, proibidos_carregados
+
+
+class TestInicializacao(unittest.TestCase):
+    def test_dependencias_pesadas_nao_carregam_no_inicio(self):
+        _, tempos = medir()
+        self.assertEqual(proibidos_carregados(tempos), [])
+
+    # Tempo de relógio depende da máquina e da carga: só roda quando pedido
+    @unittest.skipUnless(os.getenv('TITANIUM_TESTES_TEMPO') == '1',
+                         'defina TITANIUM_TESTES_TEMPO=1 para verificar o orçamento')
+    def test_orcamento_de_inicializacao(self):
+        # Melhor de três: a primeira execução pode pagar cache de disco
+        total = min(medir()[0] for _ in range(3))
+        self.assertLess(total, ORCAMENTO_MS)
+
+
+if __name__ == '__main__':
+    unittest.main()